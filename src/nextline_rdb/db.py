@@ -1,4 +1,5 @@
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
+from functools import partial
 from logging import getLogger
 from os import PathLike
 from pathlib import Path
@@ -8,7 +9,7 @@ from alembic.config import Config
 from alembic.migration import MigrationContext
 from alembic.runtime.environment import EnvironmentContext
 from alembic.script import ScriptDirectory
-from sqlalchemy import Connection, Engine, MetaData, event
+from sqlalchemy import Connection, Engine, MetaData, event, make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
@@ -22,6 +23,23 @@ ALEMBIC_INI = str(_PACKAGE_TOP / 'alembic' / 'alembic.ini')
 
 assert Path(ALEMBIC_INI).is_file()
 
+SqlitePragmas = Mapping[str, str | int]
+
+SQLITE_PRAGMA_PROFILES: dict[str, SqlitePragmas] = {
+    # The SQLite defaults
+    'default': {},
+    # Readers don't block the writer, and commits don't wait for fsync.
+    # A commit can be lost on power failure but the DB cannot be corrupted.
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268_435_456,  # 256 MiB
+        'cache_size': -65_536,  # 64 MiB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5_000,  # milliseconds
+    },
+}
+
 
 class DB:
     '''The interface to the async SQLAlchemy database.
@@ -39,6 +57,13 @@ class DB:
     ...             # commit automatically
     ...             pass
     ...
+    ...     # Separate engines for reading and writing
+    ...     async with DB(url, read_url=url) as db:
+    ...         async with db.write_session.begin() as session:
+    ...             pass
+    ...         async with db.read_session() as session:
+    ...             pass
+    ...
     ...     # An alternative usage
     ...     db = DB()
     ...     await db.start()
@@ -49,7 +74,17 @@ class DB:
     ...
     >>> import asyncio
     >>> import contextlib
+    >>> import tempfile
+    >>> tmp_dir = tempfile.TemporaryDirectory()
+    >>> url = f'sqlite+aiosqlite:///{tmp_dir.name}/db.sqlite'
     >>> asyncio.run(main())
+    >>> tmp_dir.cleanup()
+
+    `session` and `write_session` are the same. `read_session` is also the same
+    unless `read_url` is given, in which case it uses another engine, e.g., with
+    a replica for PostgreSQL or with the same file for SQLite. The connections
+    of the read engine to SQLite are read-only (`PRAGMA query_only`), and the
+    write engine has a single connection.
 
     '''
 
@@ -64,9 +99,12 @@ class DB:
         register_session_events: Optional[
             Callable[[sessionmaker[Session]], None]
         ] = None,
+        sqlite_pragmas: Optional[SqlitePragmas] = None,  # e.g., {'temp_store': 2}
+        read_url: Optional[str] = None,
     ):
         url = url or 'sqlite+aiosqlite://'
         self.url = ensure_async_url(url)
+        self.read_url = ensure_async_url(read_url) if read_url else None
         self.create_async_engine_kwargs = create_async_engine_kwargs or {}
         self.model_base_class = model_base_class
         self.metadata = self.model_base_class.metadata
@@ -74,7 +112,33 @@ class DB:
         self.migration_revision_target = migration_revision_target
         self.alembic_ini_path = alembic_ini_path
 
-        self.engine = create_async_engine(self.url, **self.create_async_engine_kwargs)
+        self.sqlite_pragmas = dict(sqlite_pragmas or {})
+        statements = _pragma_statements(self.sqlite_pragmas)
+
+        if self.read_url is None:
+            self.engine = create_async_engine(
+                self.url, **self.create_async_engine_kwargs
+            )
+            self.read_engine = self.engine
+        else:
+            if _is_sqlite_in_memory(self.url):
+                raise ValueError(f'Cannot read in another engine: {self.url!r}')
+            # A single connection so that the writes don't contend
+            write_kwargs = {'pool_size': 1, 'max_overflow': 0}
+            write_kwargs.update(self.create_async_engine_kwargs)
+            self.engine = create_async_engine(self.url, **write_kwargs)
+            self.read_engine = create_async_engine(
+                self.read_url, **self.create_async_engine_kwargs
+            )
+            if self.read_engine.dialect.name == 'sqlite':
+                read_statements = statements + ('PRAGMA query_only=ON',)
+                listener = partial(_set_sqlite_pragmas, read_statements)
+                event.listen(self.read_engine.sync_engine, 'connect', listener)
+
+        if statements and self.engine.dialect.name == 'sqlite':
+            listener = partial(_set_sqlite_pragmas, statements)
+            event.listen(self.engine.sync_engine, 'connect', listener)
+
         self.migration_revision: str | None = None
 
         self._logger = getLogger(__name__)
@@ -83,7 +147,9 @@ class DB:
         self._register_session_events = register_session_events
 
     def __repr__(self) -> str:
-        return f'<{self.__class__.__name__} {self.url!r}>'
+        if self.read_url is None:
+            return f'<{self.__class__.__name__} {self.url!r}>'
+        return f'<{self.__class__.__name__} {self.url!r} read_url={self.read_url!r}>'
 
     async def start(self) -> None:
         if self.use_migration:
@@ -103,6 +169,12 @@ class DB:
         self.session = async_sessionmaker(
             self.engine, expire_on_commit=False, sync_session_class=sync_maker
         )
+        self.write_session = self.session
+        self.read_session = self.session
+        if self.read_engine is not self.engine:
+            self.read_session = async_sessionmaker(
+                self.read_engine, expire_on_commit=False, sync_session_class=sync_maker
+            )
 
         if self._register_session_events:
             self._register_session_events(sync_maker)
@@ -131,6 +203,8 @@ class DB:
 
     async def aclose(self) -> None:
         await self.engine.dispose()
+        if self.read_engine is not self.engine:
+            await self.read_engine.dispose()
 
     async def __aenter__(self) -> 'DB':
         await self.start()
@@ -177,3 +251,47 @@ def set_sqlite_pragma(dbapi_connection: Any, connection_record: Any) -> None:
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
+
+
+def _is_sqlite_in_memory(url: str) -> bool:
+    '''True if the URL is of an in-memory SQLite DB.
+
+    >>> _is_sqlite_in_memory('sqlite+aiosqlite://')
+    True
+    >>> _is_sqlite_in_memory('sqlite+aiosqlite:///db.sqlite')
+    False
+
+    '''
+    url_ = make_url(url)
+    return url_.get_backend_name() == 'sqlite' and url_.database in (
+        None,
+        '',
+        ':memory:',
+    )
+
+
+def _pragma_statements(pragmas: SqlitePragmas) -> tuple[str, ...]:
+    '''The PRAGMA statements after validating the names and values.
+
+    >>> _pragma_statements({'journal_mode': 'WAL', 'cache_size': -2000})
+    ('PRAGMA journal_mode=WAL', 'PRAGMA cache_size=-2000')
+
+    '''
+    statements = list[str]()
+    for name, value in pragmas.items():
+        if not name.isidentifier():
+            raise ValueError(f'Invalid SQLite pragma name: {name!r}')
+        if not isinstance(value, int) and not str(value).isidentifier():
+            raise ValueError(f'Invalid value of SQLite pragma {name!r}: {value!r}')
+        statements.append(f'PRAGMA {name}={value}')
+    return tuple(statements)
+
+
+def _set_sqlite_pragmas(
+    statements: tuple[str, ...], dbapi_connection: Any, connection_record: Any
+) -> None:
+    '''Execute the PRAGMA statements on each new connection.'''
+    cursor = dbapi_connection.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+    cursor.close()
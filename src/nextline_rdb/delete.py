@@ -0,0 +1,134 @@
+'''Delete runs with set-based statements.
+
+The rows of the child tables of a run are deleted with `DELETE` statements in
+the order of the foreign keys. The rows are not loaded into the session, unlike
+with `session.delete(run)`, which loads every child to cascade.
+
+>>> async def main():
+...     async with DB() as db:
+...         async with db.session.begin() as session:
+...             session.add(Run(run_no=1))
+...         return await delete_runs(db, [1, 2], progress=print)
+>>> import asyncio
+>>> from nextline_rdb.db import DB
+>>> asyncio.run(main())
+DeleteProgress(run_id=1, table='run', deleted=1, total=1, runs_done=1, runs_total=1)
+[1]
+
+'''
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import (
+    Model,
+    Prompt,
+    Run,
+    RunSummary,
+    Stdout,
+    Trace,
+    TraceCall,
+)
+
+# The child tables of `run` in the order in which the rows can be deleted
+CHILD_MODELS: tuple[type[Prompt | Stdout | TraceCall | Trace | RunSummary], ...] = (
+    Prompt,
+    Stdout,
+    TraceCall,
+    Trace,
+    RunSummary,
+)
+
+# The maximum number of the rows deleted by each statement
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class DeleteProgress:
+    '''Reported after each statement that deletes rows.'''
+
+    run_id: int
+    table: str
+    deleted: int  # The rows deleted from the table of the run so far
+    total: int  # The rows of the table of the run before the deletion
+    runs_done: int  # Including the run if the table is `run`
+    runs_total: int
+
+
+async def delete_runs(
+    db: DB,
+    ids: Iterable[int],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[DeleteProgress], None]] = None,
+) -> list[int]:
+    '''Delete the runs with the IDs and their children. Return the deleted IDs.
+
+    Each run is deleted in its own transaction so that the writer is not blocked
+    until all the runs are deleted. The IDs of runs that don't exist are ignored.
+    '''
+    async with db.session() as session:
+        stmt = select(Run.id).where(Run.id.in_(list(ids))).order_by(Run.id)
+        existing = (await session.scalars(stmt)).all()
+
+    ret = list[int]()
+    for run_id in existing:
+        async with db.session.begin() as session:
+            report = _reporter(progress, run_id, ret, len(existing))
+            for model in CHILD_MODELS:
+                await _delete_children(session, model, run_id, chunk_size, report)
+            result = await session.execute(delete(Run).where(Run.id == run_id))
+            if not result.rowcount:  # type: ignore[attr-defined]
+                continue  # e.g., deleted by another transaction
+            ret.append(run_id)
+            report(Run, 1, 1)
+    return ret
+
+
+async def _delete_children(
+    session: AsyncSession,
+    model: type[Prompt | Stdout | TraceCall | Trace | RunSummary],
+    run_id: int,
+    chunk_size: int,
+    report: Callable[[type[Model], int, int], None],
+) -> None:
+    stmt = select(func.count()).select_from(model).where(model.run_id == run_id)
+    total = (await session.execute(stmt)).scalar_one()
+    deleted = 0
+    while deleted < total:
+        chunk = select(model.id).where(model.run_id == run_id).limit(chunk_size)
+        result = await session.execute(
+            delete(model).where(model.id.in_(chunk)),
+            execution_options={'synchronize_session': False},
+        )
+        if not (rowcount := result.rowcount):  # type: ignore[attr-defined]
+            break  # e.g., deleted by another transaction
+        deleted += rowcount
+        report(model, deleted, total)
+
+
+def _reporter(
+    progress: Optional[Callable[[DeleteProgress], None]],
+    run_id: int,
+    done: list[int],
+    runs_total: int,
+) -> Callable[[type[Model], int, int], None]:
+    def _report(model: type[Model], deleted: int, total: int) -> None:
+        if progress is None:
+            return
+        progress(
+            DeleteProgress(
+                run_id=run_id,
+                table=model.__tablename__,
+                deleted=deleted,
+                total=total,
+                runs_done=len(done),
+                runs_total=runs_total,
+            )
+        )
+
+    return _report
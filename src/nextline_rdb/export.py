@@ -0,0 +1,220 @@
+'''Export runs to Parquet or Arrow IPC files for offline analysis.
+
+Each table is written to a file in a directory, e.g., `run.parquet` and
+`trace_call.parquet`. The rows are streamed from the DB with a server-side
+cursor and written in record batches of `chunk_size` rows. The memory use is
+bounded by the chunk size regardless of the size of the runs.
+
+The scripts of the runs are exported as well. The stdout texts are exported
+decompressed, without the columns of the compression.
+
+The export needs the package `pyarrow`, e.g., `pip install nextline-rdb[export]`.
+
+From the command line:
+
+    nextline-rdb-export sqlite:///db.sqlite exported/ --runs 1-10,15
+
+'''
+
+import argparse
+import asyncio
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Optional
+
+from sqlalchemy import Column, ColumnElement, Row, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Model, Prompt, Run, Script, Stdout, Trace, TraceCall
+from nextline_rdb.utils.compress import decompress_text
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+FORMATS = ('parquet', 'arrow')
+
+# The exported tables in the order in which they can be imported
+# The summaries of the runs are not exported. They are recomputed on import.
+EXPORT_MODELS: tuple[type[Model], ...] = (Script, Run, Trace, TraceCall, Prompt, Stdout)
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# The columns not exported
+_OMITTED_COLUMNS: dict[str, tuple[str, ...]] = {
+    'stdout': ('compression', 'text_compressed')
+}
+
+
+async def export_runs(
+    db: DB,
+    directory: str | Path,
+    run_nos: Optional[Sequence[int]] = None,
+    format: str = 'parquet',
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[str, int]:
+    '''Export the runs with the run numbers, or all runs if `None`.
+
+    Return the number of the rows exported from each table.
+    '''
+    pa = import_pyarrow()
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format: {format!r}')
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    ret = dict[str, int]()
+    async with db.read_session() as session:
+        for model in EXPORT_MODELS:
+            name = model.__tablename__
+            ret[name] = await _export_table(
+                pa,
+                session,
+                model,
+                where=_where(model, run_nos),
+                path=directory / f'{name}.{format}',
+                format=format,
+                chunk_size=chunk_size,
+                revision=db.migration_revision,
+            )
+    return ret
+
+
+def _where(model: type[Model], run_nos: Optional[Sequence[int]]) -> ColumnElement[bool]:
+    if run_nos is None:
+        return true()
+    if model is Run:
+        return Run.run_no.in_(run_nos)
+    if model is Script:
+        return Script.id.in_(select(Run.script_id).where(Run.run_no.in_(run_nos)))
+    run_id = Model.metadata.tables[model.__tablename__].c.run_id
+    return run_id.in_(select(Run.id).where(Run.run_no.in_(run_nos)))
+
+
+async def _export_table(
+    pa: ModuleType,
+    session: AsyncSession,
+    model: type[Model],
+    where: ColumnElement[bool],
+    path: Path,
+    format: str,
+    chunk_size: int,
+    revision: Optional[str],
+) -> int:
+    table = Model.metadata.tables[model.__tablename__]
+    omitted = _OMITTED_COLUMNS.get(table.name, ())
+    columns = [c for c in table.columns if c.name not in omitted]
+    metadata = {'table': table.name, 'migration_revision': revision or ''}
+    schema = pa.schema([_field(pa, c) for c in columns], metadata=metadata)
+
+    stmt = select(table).where(where).order_by(table.c.id)
+    stmt = stmt.execution_options(yield_per=chunk_size)
+    result = await session.stream(stmt)
+    n = 0
+    with _open(pa, path, schema, format) as writer:
+        async for rows in result.partitions():
+            arrays = [
+                pa.array(_values(model, rows, c.name), type=f.type)
+                for c, f in zip(columns, schema)
+            ]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            n += len(rows)
+    return n
+
+
+def _values(model: type[Model], rows: Sequence[Row], name: str) -> list[Any]:
+    if model is Stdout and name == 'text':
+        return [_stdout_text(row) for row in rows]
+    return [row._mapping[name] for row in rows]
+
+
+def _stdout_text(row: Row) -> Optional[str]:
+    if row.compression is None or row.text_compressed is None:
+        return row.text
+    return decompress_text(row.text_compressed, row.compression)
+
+
+def _field(pa: ModuleType, column: Column) -> 'pa.Field':
+    types = {
+        int: pa.int64(),
+        str: pa.string(),
+        bool: pa.bool_(),
+        bytes: pa.binary(),
+        datetime: pa.timestamp('us'),
+    }
+    type_ = types[column.type.python_type]
+    return pa.field(column.name, type_, nullable=bool(column.nullable))
+
+
+def _open(pa: ModuleType, path: Path, schema: 'pa.Schema', format: str) -> Any:
+    if format == 'parquet':
+        from pyarrow import parquet
+
+        return parquet.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+
+def import_pyarrow() -> ModuleType:
+    '''Return `pyarrow`, which is an optional dependency.'''
+    try:
+        import pyarrow
+    except ImportError as e:
+        msg = 'pyarrow is needed, e.g., pip install nextline-rdb[export]'
+        raise ImportError(msg) from e
+    return pyarrow
+
+
+def parse_run_nos(text: str) -> list[int]:
+    '''The run numbers in a comma-separated list of numbers and ranges.
+
+    >>> parse_run_nos('1-3,7')
+    [1, 2, 3, 7]
+
+    '''
+    ret = list[int]()
+    for item in text.split(','):
+        first, sep, last = item.strip().partition('-')
+        if sep:
+            ret.extend(range(int(first), int(last) + 1))
+        else:
+            ret.append(int(first))
+    return ret
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    '''The command `nextline-rdb-export`.'''
+    parser = argparse.ArgumentParser(
+        prog='nextline-rdb-export',
+        description='Export runs to Parquet or Arrow IPC files.',
+    )
+    parser.add_argument(
+        'url',
+        help='The DB URL, e.g., sqlite:///db.sqlite. The DB is migrated to the latest revision.',
+    )
+    parser.add_argument('directory', help='The directory of the files')
+    parser.add_argument(
+        '--runs',
+        type=parse_run_nos,
+        help='The run numbers, e.g., 1-10,15. All runs if omitted.',
+    )
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    async def _export() -> dict[str, int]:
+        async with DB(args.url) as db:
+            return await export_runs(
+                db,
+                args.directory,
+                run_nos=args.runs,
+                format=args.format,
+                chunk_size=args.chunk_size,
+            )
+
+    for table, n in asyncio.run(_export()).items():
+        print(f'{table}: {n} rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+'''Import runs from the files exported by `nextline_rdb.export`.
+
+The rows are inserted with Core `INSERT` statements executed for many rows at
+once, in batches of `batch_size` rows read from the files. No ORM objects are
+created except for the scripts.
+
+The primary keys are shifted past the largest IDs in the DB, and the foreign
+keys are shifted accordingly. A script already in the DB with the same text is
+reused. A run whose run number is already in the DB gets a new run number
+after the largest one unless `on_conflict` is "error".
+
+The summaries of the imported runs are computed from the imported rows.
+
+The import is one transaction. It should not run while the DB is written by
+Nextline, which also assigns IDs.
+
+From the command line:
+
+    nextline-rdb-import sqlite:///archive.sqlite exported/
+
+'''
+
+import argparse
+import asyncio
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Optional
+
+from sqlalchemy import Table, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline_rdb.db import DB
+from nextline_rdb.export import EXPORT_MODELS, FORMATS, import_pyarrow
+from nextline_rdb.models import Model, Run, Script, script_sha256
+from nextline_rdb.summary import refresh_run_summaries
+
+ON_CONFLICT = ('renumber', 'error')
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+async def import_runs(
+    db: DB,
+    directory: str | Path,
+    format: str = 'parquet',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_conflict: str = 'renumber',
+) -> dict[int, int]:
+    '''Import the runs exported in the directory.
+
+    Return the run numbers of the imported runs, from the exported to the new.
+    '''
+    pa = import_pyarrow()
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format: {format!r}')
+    if on_conflict not in ON_CONFLICT:
+        raise ValueError(f'Unknown on_conflict: {on_conflict!r}')
+    directory = Path(directory)
+
+    def _path(table: Table) -> Path:
+        return directory / f'{table.name}.{format}'
+
+    async with db.write_session.begin() as session:
+        script_ids = await _import_scripts(
+            session, _read_column(pa, _path(_table(Script)), format, 'script')
+        )
+        exported_run_nos = _read_column(pa, _path(_table(Run)), format, 'run_no')
+        run_nos = await _new_run_nos(session, exported_run_nos, on_conflict)
+
+        # The IDs are shifted by the largest ID of the table in the DB
+        offsets = dict[str, int]()
+        for model in EXPORT_MODELS:
+            if model is Script:
+                continue
+            table = _table(model)
+            stmt = select(func.max(table.c.id))
+            offsets[table.name] = await session.scalar(stmt) or 0
+
+        for model in EXPORT_MODELS:
+            if model is Script:
+                continue
+            table = _table(model)
+            for batch in _batches(pa, _path(table), format, batch_size):
+                if rows := _remap(table, batch, offsets, script_ids, run_nos):
+                    await session.execute(insert(table), rows)
+
+        run_ids = [id_ + offsets[Run.__tablename__] for id_ in exported_run_nos]
+        await refresh_run_summaries(session, run_ids)
+    return run_nos
+
+
+def _table(model: type[Model]) -> Table:
+    return Model.metadata.tables[model.__tablename__]
+
+
+async def _import_scripts(
+    session: AsyncSession, scripts: dict[int, Any]
+) -> dict[int, int]:
+    '''Return the IDs of the scripts, from the exported to those in the DB.'''
+    hashes = {id_: script_sha256(script) for id_, script in scripts.items()}
+    stmt = select(Script.sha256, Script.id).where(Script.sha256.in_(hashes.values()))
+    existing = dict((await session.execute(stmt)).all())
+    ret = dict[int, int]()
+    for id_, script in scripts.items():
+        if (new_id := existing.get(hashes[id_])) is None:
+            new = Script(script=script)
+            session.add(new)
+            await session.flush()
+            new_id = existing[hashes[id_]] = new.id
+        ret[id_] = new_id
+    return ret
+
+
+async def _new_run_nos(
+    session: AsyncSession, run_nos: dict[int, Any], on_conflict: str
+) -> dict[int, int]:
+    '''Return the run numbers, from the exported to the new.'''
+    stmt = select(Run.run_no).where(Run.run_no.in_(run_nos.values()))
+    existing = set((await session.scalars(stmt)).all())
+    if existing and on_conflict == 'error':
+        raise ValueError(f'The run numbers are already in the DB: {sorted(existing)}')
+    last = await session.scalar(select(func.max(Run.run_no))) or 0
+    last = max([last, *run_nos.values()])
+    ret = dict[int, int]()
+    for run_no in sorted(run_nos.values()):
+        if run_no in existing:
+            last += 1
+            ret[run_no] = last
+        else:
+            ret[run_no] = run_no
+    return ret
+
+
+def _remap(
+    table: Table,
+    batch: Any,
+    offsets: dict[str, int],
+    script_ids: dict[int, int],
+    run_nos: dict[int, int],
+) -> list[dict[str, Any]]:
+    '''The rows of the batch with the new IDs and run numbers.'''
+    columns = dict[str, list[Any]]()
+    for name in batch.schema.names:
+        if name not in table.c:
+            continue
+        values = batch.column(name).to_pylist()
+        column = table.c[name]
+        if column.primary_key:
+            values = _shift(values, offsets[table.name])
+        elif (fk := next(iter(column.foreign_keys), None)) is not None:
+            parent = fk.column.table.name
+            if parent == Script.__tablename__:
+                values = [None if v is None else script_ids[v] for v in values]
+            else:
+                values = _shift(values, offsets[parent])
+        elif table.name == Run.__tablename__ and name == 'run_no':
+            values = [run_nos[v] for v in values]
+        columns[name] = values
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def _shift(values: list[Optional[int]], offset: int) -> list[Optional[int]]:
+    return [None if v is None else v + offset for v in values]
+
+
+def _batches(pa: ModuleType, path: Path, format: str, batch_size: int) -> Iterator[Any]:
+    if format == 'parquet':
+        from pyarrow import parquet
+
+        yield from parquet.ParquetFile(path).iter_batches(batch_size=batch_size)
+        return
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for start in range(0, batch.num_rows, batch_size):
+                yield batch.slice(start, batch_size)
+
+
+def _read_column(pa: ModuleType, path: Path, format: str, name: str) -> dict[int, Any]:
+    '''The values of the column by the ID. For the small tables.'''
+    ret = dict[int, Any]()
+    for batch in _batches(pa, path, format, DEFAULT_BATCH_SIZE):
+        ids = batch.column('id').to_pylist()
+        ret.update(zip(ids, batch.column(name).to_pylist()))
+    return ret
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    '''The command `nextline-rdb-import`.'''
+    parser = argparse.ArgumentParser(
+        prog='nextline-rdb-import',
+        description='Import runs from the files of nextline-rdb-export.',
+    )
+    parser.add_argument(
+        'url',
+        help='The DB URL, e.g., sqlite:///db.sqlite. The DB is migrated to the latest revision.',
+    )
+    parser.add_argument('directory', help='The directory of the exported files')
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        '--on-conflict',
+        choices=ON_CONFLICT,
+        default='renumber',
+        help='What to do if a run number is already in the DB',
+    )
+    args = parser.parse_args(argv)
+
+    async def _import() -> dict[int, int]:
+        async with DB(args.url) as db:
+            return await import_runs(
+                db,
+                args.directory,
+                format=args.format,
+                batch_size=args.batch_size,
+                on_conflict=args.on_conflict,
+            )
+
+    run_nos = asyncio.run(_import())
+    for old, new in run_nos.items():
+        print(f'Run {old}' if old == new else f'Run {old} as run {new}')
+
+
+if __name__ == '__main__':
+    main()
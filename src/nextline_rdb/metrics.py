@@ -0,0 +1,248 @@
+'''Counters, latency histograms, and gauges of the hot paths.
+
+The write hooks, the operations and batches of the writer, the GraphQL
+resolvers, and the retries of `until_scalar_one()` are recorded in `METRICS`. The metrics are exposed in the GraphQL field
+`rdb { metrics }` and can be exported in the Prometheus text format.
+
+>>> metrics = Metrics()
+>>> metrics.inc('retries_total')
+>>> metrics.observe('duration_seconds', 0.003, {'hook': 'on_start_run'})
+>>> print(metrics.to_prometheus())
+# TYPE nextline_rdb_retries_total counter
+nextline_rdb_retries_total 1
+# TYPE nextline_rdb_duration_seconds histogram
+nextline_rdb_duration_seconds_bucket{hook="on_start_run",le="0.001"} 0
+nextline_rdb_duration_seconds_bucket{hook="on_start_run",le="0.005"} 1
+...
+nextline_rdb_duration_seconds_bucket{hook="on_start_run",le="+Inf"} 1
+nextline_rdb_duration_seconds_sum{hook="on_start_run"} 0.003
+nextline_rdb_duration_seconds_count{hook="on_start_run"} 1
+<BLANKLINE>
+
+'''
+
+import bisect
+import time
+from collections.abc import Awaitable, Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, ParamSpec, TypeAlias, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+PREFIX = 'nextline_rdb_'
+
+# The upper bounds of the buckets of the latency histograms in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+Labels: TypeAlias = tuple[tuple[str, str], ...]
+
+_P = ParamSpec('_P')
+_T = TypeVar('_T')
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)  # not cumulative
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)  # the last for +Inf
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        '''The upper bounds and the cumulative counts as in Prometheus.'''
+        ret = list[tuple[float, int]]()
+        total = 0
+        for le, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            ret.append((le, total))
+        return ret
+
+
+class Metrics:
+    '''A registry of metrics identified by names and labels.
+
+    Gauges are functions called when the metrics are read, e.g., the number of
+    the connections checked out from a pool.
+    '''
+
+    def __init__(self) -> None:
+        self.counters = dict[tuple[str, Labels], float]()
+        self.histograms = dict[tuple[str, Labels], Histogram]()
+        self._gauges = dict[tuple[str, Labels], Callable[[], float]]()
+
+    def inc(
+        self, name: str, labels: Mapping[str, str] | None = None, value: float = 1
+    ) -> None:
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(
+        self, name: str, value: float, labels: Mapping[str, str] | None = None
+    ) -> None:
+        key = (name, _labels(labels))
+        if (histogram := self.histograms.get(key)) is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def set_gauge(
+        self,
+        name: str,
+        func: Callable[[], float],
+        labels: Mapping[str, str] | None = None,
+    ) -> None:
+        self._gauges[(name, _labels(labels))] = func
+
+    def remove_gauge(self, name: str, labels: Mapping[str, str] | None = None) -> None:
+        self._gauges.pop((name, _labels(labels)), None)
+
+    @property
+    def gauges(self) -> dict[tuple[str, Labels], float]:
+        return {key: func() for key, func in self._gauges.items()}
+
+    @contextmanager
+    def time(
+        self, name: str, labels: Mapping[str, str] | None = None
+    ) -> Iterator[None]:
+        '''Observe the seconds that the block takes, including on exceptions.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def timed(
+        self, name: str, **labels: str
+    ) -> Callable[[Callable[_P, Awaitable[_T]]], Callable[_P, Awaitable[_T]]]:
+        '''A decorator of an async function to observe the seconds of each call.
+
+        The signature is kept so that pluggy and strawberry can inspect it.
+        '''
+
+        def _decorator(
+            func: Callable[_P, Awaitable[_T]],
+        ) -> Callable[_P, Awaitable[_T]]:
+            @wraps(func)
+            async def _wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+                with self.time(name, labels):
+                    return await func(*args, **kwargs)
+
+            return _wrapper
+
+        return _decorator
+
+    def clear(self) -> None:
+        '''Reset the counters and histograms. The gauges are kept.'''
+        self.counters.clear()
+        self.histograms.clear()
+
+    def to_prometheus(self) -> str:
+        '''The metrics in the Prometheus text exposition format.'''
+        lines = list[str]()
+        typed = set[str]()
+
+        def _type(name: str, type_: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} {type_}')
+
+        for (name, labels), value in self.counters.items():
+            _type(name := PREFIX + name, 'counter')
+            lines.append(f'{name}{_format(labels)} {_number(value)}')
+        for (name, labels), value in self.gauges.items():
+            _type(name := PREFIX + name, 'gauge')
+            lines.append(f'{name}{_format(labels)} {_number(value)}')
+        for (name, labels), histogram in self.histograms.items():
+            _type(name := PREFIX + name, 'histogram')
+            for le, count in histogram.cumulative():
+                le_ = (('le', '+Inf' if le == float('inf') else _number(le)),)
+                lines.append(f'{name}_bucket{_format(labels + le_)} {count}')
+            lines.append(f'{name}_sum{_format(labels)} {_number(histogram.sum)}')
+            lines.append(f'{name}_count{_format(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+def timed_hook(
+    func: Callable[_P, Awaitable[_T]],
+) -> Callable[_P, Awaitable[_T]]:
+    '''Observe the seconds of each call of a hook implementation in `METRICS`.
+
+    Labeled with the names of the plugin class and the hook.
+
+    With a `BufferedWriter`, as in the plugin, the write hooks return once the
+    operations are queued. The time in the DB is in `writer_op_duration_seconds`
+    and `writer_batch_duration_seconds`.
+    '''
+    plugin, hook = func.__qualname__.split('.')[-2:]
+    return METRICS.timed('hook_duration_seconds', plugin=plugin, hook=hook)(func)
+
+
+@contextmanager
+def pool_metrics(**engines: AsyncEngine) -> Iterator[None]:
+    '''Record the connection pools of the engines in `METRICS` in the block.
+
+    The checkouts are counted. The numbers of the connections checked out and
+    in overflow are gauges. SQLAlchemy has no event before a checkout; a pool
+    at its limit shows as `db_pool_checked_out` at `pool_size + max_overflow`.
+
+    The engines are labeled by the keyword, e.g., `pool_metrics(write=engine)`.
+    '''
+    listeners = list[tuple[Any, Callable[..., None]]]()
+    gauges = list[tuple[str, dict[str, str]]]()
+    seen = set[int]()
+    for name, engine in engines.items():
+        if id(engine) in seen:
+            continue
+        seen.add(id(engine))
+        labels = {'engine': name}
+        sync_engine = engine.sync_engine
+
+        def _checkout(*_: Any, labels: dict[str, str] = labels) -> None:
+            METRICS.inc('db_pool_checkouts_total', labels)
+
+        event.listen(sync_engine, 'checkout', _checkout)
+        listeners.append((sync_engine, _checkout))
+        if isinstance(pool := sync_engine.pool, QueuePool):
+            METRICS.set_gauge('db_pool_checked_out', pool.checkedout, labels)
+            METRICS.set_gauge('db_pool_overflow', pool.overflow, labels)
+            gauges.extend(
+                [('db_pool_checked_out', labels), ('db_pool_overflow', labels)]
+            )
+    try:
+        yield
+    finally:
+        for target, listener in listeners:
+            event.remove(target, 'checkout', listener)
+        for name, labels in gauges:
+            METRICS.remove_gauge(name, labels)
+
+
+def _labels(labels: Mapping[str, str] | None) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
@@ -5,11 +5,13 @@ __all__ = [
     'repr_val',
     'Hello',
     'Run',
+    'RunSummary',
     'Trace',
     'TraceCall',
     'Prompt',
     'CurrentScript',
     'Script',
+    'script_sha256',
     'Stdout',
 ]
 
@@ -18,7 +20,8 @@ from .base import NAMING_CONVENTION, Model, ReprMixin, repr_val
 from .model_hello import Hello
 from .model_prompt import Prompt
 from .model_run import Run
-from .model_script import CurrentScript, Script
+from .model_run_summary import RunSummary
+from .model_script import CurrentScript, Script, script_sha256
 from .model_stdout import Stdout
 from .model_trace import Trace
 from .model_trace_call import TraceCall
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Model
@@ -31,4 +31,8 @@ class Prompt(Model):
     trace_call_id: Mapped[int] = mapped_column(ForeignKey('trace_call.id'))
     trace_call: Mapped['TraceCall'] = relationship(back_populates='prompts')
 
-    __table_args__ = (UniqueConstraint("run_id", "prompt_no"),)
+    __table_args__ = (
+        UniqueConstraint("run_id", "prompt_no"),
+        Index('ix_prompt_trace_id_prompt_no', 'trace_id', 'prompt_no'),
+        Index('ix_prompt_trace_call_id_prompt_no', 'trace_call_id', 'prompt_no'),
+    )
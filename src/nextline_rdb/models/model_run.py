@@ -8,6 +8,7 @@ from .base import Model
 
 if TYPE_CHECKING:
     from .model_prompt import Prompt
+    from .model_run_summary import RunSummary
     from .model_script import Script
     from .model_stdout import Stdout
     from .model_trace import Trace
@@ -19,8 +20,8 @@ class Run(Model):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     run_no: Mapped[int] = mapped_column(unique=True)
     state: Mapped[str | None]
-    started_at: Mapped[datetime | None]
-    ended_at: Mapped[datetime | None]
+    started_at: Mapped[datetime | None] = mapped_column(index=True)
+    ended_at: Mapped[datetime | None] = mapped_column(index=True)
     exception: Mapped[str | None] = mapped_column(Text)
 
     script_id: Mapped[Optional[int]] = mapped_column(
@@ -40,3 +41,6 @@ class Run(Model):
     stdouts: Mapped[list["Stdout"]] = relationship(
         back_populates='run', cascade='all, delete-orphan'
     )
+    summary: Mapped[Optional['RunSummary']] = relationship(
+        back_populates='run', cascade='all, delete-orphan'
+    )
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from .base import Model
+
+if TYPE_CHECKING:
+    from .model_run import Run
+
+
+class RunSummary(Model):
+    '''The numbers of the rows of a run and the times of its first and last events.
+
+    Updated by the writer as the rows are written so that they are not counted.
+    The numbers are of the rows written. They are kept when the retention policy
+    deletes some of the rows, which sets `pruned_at`.
+    '''
+
+    __tablename__ = 'run_summary'
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    trace_count: Mapped[int] = mapped_column(default=0)
+    trace_call_count: Mapped[int] = mapped_column(default=0)
+    prompt_count: Mapped[int] = mapped_column(default=0)
+    stdout_count: Mapped[int] = mapped_column(default=0)
+    stdout_length: Mapped[int] = mapped_column(default=0)  # characters
+    max_concurrent_traces: Mapped[int] = mapped_column(default=0)
+
+    # Of the traces, trace calls, prompts, and stdouts
+    first_event_at: Mapped[datetime | None]
+    last_event_at: Mapped[datetime | None]
+
+    # When the retention policy last deleted rows of the run
+    pruned_at: Mapped[datetime | None]
+
+    run_id: Mapped[int] = mapped_column(ForeignKey('run.id'), unique=True)
+    run: Mapped['Run'] = relationship(back_populates='summary')
+
+    def record(self, at: Optional[datetime]) -> None:
+        '''Update the times of the first and last events with an event at `at`.'''
+        if at is None:
+            return
+        if self.first_event_at is None or at < self.first_event_at:
+            self.first_event_at = at
+        if self.last_event_at is None or at > self.last_event_at:
+            self.last_event_at = at
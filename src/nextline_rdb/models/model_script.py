@@ -1,7 +1,8 @@
+import hashlib
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import CheckConstraint, ForeignKey, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import CheckConstraint, ForeignKey, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from .base import Model
 
@@ -14,12 +15,22 @@ class Script(Model):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     script: Mapped[str] = mapped_column(Text)
 
+    # The SHA-256 hex digest of the script, set with the script. Unique so that
+    # each script is stored once and looked up by the index.
+    sha256: Mapped[str] = mapped_column(String(64), unique=True)
+
     runs: Mapped[list['Run']] = relationship(back_populates='script')
 
     _current: Mapped[Optional['CurrentScript']] = relationship(
         'CurrentScript', back_populates='script', cascade='all, delete-orphan'
     )
 
+    @validates('script')
+    def _set_sha256(self, key: str, script: str) -> str:
+        del key
+        self.sha256 = script_sha256(script)
+        return script
+
     @property
     def current(self) -> bool:
         '''True if this script is the current script.
@@ -36,6 +47,16 @@ class Script(Model):
             self._current = None
 
 
+def script_sha256(script: str) -> str:
+    '''The SHA-256 hex digest of the script encoded in UTF-8.
+
+    >>> script_sha256('')
+    'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+
+    '''
+    return hashlib.sha256(script.encode()).hexdigest()
+
+
 class CurrentScript(Model):
     '''The table that keeps track of the current script.
 
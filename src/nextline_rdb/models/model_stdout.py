@@ -1,9 +1,11 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from nextline_rdb.utils.compress import decompress_text
+
 from .base import Model
 
 if TYPE_CHECKING:
@@ -17,6 +19,11 @@ class Stdout(Model):
     text: Mapped[str | None]
     written_at: Mapped[datetime | None]
 
+    # If `compression` is set, e.g., to "zlib", the text is compressed in
+    # `text_compressed`, and `text` is None.
+    compression: Mapped[str | None]
+    text_compressed: Mapped[bytes | None]
+
     run_id: Mapped[int] = mapped_column(ForeignKey('run.id'))
     run: Mapped['Run'] = relationship(back_populates='stdouts')
 
@@ -24,3 +31,16 @@ class Stdout(Model):
     # that are not traced should still be recorded.
     trace_id: Mapped[int] = mapped_column(ForeignKey('trace.id'))
     trace: Mapped['Trace'] = relationship(back_populates='stdouts')
+
+    @property
+    def decompressed_text(self) -> str | None:
+        '''The text, decompressed if compressed.'''
+        if self.compression is None or self.text_compressed is None:
+            return self.text
+        return decompress_text(self.text_compressed, self.compression)
+
+    __table_args__ = (
+        Index('ix_stdout_run_id_id', 'run_id', 'id'),
+        Index('ix_stdout_run_id_written_at', 'run_id', 'written_at'),
+        Index('ix_stdout_trace_id_written_at', 'trace_id', 'written_at'),
+    )
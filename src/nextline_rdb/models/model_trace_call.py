@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Model
@@ -32,4 +32,10 @@ class TraceCall(Model):
         back_populates='trace_call', cascade='all, delete-orphan'
     )
 
-    __table_args__ = (UniqueConstraint('run_id', 'trace_call_no'),)
+    __table_args__ = (
+        UniqueConstraint('run_id', 'trace_call_no'),
+        Index('ix_trace_call_trace_id_trace_call_no', 'trace_id', 'trace_call_no'),
+        Index(
+            'ix_trace_call_run_id_file_name_line_no', 'run_id', 'file_name', 'line_no'
+        ),
+    )
@@ -158,17 +158,15 @@ def _st_script_list(draw: st.DrawFn, size: int) -> list[Script | None]:
     scripts = list[Script]()
     ret = list[Script | None]()
     for last, _ in mark_last(range(size)):
+        # A new script differs from the previous ones, which are stored once.
+        texts = {s.script for s in scripts}
+        st_new = st_model_script(current=False).filter(lambda s: s.script not in texts)
         if scripts:
-            script = draw(
-                st.one_of(
-                    st_none_or(st_model_script(current=False)),
-                    st.sampled_from(scripts),
-                )
-            )
+            script = draw(st.one_of(st_none_or(st_new), st.sampled_from(scripts)))
         else:
-            script = draw(st_none_or(st_model_script(current=False)))
-            if script is not None:
-                scripts.append(script)
+            script = draw(st_none_or(st_new))
+        if script is not None and script not in scripts:
+            scripts.append(script)
 
         if script is not None:
             script.current = last
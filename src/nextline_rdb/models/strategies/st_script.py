@@ -18,8 +18,14 @@ def st_model_script_list(
     min_size: int = 0,
     max_size: Optional[int] = None,
 ) -> list[Script]:
+    # Unique because each script is stored once
     scripts = draw(
-        st.lists(st_model_script(current=False), min_size=min_size, max_size=max_size)
+        st.lists(
+            st_model_script(current=False),
+            min_size=min_size,
+            max_size=max_size,
+            unique_by=lambda s: s.script,
+        )
     )
     if scripts:
         current = draw(st_none_or(st.sampled_from(scripts)))
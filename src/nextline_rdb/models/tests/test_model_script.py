@@ -13,7 +13,7 @@ async def test_at_most_one_current_script() -> None:
             session.add(current_script)
             await session.commit()
 
-            current_script = CurrentScript(script=Script(script=''))
+            current_script = CurrentScript(script=Script(script='pass'))
             session.add(current_script)
             with pytest.raises(IntegrityError):
                 await session.commit()
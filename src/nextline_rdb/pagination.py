@@ -1,9 +1,25 @@
 from collections.abc import Sequence
-from typing import Any, NamedTuple, Optional, Type, TypeVar
-
-from sqlalchemy import ScalarResult, func, select
+from typing import Any, NamedTuple, Optional, Type, TypeVar, cast
+
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    ScalarResult,
+    Table,
+    UniqueConstraint,
+    and_,
+    func,
+    inspect,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import DeclarativeBase, aliased, selectinload
+from sqlalchemy.orm import DeclarativeBase, aliased
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
 from sqlalchemy.sql.selectable import Select
 
 # import sqlparse
@@ -25,6 +41,21 @@ _Id = TypeVar('_Id')
 T = TypeVar('T', bound=DeclarativeBase)
 
 
+def sort_with_id(sort: Optional[Sort], id_field: str) -> Sort:
+    '''The sort with the primary key field last unless included.
+
+    The models are loaded in this order, which is unique.
+
+    >>> sort_with_id([SortField('run_no', desc=True)], 'id')
+    [SortField(field='run_no', desc=True), SortField(field='id', desc=False)]
+
+    '''
+    sort = list(sort or [])
+    if id_field not in {s.field for s in sort}:
+        sort.append(SortField(id_field))
+    return sort
+
+
 async def load_models(
     session: AsyncSession,
     Model: Type[T],
@@ -36,11 +67,18 @@ async def load_models(
     after: Optional[_Id] = None,
     first: Optional[int] = None,
     last: Optional[int] = None,
+    cursor_values: Optional[Sequence[Any]] = None,
+    options: Sequence[LoaderOption] = (),
 ) -> ScalarResult[T]:
-    sort = sort or []
+    '''Load a page of the models.
 
-    if id_field not in {s.field for s in sort}:
-        sort.append(SortField(id_field))
+    The `cursor_values` are the values of the fields of `sort_with_id()` at the
+    cursor as in `compose_statement()`.
+
+    The relationships are lazy loaded unless specified in `options`, e.g.,
+    `[selectinload(Model.parent)]`.
+    '''
+    sort = sort_with_id(sort, id_field)
 
     order_by = [
         f.desc() if d else f
@@ -56,15 +94,75 @@ async def load_models(
         after=after,
         first=first,
         last=last,
+        cursor_values=cursor_values,
     )
 
-    # TODO: Make this optional
-    stmt = stmt.options(selectinload('*'))
+    if options:
+        stmt = stmt.options(*options)
 
     models = await session.scalars(stmt)
     return models
 
 
+async def load_models_by_parent(
+    session: AsyncSession,
+    Model: Type[T],
+    id_field: str,
+    parent_field: str,
+    parent_ids: Sequence[_Id],
+    *,
+    sort: Optional[Sort] = None,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    options: Sequence[LoaderOption] = (),
+) -> dict[_Id, list[T]]:
+    '''Load the first or last models of each parent in one query.
+
+    The same as calling `load_models()` for each parent with `select_model`
+    filtered by `parent_field`, but without cursors. The models are numbered
+    with `row_number()` partitioned by the parent.
+
+    Returns
+    -------
+    dict
+        The models of each parent, keyed by the parent id.
+    '''
+    if first is not None and last is not None:
+        raise ValueError('Only either first or last is allowed')
+
+    sort = sort_with_id(sort, id_field)
+
+    backward = last is not None
+    limit = last if backward else first
+
+    # Reverse the order to take the last models
+    order_by = [
+        f.desc() if d != backward else f
+        for f, d in [(getattr(Model, s.field), s.desc) for s in sort]
+    ]
+
+    parent = getattr(Model, parent_field)
+    stmt = select(Model).where(parent.in_(parent_ids))
+    if limit is None:
+        stmt = stmt.order_by(*order_by)
+    else:
+        row_number = func.row_number().over(partition_by=parent, order_by=order_by)
+        cte = stmt.add_columns(row_number.label('row_number')).cte()
+        id_ = getattr(Model, id_field)
+        stmt = select(Model).join(cte, id_ == getattr(cte.c, id_field))
+        stmt = stmt.where(cte.c.row_number <= limit).order_by(cte.c.row_number)
+    if options:
+        stmt = stmt.options(*options)
+
+    ret = {id_: list[T]() for id_ in parent_ids}
+    for model in await session.scalars(stmt):
+        ret[getattr(model, parent_field)].append(model)
+    if backward:
+        for models in ret.values():
+            models.reverse()
+    return ret
+
+
 def compose_statement(
     Model: Type[T],
     id_field: str,
@@ -75,6 +173,7 @@ def compose_statement(
     after: Optional[_Id] = None,
     first: Optional[int] = None,
     last: Optional[int] = None,
+    cursor_values: Optional[Sequence[Any]] = None,
 ) -> Select[tuple[T]]:
     '''Return a SQL select statement for pagination.
 
@@ -97,12 +196,27 @@ def compose_statement(
         As in the GraphQL Cursor Connections Specification [1].
     last : optional
         As in the GraphQL Cursor Connections Specification [1].
+    cursor_values : optional
+        The values of `order_by` at the cursor, e.g., decoded from the cursor.
+        Only used in keyset pagination. If not provided, the values are looked
+        up by the primary key.
 
     Returns
     -------
     stmt
         The composed select statement for pagination.
 
+    Notes
+    -----
+    Keyset (seek) pagination is used if all `order_by` are non-nullable
+    columns of `Model`, they include the primary key, and the first one is
+    indexed. The rows after or before the cursor are selected by comparing the
+    columns with the values at the cursor, so that the cost does not grow with
+    the position in the table. The page continues even if the cursor row has
+    been deleted as long as `cursor_values` is provided. Otherwise, the rows are
+    numbered with `row_number()` over the whole selection, and the page is empty
+    if the cursor row has been deleted.
+
     Raises
     ------
     ValueError
@@ -132,6 +246,18 @@ def compose_statement(
     cursor = after if forward else before
     limit = first if forward else last
 
+    if (keys := _keyset_columns(Model, id_field, order_by)) is not None:
+        return _compose_keyset_statement(
+            Model,
+            id_field,
+            keys,
+            select_model=select_model,
+            cursor=cursor,
+            cursor_values=cursor_values,
+            limit=limit,
+            backward=backward,
+        )
+
     # A CTE (Common Table Expression) with a row_number column
     cte = select_model.add_columns(
         func.row_number().over(order_by=order_by).label('row_number')
@@ -161,10 +287,116 @@ def compose_statement(
             stmt = stmt.order_by(cte.c.row_number)
         stmt = stmt.limit(limit)
 
-    # Select only the model (not the row_number) and ensure the order
+    # Select only the model (not the row_number) and ensure the order. Join the
+    # model rather than aliasing the CTE so that loader options apply.
     cte = stmt.cte()
-    Alias = aliased(Model, cte)
-    stmt = select(Alias).select_from(cte)
+    id_ = getattr(Model, id_field)
+    stmt = select(Model).join(cte, id_ == getattr(cte.c, id_field))
     stmt = stmt.order_by(cte.c.row_number)
 
     return stmt
+
+
+_Key = tuple[Column, bool]  # (column, desc)
+
+
+def _keyset_columns(
+    Model: Type[T], id_field: str, order_by: Sequence[Any]
+) -> list[_Key] | None:
+    '''The columns and directions of `order_by` if keyset pagination can be used.'''
+    table = cast(Table, inspect(Model).local_table)
+    keys = list[_Key]()
+    for element in order_by:
+        desc = False
+        if isinstance(element, UnaryExpression):
+            if element.modifier not in (operators.desc_op, operators.asc_op):
+                return None
+            desc = element.modifier is operators.desc_op
+            element = element.element
+        element = getattr(element, 'expression', element)  # e.g., Model.id
+        if not isinstance(element, Column) or element.table is not table:
+            return None
+        column = table.c[element.key]
+        if column.nullable:
+            return None
+        keys.append((column, desc))
+
+    if not keys:
+        return None
+
+    if getattr(Model, id_field).expression.key not in {c.key for c, _ in keys}:
+        return None  # The order is not unique
+
+    # The first column or the leading column of a composite index or unique
+    # constraint, e.g., `run_id` of `(run_id, trace_no)`
+    first = keys[0][0]
+    uniques = [c for c in table.constraints if isinstance(c, UniqueConstraint)]
+    indexed = (
+        first.primary_key
+        or first.index
+        or first.unique
+        or any(next(iter(i.columns)) is first for i in table.indexes)
+        or any(next(iter(u.columns)) is first for u in uniques)
+    )
+    return keys if indexed else None
+
+
+def _compose_keyset_statement(
+    Model: Type[T],
+    id_field: str,
+    keys: Sequence[_Key],
+    *,
+    select_model: Select[tuple[T]],
+    cursor: Optional[_Id],
+    cursor_values: Optional[Sequence[Any]],
+    limit: Optional[int],
+    backward: bool,
+) -> Select[tuple[T]]:
+    # Reverse the order to select the rows before the cursor
+    keys_ = [(c, d != backward) for c, d in keys]
+
+    stmt = select_model
+    if cursor is not None:
+        at_cursor: list[Any]
+        if cursor_values is not None:
+            if len(cursor_values) != len(keys_):
+                raise ValueError(f'Not the values of the sort: {cursor_values!r}')
+            at_cursor = [literal(v, c.type) for (c, _), v in zip(keys_, cursor_values)]
+        else:
+            id_ = getattr(Model, id_field)
+            at_cursor = [
+                select(c).where(id_ == cursor).correlate(None).scalar_subquery()
+                for c, _ in keys_
+            ]
+        stmt = stmt.where(_after(keys_, at_cursor))
+    stmt = stmt.order_by(*(c.desc() if d else c for c, d in keys_))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    if not backward:
+        return stmt
+
+    # Restore the order. Join the model so that loader options apply.
+    subq = stmt.subquery()
+    id_ = getattr(Model, id_field)
+    stmt = select(Model).join(subq, id_ == getattr(subq.c, id_field))
+    columns = [subq.c[c.name] for c, _ in keys]
+    return stmt.order_by(*(c.desc() if d else c for c, (_, d) in zip(columns, keys)))
+
+
+def _after(keys: Sequence[_Key], values: Sequence[Any]) -> ColumnElement[bool]:
+    '''The condition that a row comes after the values in the order of the keys.
+
+    The row-value comparison is used if all directions are the same. Otherwise,
+    the lexicographic order is expanded into `OR` of `AND`.
+    '''
+    columns = [c for c, _ in keys]
+    if all(d for _, d in keys):
+        return tuple_(*columns) < tuple_(*values)
+    if not any(d for _, d in keys):
+        return tuple_(*columns) > tuple_(*values)
+    conditions = list[ColumnElement[bool]]()
+    for i, (column, desc) in enumerate(keys):
+        ties = [c == v for c, v in zip(columns[:i], values[:i])]
+        beyond = column < values[i] if desc else column > values[i]
+        conditions.append(and_(*ties, beyond))
+    return or_(*conditions)
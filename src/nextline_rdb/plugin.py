@@ -1,5 +1,5 @@
 from collections.abc import AsyncIterator, Mapping, MutableMapping
-from contextlib import asynccontextmanager
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, nullcontext
 from pathlib import Path
 from typing import Optional
 
@@ -8,9 +8,17 @@ from dynaconf import Dynaconf, Validator
 from nextline_graphql.hook import spec
 
 from . import write
-from .db import DB
+from .db import DB, SQLITE_PRAGMA_PROFILES
 from .init import initialize_nextline
+from .metrics import pool_metrics
+from .pubsub import Broker
+from .retention import Pruner, RetentionPolicy
 from .schema import Mutation, Query, Subscription
+from .schema.cache import CONTEXT_KEY as CACHE_CONTEXT_KEY
+from .schema.cache import ResponseCache
+from .schema.loaders import CONTEXT_KEY as LOADERS_CONTEXT_KEY
+from .schema.loaders import Loaders
+from .utils.compress import COMPRESSIONS
 
 HERE = Path(__file__).resolve().parent
 DEFAULT_CONFIG_PATH = HERE / 'default.toml'
@@ -19,7 +27,32 @@ assert DEFAULT_CONFIG_PATH.is_file()
 
 PRELOAD = (str(DEFAULT_CONFIG_PATH),)
 SETTINGS = ()
-VALIDATORS = (Validator("DB.URL", must_exist=True, is_type_of=str),)
+VALIDATORS = (
+    Validator("DB.URL", must_exist=True, is_type_of=str),
+    Validator("DB.READ_URL", is_type_of=str),
+    Validator("DB.SQLITE.PROFILE", is_in=tuple(SQLITE_PRAGMA_PROFILES)),
+    Validator("DB.SQLITE.PRAGMAS", is_type_of=dict),
+    Validator("DB.BUFFER.ENABLED", is_type_of=bool),
+    Validator("DB.BUFFER.MAX_BATCH_SIZE", is_type_of=int, gt=0),
+    Validator("DB.BUFFER.MAX_DELAY", is_type_of=(int, float), gte=0),
+    Validator("DB.BUFFER.MAX_QUEUE_SIZE", is_type_of=int, gte=0),
+    Validator("DB.STDOUT.COALESCE", is_type_of=bool),
+    Validator("DB.STDOUT.COALESCE_WINDOW", is_type_of=(int, float), gt=0),
+    Validator("DB.STDOUT.COALESCE_MAX_SIZE", is_type_of=int, gt=0),
+    Validator("DB.STDOUT.COMPRESSION", is_in=('', *COMPRESSIONS)),
+    Validator("DB.STDOUT.COMPRESSION_MIN_SIZE", is_type_of=int, gte=0),
+    Validator("DB.RETENTION.ENABLED", is_type_of=bool),
+    Validator("DB.RETENTION.INTERVAL", is_type_of=(int, float), gt=0),
+    Validator("DB.RETENTION.BATCH_SIZE", is_type_of=int, gt=0),
+    Validator("DB.RETENTION.KEEP_LAST_RUNS", is_type_of=int, gte=0),
+    Validator("DB.RETENTION.MAX_AGE_DAYS", is_type_of=(int, float), gte=0),
+    Validator("DB.RETENTION.MAX_STDOUTS_PER_RUN", is_type_of=int, gte=0),
+    Validator("DB.RETENTION.MAX_TRACE_CALLS_PER_RUN", is_type_of=int, gte=0),
+    Validator("DB.RETENTION.TRACE_CALL_MAX_AGE_DAYS", is_type_of=(int, float), gte=0),
+    Validator("DB.CACHE.ENABLED", is_type_of=bool),
+    Validator("DB.CACHE.MAX_ENTRIES", is_type_of=int, gt=0),
+    Validator("DB.CACHE.MAX_BYTES", is_type_of=int, gt=0),
+)
 
 
 class Plugin:
@@ -38,6 +71,22 @@ class Plugin:
     @spec.hookimpl
     def configure(self, settings: Dynaconf) -> None:
         self.url = settings.db['url']
+        self.read_url = settings.db['read_url'] or None
+        sqlite = settings.db['sqlite']
+        self.sqlite_pragmas = {
+            **SQLITE_PRAGMA_PROFILES[sqlite['profile']],
+            **{k.lower(): v for k, v in sqlite['pragmas'].items()},
+        }
+        self.buffer = settings.db['buffer']
+        stdout = settings.db['stdout']
+        self.stdout = write.StdoutOptions(
+            coalesce_window=stdout['coalesce_window'] if stdout['coalesce'] else None,
+            coalesce_max_size=stdout['coalesce_max_size'],
+            compression=stdout['compression'] or None,
+            compression_min_size=stdout['compression_min_size'],
+        )
+        self.retention = settings.db['retention']
+        self.cache = settings.db['cache']
 
     @spec.hookimpl
     def schema(self) -> tuple[type, type | None, type | None]:
@@ -47,12 +96,76 @@ class Plugin:
     @asynccontextmanager
     async def lifespan(self, context: Mapping) -> AsyncIterator[None]:
         nextline = context['nextline']
-        async with DB(self.url) as db:
+        db = DB(self.url, sqlite_pragmas=self.sqlite_pragmas, read_url=self.read_url)
+        async with db:
             self._db = db
+            self._broker = Broker()
+            self._cache = self._create_cache()
             await initialize_nextline(nextline, db)
-            write.register(nextline=nextline, db=self._db)
-            yield
+            with pool_metrics(write=db.engine, read=db.read_engine):
+                async with (
+                    self._create_writer(db) as writer,
+                    self._create_pruner(db),
+                ):
+                    close_stdout = write.register(
+                        nextline=nextline,
+                        db=db,
+                        writer=writer,
+                        stdout=self.stdout,
+                        broker=self._broker,
+                    )
+                    try:
+                        yield
+                    finally:
+                        await close_stdout()
+            self._broker.close()
+
+    def _create_writer(self, db: DB) -> write.Writer:
+        if not self.buffer['enabled']:
+            # Still a single task in the event order, one transaction per event
+            return write.BufferedWriter(
+                db,
+                max_batch_size=1,
+                max_delay=0,
+                max_queue_size=self.buffer['max_queue_size'],
+            )
+        return write.BufferedWriter(
+            db,
+            max_batch_size=self.buffer['max_batch_size'],
+            max_delay=self.buffer['max_delay'],
+            max_queue_size=self.buffer['max_queue_size'],
+        )
+
+    def _create_pruner(self, db: DB) -> AbstractAsyncContextManager:
+        if not self.retention['enabled']:
+            return nullcontext()
+        cache = self._cache
+
+        def _on_pruned(deleted: dict[str, int]) -> None:
+            del deleted
+            if cache is not None:
+                cache.clear()  # The pruned runs might have been cached
+
+        return Pruner(
+            db,
+            RetentionPolicy.from_settings(self.retention),
+            interval=self.retention['interval'],
+            batch_size=self.retention['batch_size'],
+            on_pruned=_on_pruned,
+        )
+
+    def _create_cache(self) -> Optional[ResponseCache]:
+        if not self.cache['enabled']:
+            return None
+        return ResponseCache(
+            max_entries=self.cache['max_entries'],
+            max_bytes=self.cache['max_bytes'],
+        )
 
     @spec.hookimpl
     def update_strawberry_context(self, context: MutableMapping) -> None:
         context['db'] = self._db
+        context['broker'] = self._broker
+        context[LOADERS_CONTEXT_KEY] = Loaders(self._db)
+        if self._cache is not None:
+            context[CACHE_CONTEXT_KEY] = self._cache
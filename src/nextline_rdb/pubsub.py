@@ -0,0 +1,158 @@
+'''Distribute the rows committed by the writer to the subscribers in the process.
+
+The writer publishes the rows after each commit. The GraphQL subscriptions
+build the nodes from them without querying the DB.
+
+>>> async def main():
+...     broker = Broker()
+...     async with broker.subscribe(RUN_ADDED) as subscriber:
+...         broker.publish(RUN_ADDED, 'run 1')
+...         broker.close()
+...         return [item async for item in subscriber]
+>>> asyncio.run(main())
+['run 1']
+
+'''
+
+import asyncio
+import enum
+from collections import defaultdict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Optional
+
+from nextline_rdb.metrics import METRICS
+from nextline_rdb.models import Prompt, Run, Stdout
+
+# The topics
+RUN_ADDED = 'run_added'
+RUN_UPDATED = 'run_updated'
+PROMPT_OPENED = 'prompt_opened'
+
+
+def stdout_appended(run_no: int) -> tuple[str, int]:
+    '''The topic of the stdouts of the run.'''
+    return ('stdout_appended', run_no)
+
+
+# The relationships of the published rows are not loaded. The items carry the
+# values that the nodes read from the relationships.
+
+
+@dataclass(frozen=True)
+class RunChanged:
+    run: Run
+    script: Optional[str]
+
+
+@dataclass(frozen=True)
+class StdoutAppended:
+    stdout: Stdout
+    run_no: int
+    trace_no: int
+
+
+@dataclass(frozen=True)
+class PromptOpened:
+    prompt: Prompt
+    run_no: int
+    trace_no: int
+    event: str
+    file_name: Optional[str]
+    line_no: Optional[int]
+
+
+DEFAULT_MAX_QUEUE_SIZE = 1_000
+
+
+class _End(enum.Enum):
+    END = object()
+
+
+_END = _End.END
+
+
+class Subscriber:
+    '''The items published to a topic. An async iterator.
+
+    Unsubscribed by `aclose()` or at the end of the `async with` block.
+    '''
+
+    def __init__(self, broker: 'Broker', topic: Hashable) -> None:
+        self._broker = broker
+        self.topic = topic
+        self.queue = asyncio.Queue[Any]()  # The size is checked by the broker
+
+    def __aiter__(self) -> 'Subscriber':
+        return self
+
+    async def __anext__(self) -> Any:
+        if (item := await self.queue.get()) is _END:
+            self.queue.put_nowait(_END)  # For the next call
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self) -> None:
+        self._broker._discard(self)
+
+    async def __aenter__(self) -> 'Subscriber':
+        return self
+
+    async def __aexit__(self, *_: Any, **__: Any) -> None:
+        await self.aclose()
+
+
+class Broker:
+    '''Publish items to the subscribers of the topic without waiting.
+
+    Each subscriber has its own queue of at most `max_queue_size` items. A
+    subscriber that falls further behind is unsubscribed with a warning; its
+    iterator ends, and the client can subscribe again.
+    '''
+
+    def __init__(self, max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE) -> None:
+        self._max_queue_size = max_queue_size
+        self._subscribers = defaultdict[Hashable, set[Subscriber]](set)
+        self._logger = getLogger(__name__)
+
+    def subscribe(self, topic: Hashable) -> Subscriber:
+        '''The items published to the topic from now on.'''
+        subscriber = Subscriber(self, topic)
+        self._subscribers[topic].add(subscriber)
+        return subscriber
+
+    def count(self, topic: Hashable) -> int:
+        '''The number of the subscribers of the topic.'''
+        return len(self._subscribers.get(topic, ()))
+
+    def publish(self, topic: Hashable, item: Any) -> None:
+        for subscriber in list(self._subscribers.get(topic, ())):
+            queue = subscriber.queue
+            if queue.qsize() < self._max_queue_size:
+                queue.put_nowait(item)
+                continue
+            self._logger.warning(f'Unsubscribed a slow subscriber of {topic!r}')
+            METRICS.inc('pubsub_dropped_subscribers_total')
+            # The items are dropped. The client will subscribe again anyway.
+            while not queue.empty():
+                queue.get_nowait()
+            self._end(subscriber)
+
+    def close(self) -> None:
+        '''End all subscriptions.'''
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                self._end(subscriber)
+
+    def _end(self, subscriber: Subscriber) -> None:
+        self._discard(subscriber)
+        subscriber.queue.put_nowait(_END)
+
+    def _discard(self, subscriber: Subscriber) -> None:
+        topic = subscriber.topic
+        if (subscribers := self._subscribers.get(topic)) is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[topic]
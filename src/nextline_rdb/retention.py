@@ -0,0 +1,349 @@
+'''Delete old data from the DB according to a retention policy.
+
+`prune()` deletes in batches, one transaction per batch, so that the writer is
+not blocked for long. `Pruner` calls it periodically in a background task.
+
+Only finished runs are pruned: runs that have ended and runs older than the
+latest run, which might have never ended, e.g., because the process crashed.
+The summaries of the runs whose rows are deleted are kept, i.e., they still
+count the deleted rows; their `pruned_at` is set.
+
+>>> async def main():
+...     async with DB() as db:
+...         async with db.session.begin() as session:
+...             session.add_all([Run(run_no=i, ended_at=NOW) for i in range(1, 6)])
+...         deleted = await prune(db, RetentionPolicy(keep_last_runs=2))
+...         async with db.session() as session:
+...             run_nos = (await session.scalars(select(Run.run_no))).all()
+...     return deleted['run'], run_nos
+>>> import asyncio
+>>> from nextline_rdb.db import DB
+>>> NOW = datetime.datetime(2024, 1, 1)
+>>> asyncio.run(main())
+(3, [4, 5])
+
+'''
+
+import asyncio
+import datetime
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Optional
+
+from sqlalchemy import ColumnElement, delete, func, or_, select, update
+
+from nextline_rdb.db import DB
+from nextline_rdb.delete import CHILD_MODELS
+from nextline_rdb.metrics import METRICS
+from nextline_rdb.models import Model, Prompt, Run, RunSummary, Stdout, TraceCall
+
+DEFAULT_BATCH_SIZE = 1_000  # rows per transaction
+
+# The pages freed by each `PRAGMA incremental_vacuum` of SQLite
+VACUUM_PAGES = 1_000
+
+# The runs deleted together, i.e., the size of the `IN` lists of the run IDs
+_RUN_GROUP_SIZE = 100
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    '''What to keep. `None` for no limit.'''
+
+    # The latest runs to keep. Older runs are deleted.
+    keep_last_runs: Optional[int] = None
+
+    # Runs that started longer ago than this are deleted.
+    max_age: Optional[datetime.timedelta] = None
+
+    # The stdouts and trace calls to keep in each run. The latest are kept.
+    # The prompts of the deleted trace calls are also deleted.
+    max_stdouts_per_run: Optional[int] = None
+    max_trace_calls_per_run: Optional[int] = None
+
+    # The trace calls and prompts of runs that started longer ago than this are
+    # deleted. The runs, traces, and stdouts are kept.
+    trace_call_max_age: Optional[datetime.timedelta] = None
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> 'RetentionPolicy':
+        '''From the `[db.retention]` settings, in which 0 is no limit.'''
+
+        def _days(days: float) -> Optional[datetime.timedelta]:
+            return datetime.timedelta(days=days) if days else None
+
+        return cls(
+            keep_last_runs=settings['keep_last_runs'] or None,
+            max_age=_days(settings['max_age_days']),
+            max_stdouts_per_run=settings['max_stdouts_per_run'] or None,
+            max_trace_calls_per_run=settings['max_trace_calls_per_run'] or None,
+            trace_call_max_age=_days(settings['trace_call_max_age_days']),
+        )
+
+
+async def prune(
+    db: DB,
+    policy: RetentionPolicy,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    now: Optional[datetime.datetime] = None,  # naive UTC
+) -> dict[str, int]:
+    '''Delete what the policy doesn't keep. Return the numbers of deleted rows.'''
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    batches = _Batches(db, batch_size)
+
+    # Before the deletions, which might delete the latest run
+    async with db.session() as session:
+        latest = (await session.execute(select(func.max(Run.run_no)))).scalar()
+    finished = _finished(latest)
+
+    for group in _groups(await _expired_run_ids(db, policy, now, finished)):
+        for model in CHILD_MODELS:
+            await batches.delete(model, model.run_id.in_(group))
+        await batches.delete(Run, Run.id.in_(group))
+
+    # The runs some of whose rows are deleted
+    trimmed = set[int]()
+
+    if (cutoff := _cutoff(now, policy.trace_call_max_age)) is not None:
+        stmt = select(Run.id).where(finished, Run.started_at < cutoff)
+        async with db.session() as session:
+            run_ids = (await session.scalars(stmt)).all()
+        for group in _groups(run_ids):
+            n = await batches.delete(Prompt, Prompt.run_id.in_(group))
+            n += await batches.delete(TraceCall, TraceCall.run_id.in_(group))
+            if n:
+                trimmed.update(group)
+
+    if (max_ := policy.max_trace_calls_per_run) is not None:
+        for run_id, cutoff_no in await _cutoffs(
+            db, TraceCall.trace_call_no, max_, finished
+        ):
+            old = select(TraceCall.id).where(
+                TraceCall.run_id == run_id, TraceCall.trace_call_no < cutoff_no
+            )
+            await batches.delete(
+                Prompt, Prompt.run_id == run_id, Prompt.trace_call_id.in_(old)
+            )
+            await batches.delete(
+                TraceCall,
+                TraceCall.run_id == run_id,
+                TraceCall.trace_call_no < cutoff_no,
+            )
+            trimmed.add(run_id)
+
+    if (max_ := policy.max_stdouts_per_run) is not None:
+        for run_id, cutoff_id in await _cutoffs(db, Stdout.id, max_, finished):
+            await batches.delete(Stdout, Stdout.run_id == run_id, Stdout.id < cutoff_id)
+            trimmed.add(run_id)
+
+    for group in _groups(sorted(trimmed)):
+        async with db.session.begin() as session:
+            await session.execute(
+                update(RunSummary)
+                .where(RunSummary.run_id.in_(group))
+                .values(pruned_at=now)
+            )
+
+    if any(batches.deleted.values()):
+        await incremental_vacuum(db)
+    return batches.deleted
+
+
+async def incremental_vacuum(db: DB, pages: int = VACUUM_PAGES) -> int:
+    '''Return the free pages of SQLite to the file system. Return the pages freed.
+
+    Only if `auto_vacuum` is `INCREMENTAL`, which takes effect on a new DB file
+    or after `VACUUM`. The pages are freed in steps of `pages`, one transaction
+    each. Nothing is done for other databases.
+    '''
+    if db.engine.dialect.name != 'sqlite':
+        return 0
+    async with db.engine.connect() as conn:
+
+        async def _pragma(statement: str) -> Any:
+            return (await conn.exec_driver_sql(f'PRAGMA {statement}')).scalar()
+
+        if await _pragma('auto_vacuum') != 2:  # INCREMENTAL
+            return 0
+        start = free = await _pragma('freelist_count')
+        while free:
+            await conn.exec_driver_sql(f'PRAGMA incremental_vacuum({pages:d})')
+            await conn.commit()
+            free = await _pragma('freelist_count')
+            await asyncio.sleep(0)
+        return start - free
+
+
+class Pruner:
+    '''Call `prune()` every `interval` seconds in a background task.
+
+    >>> async def main():
+    ...     async with DB() as db:
+    ...         async with Pruner(db, RetentionPolicy(), interval=3600) as pruner:
+    ...             await pruner.wait()
+    ...         return pruner.deleted
+    >>> asyncio.run(main())
+    {}
+
+    '''
+
+    def __init__(
+        self,
+        db: DB,
+        policy: RetentionPolicy,
+        interval: float = 3600.0,  # seconds
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_pruned: Optional[Callable[[dict[str, int]], None]] = None,
+    ) -> None:
+        self._db = db
+        self._policy = policy
+        self._interval = interval
+        self._batch_size = batch_size
+        self._on_pruned = on_pruned  # Called with the numbers of deleted rows
+        self._pruned = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._logger = getLogger(__name__)
+        self.deleted = dict[str, int]()  # The total numbers of the deleted rows
+
+    async def wait(self) -> None:
+        '''Wait until the first pruning since the start is done.'''
+        await self._pruned.wait()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def __aenter__(self) -> 'Pruner':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_: Any, **__: Any) -> None:
+        await self.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                deleted = await prune(self._db, self._policy, self._batch_size)
+            except Exception:
+                self._logger.exception('Failed to prune the DB')
+            else:
+                for table, n in deleted.items():
+                    self.deleted[table] = self.deleted.get(table, 0) + n
+                if deleted:
+                    self._logger.info(f'Pruned the DB: {deleted}')
+                    if self._on_pruned is not None:
+                        self._on_pruned(deleted)
+            self._pruned.set()
+            await asyncio.sleep(self._interval)
+
+
+class _Batches:
+    def __init__(self, db: DB, batch_size: int) -> None:
+        self._db = db
+        self._batch_size = batch_size
+        self.deleted = dict[str, int]()
+
+    async def delete(self, model: type[Model], *where: ColumnElement[bool]) -> int:
+        '''Delete the rows in batches, one transaction per batch.
+
+        Return the number of the deleted rows.
+        '''
+        table = model.__tablename__
+        id_ = model.id  # type: ignore[attr-defined]
+        total = 0
+        while True:
+            chunk = select(id_).where(*where).limit(self._batch_size)
+            async with self._db.session.begin() as session:
+                result = await session.execute(
+                    delete(model).where(id_.in_(chunk)),
+                    execution_options={'synchronize_session': False},
+                )
+            rowcount: int = result.rowcount  # type: ignore[attr-defined]
+            if rowcount:
+                total += rowcount
+                self.deleted[table] = self.deleted.get(table, 0) + rowcount
+                METRICS.inc('retention_deleted_rows_total', {'table': table}, rowcount)
+            if rowcount < self._batch_size:
+                return total
+            await asyncio.sleep(0)  # Let the writer in
+
+
+def _cutoff(
+    now: datetime.datetime, age: Optional[datetime.timedelta]
+) -> Optional[datetime.datetime]:
+    '''The time `age` before `now`. `None` if no age or before the earliest time.'''
+    if age is None:
+        return None
+    try:
+        return now - age
+    except OverflowError:
+        return None
+
+
+def _finished(latest: Optional[int]) -> ColumnElement[bool]:
+    '''The runs that have ended or are older than the latest run `latest`.'''
+    if latest is None:
+        return Run.ended_at.is_not(None)
+    return or_(Run.ended_at.is_not(None), Run.run_no < latest)
+
+
+async def _expired_run_ids(
+    db: DB,
+    policy: RetentionPolicy,
+    now: datetime.datetime,
+    finished: ColumnElement[bool],
+) -> Sequence[int]:
+    conditions = list[ColumnElement[bool]]()
+    if policy.keep_last_runs is not None:
+        kept = select(Run.run_no).order_by(Run.run_no.desc())
+        conditions.append(Run.run_no.not_in(kept.limit(policy.keep_last_runs)))
+    if (cutoff := _cutoff(now, policy.max_age)) is not None:
+        conditions.append(Run.started_at < cutoff)
+    if not conditions:
+        return []
+    stmt = select(Run.id).where(finished, or_(*conditions)).order_by(Run.id)
+    async with db.session() as session:
+        return (await session.scalars(stmt)).all()
+
+
+async def _cutoffs(
+    db: DB, column: Any, max_: int, finished: ColumnElement[bool]
+) -> list[tuple[int, Any]]:
+    '''The run IDs and the values of the column of the oldest row to keep.
+
+    Only the finished runs with more than `max_` rows. The rows with smaller
+    values are to be deleted.
+    '''
+    model = column.class_
+    over = (
+        select(model.run_id)
+        .where(model.run_id.in_(select(Run.id).where(finished)))
+        .group_by(model.run_id)
+        .having(func.count() > max_)
+    )
+    ret = list[tuple[int, Any]]()
+    async with db.session() as session:
+        for run_id in (await session.scalars(over)).all():
+            stmt = (
+                select(column)
+                .where(model.run_id == run_id)
+                .order_by(column.desc())
+                .offset(max_ - 1)
+                .limit(1)
+            )
+            ret.append((run_id, (await session.execute(stmt)).scalar_one()))
+    return ret
+
+
+def _groups(ids: Sequence[int]) -> list[Sequence[int]]:
+    return [ids[i : i + _RUN_GROUP_SIZE] for i in range(0, len(ids), _RUN_GROUP_SIZE)]
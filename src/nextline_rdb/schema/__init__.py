@@ -1,10 +1,5 @@
 __all__ = ['Query', 'Mutation', 'Subscription']
-import strawberry
 
 from .mutation import Mutation
 from .query import Query
-
-
-@strawberry.type
-class Subscription:
-    pass
+from .subscription import Subscription
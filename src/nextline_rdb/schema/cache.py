@@ -0,0 +1,191 @@
+'''Cache the pages of the connections of the finished runs.
+
+The traces, trace calls, prompts, and stdouts of a run don't change after the
+run has finished. The pages of their connections in `RunNode` are cached in an
+LRU cache in the process, which is bounded by the number of the pages and their
+estimated size in bytes.
+
+The cache is in the context of the GraphQL requests under the key "cache". The
+pages are not cached if it is not in the context.
+
+The pages of a run are invalidated when the run is deleted. The whole cache is
+cleared when the DB is pruned by the retention policy.
+'''
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from typing import Any, Optional, TypeVar, cast
+
+from sqlalchemy import inspect
+from strawberry.types import Info
+
+from nextline_rdb.metrics import METRICS
+from nextline_rdb.models import Model, Run
+
+from .pagination import Connection
+
+_T = TypeVar('_T')
+
+CONTEXT_KEY = 'cache'
+
+DEFAULT_MAX_ENTRIES = 1_000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# The estimated sizes of an edge and an ORM instance in addition to the strings
+_EDGE_OVERHEAD = 500  # bytes
+_MODEL_OVERHEAD = 500  # bytes
+
+
+class ResponseCache:
+    '''An LRU cache of the values of the runs.
+
+    >>> cache = ResponseCache(max_entries=2)
+    >>> cache.put(('traces', 1), 1, 'a', size=10)
+    >>> cache.put(('traces', 2), 2, 'b', size=10)
+    >>> cache.get(('traces', 1))
+    'a'
+    >>> cache.put(('prompts', 1), 1, 'c', size=10)  # Evict the least recent
+    >>> cache.get(('traces', 2)) is None
+    True
+    >>> cache.invalidate([1])
+    >>> len(cache)
+    0
+
+    '''
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict[Hashable, tuple[int, Any, int]]()
+        self._keys_by_run = dict[int, set[Hashable]]()
+        self.nbytes = 0
+
+        # Incremented at every invalidation. A value loaded while the cache is
+        # invalidated is not put as it might have been loaded from a deleted run.
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        '''The value of the key or `None`. The key becomes the most recent.'''
+        if (entry := self._entries.get(key)) is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(
+        self,
+        key: Hashable,
+        run_id: int,
+        value: Any,
+        size: int,
+        generation: Optional[int] = None,
+    ) -> None:
+        '''Cache the value of the run with the estimated size in bytes.
+
+        Not cached if `generation` is given and the cache has been invalidated
+        since, or if the value is larger than the cache.
+        '''
+        if generation is not None and generation != self.generation:
+            return
+        if size > self._max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (run_id, value, size)
+        self._keys_by_run.setdefault(run_id, set()).add(key)
+        self.nbytes += size
+        while len(self._entries) > self._max_entries or self.nbytes > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+            METRICS.inc('response_cache_evictions_total')
+
+    def invalidate(self, run_ids: Iterable[int]) -> None:
+        '''Remove the values of the runs.'''
+        self.generation += 1
+        for run_id in run_ids:
+            for key in list(self._keys_by_run.get(run_id, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._keys_by_run.clear()
+        self.nbytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        if (entry := self._entries.pop(key, None)) is None:
+            return
+        run_id, _, size = entry
+        self.nbytes -= size
+        keys = self._keys_by_run[run_id]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_run[run_id]
+
+
+async def cached_connection(
+    info: Info,
+    resolver: str,
+    run: Run,
+    args: Hashable,
+    load: Callable[[], Awaitable[Connection[_T]]],
+) -> Connection[_T]:
+    '''The connection of the run from the cache if the run has finished.
+
+    Otherwise, or if not in the cache, the connection is loaded by `load()`.
+    The `args` are everything else that the connection depends on, e.g., the
+    cursor, the sort, and the selection.
+    '''
+    cache = cast(Optional[ResponseCache], info.context.get(CONTEXT_KEY))
+    if cache is None or run.state != 'finished':
+        return await load()
+    key = (resolver, run.id, args)
+    if (connection := cache.get(key)) is not None:
+        METRICS.inc('response_cache_hits_total', {'resolver': resolver})
+        return connection
+    METRICS.inc('response_cache_misses_total', {'resolver': resolver})
+    generation = cache.generation
+    connection = await load()
+    size = estimate_size(connection)
+    cache.put(key, run.id, connection, size, generation=generation)
+    return connection
+
+
+def estimate_size(connection: Connection[Any]) -> int:
+    '''A rough size of the connection in bytes, mostly the strings in the nodes.
+
+    The ORM instances in the nodes are included with the attributes and the
+    relationships loaded in them, e.g., the script of the run of a trace. Each
+    object is counted once however many nodes refer to it.
+    '''
+    size = 0
+    seen = set[int]()
+    for edge in connection.edges:
+        size += _EDGE_OVERHEAD + len(edge.cursor)
+        size += _size(vars(edge.node).values(), seen)
+    return size
+
+
+def _size(values: Iterable[Any], seen: set[int]) -> int:
+    '''The size of the strings and the ORM instances in `values` not in `seen`.'''
+    size = 0
+    for value in values:
+        if id(value) in seen:
+            continue
+        if isinstance(value, (str, bytes)):
+            seen.add(id(value))
+            size += len(value)
+        elif isinstance(value, Model):
+            seen.add(id(value))
+            state = inspect(value)
+            loaded = (
+                state.dict[k] for k in state.mapper.attrs.keys() if k in state.dict
+            )
+            size += _MODEL_OVERHEAD + _size(loaded, seen)
+        elif isinstance(value, list):  # A collection of a relationship
+            size += _size(value, seen)
+    return size
@@ -0,0 +1,176 @@
+'''Batch the nested connections of sibling nodes with data loaders.
+
+When a list of nodes is resolved, e.g., the runs in
+
+    { rdb { runs { edges { node { traces { edges { node { traceNo } } } } } } } }
+
+the connection `traces` is resolved for each run. The resolvers of the same
+field with the same arguments are batched into one query for all the runs
+instead of one query per run.
+
+The plugin puts a new `Loaders` in the context of each request, or of each
+connection for a websocket, in which case it is reused across the operations.
+The loaders are therefore keyed by the selections as well as the arguments.
+'''
+
+from collections.abc import Callable, Hashable, Sequence
+from typing import Any, Optional, Type, TypeVar, cast
+
+from sqlalchemy import select
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm.interfaces import LoaderOption
+from strawberry.dataloader import DataLoader
+from strawberry.types import Info
+
+from nextline_rdb.db import DB
+from nextline_rdb.pagination import Sort
+
+from .pagination import Connection, load_connection
+from .pagination.db import load_connections_by_parent
+from .selection import selected_fields, selection_key
+
+_M = TypeVar('_M', bound=DeclarativeBase)  # Model
+_N = TypeVar('_N')  # Node
+
+CONTEXT_KEY = 'loaders'
+
+
+class Loaders:
+    '''The data loaders of a request, one for each field and arguments.
+
+    The loaders only batch. They don't cache the results so that the same
+    instance can be reused, e.g., in a subscription.
+    '''
+
+    def __init__(self, db: DB) -> None:
+        self._db = db
+        self._loaders = dict[Hashable, DataLoader[Any, Any]]()
+
+    def __len__(self) -> int:
+        return len(self._loaders)
+
+    def connection(
+        self,
+        key: Hashable,
+        Model: Type[_M],
+        create_node_from_model: Callable[[_M], _N],
+        parent_field: str,
+        *,
+        sort: Optional[Sort] = None,
+        first: Optional[int] = None,
+        last: Optional[int] = None,
+        total_count: bool = True,
+        options: Sequence[LoaderOption] = (),
+    ) -> DataLoader[Any, Connection[_N]]:
+        '''The loader of the connections of `Model` by the parent id.
+
+        A new loader is created for a new `key`.
+        '''
+        if (loader := self._loaders.get(key)) is not None:
+            return loader
+
+        async def _load(parent_ids: list[Any]) -> list[Connection[_N]]:
+            async with self._db.read_session() as session:
+                return await load_connections_by_parent(
+                    session,
+                    Model,
+                    create_node_from_model,
+                    parent_field,
+                    parent_ids,
+                    sort=sort,
+                    first=first,
+                    last=last,
+                    total_count=total_count,
+                    options=options,
+                )
+
+        loader = self._loaders[key] = DataLoader(load_fn=_load, cache=False)
+        return loader
+
+
+def get_loaders(info: Info) -> Loaders:
+    '''The data loaders in the context.
+
+    Created at the first call if not put in the context by the plugin, e.g., in
+    the tests.
+    '''
+    context = info.context
+    if (loaders := context.get(CONTEXT_KEY)) is None:
+        loaders = context[CONTEXT_KEY] = Loaders(cast(DB, context['db']))
+    return loaders
+
+
+async def load_nested_connection(
+    info: Info,
+    Model: Type[_M],
+    create_node_from_model: Callable[[_M], _N],
+    parent_field: str,
+    parent_id: Any,
+    *,
+    sort: Optional[Sort] = None,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    total_count: bool = True,
+    options: Sequence[LoaderOption] = (),
+) -> Connection[_N]:
+    '''Load the connection of `Model` whose `parent_field` is `parent_id`.
+
+    The connections of the sibling nodes are loaded in one batch unless a
+    cursor is given, in which case the connection is loaded by itself.
+    '''
+    cursor = before is not None or after is not None
+    if cursor or (first is not None and last is not None):  # The latter is an error
+        db = cast(DB, info.context['db'])
+        select_model = select(Model).where(getattr(Model, parent_field) == parent_id)
+        async with db.read_session() as session:
+            return await load_connection(
+                session,
+                Model,
+                create_node_from_model=create_node_from_model,
+                select_model=select_model,
+                sort=sort,
+                before=before,
+                after=after,
+                first=first,
+                last=last,
+                total_count=total_count,
+                options=options,
+            )
+
+    key = (
+        _field_path(info),
+        Model,
+        parent_field,
+        tuple(sort or ()),
+        first,
+        last,
+        total_count,
+        # The options are from the selections, which can differ in another
+        # operation with the same context
+        selection_key(selected_fields(info, 'edges', 'node')),
+    )
+    loader = get_loaders(info).connection(
+        key,
+        Model,
+        create_node_from_model,
+        parent_field,
+        sort=sort,
+        first=first,
+        last=last,
+        total_count=total_count,
+        options=options,
+    )
+    return await loader.load(parent_id)
+
+
+def _field_path(info: Info) -> tuple[str, ...]:
+    '''The path to the field without the list indices, e.g.,
+
+    `('rdb', 'runs', 'edges', 'node', 'traces')`
+
+    In an operation, the field at the same path has the same arguments and
+    selections for all the sibling nodes.
+    '''
+    return tuple(k for k in info.path.as_list() if isinstance(k, str))
@@ -0,0 +1,69 @@
+import strawberry
+
+from nextline_rdb.metrics import METRICS, PREFIX, Histogram, Labels
+
+
+@strawberry.type
+class MetricLabel:
+    name: str
+    value: str
+
+
+@strawberry.type
+class MetricValue:
+    name: str
+    labels: list[MetricLabel]
+    value: float
+
+
+@strawberry.type
+class MetricBucket:
+    le: float  # The upper bound. The bucket of +Inf is omitted; see `count`.
+    count: int  # Cumulative
+
+
+@strawberry.type
+class MetricHistogram:
+    name: str
+    labels: list[MetricLabel]
+    count: int
+    sum: float
+    buckets: list[MetricBucket]
+
+
+@strawberry.type
+class MetricsRDB:
+    counters: list[MetricValue]
+    gauges: list[MetricValue]
+    histograms: list[MetricHistogram]
+    prometheus: str  # The Prometheus text exposition format
+
+
+def resolve_metrics() -> MetricsRDB:
+    return MetricsRDB(
+        counters=[_value(n, l, v) for (n, l), v in METRICS.counters.items()],
+        gauges=[_value(n, l, v) for (n, l), v in METRICS.gauges.items()],
+        histograms=[_histogram(n, l, h) for (n, l), h in METRICS.histograms.items()],
+        prometheus=METRICS.to_prometheus(),
+    )
+
+
+def _labels(labels: Labels) -> list[MetricLabel]:
+    return [MetricLabel(name=k, value=v) for k, v in labels]
+
+
+def _value(name: str, labels: Labels, value: float) -> MetricValue:
+    return MetricValue(name=PREFIX + name, labels=_labels(labels), value=value)
+
+
+def _histogram(name: str, labels: Labels, histogram: Histogram) -> MetricHistogram:
+    return MetricHistogram(
+        name=PREFIX + name,
+        labels=_labels(labels),
+        count=histogram.count,
+        sum=histogram.sum,
+        buckets=[
+            MetricBucket(le=le, count=count)
+            for le, count in histogram.cumulative()[:-1]
+        ],
+    )
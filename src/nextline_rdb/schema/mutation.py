@@ -1,23 +1,32 @@
-from typing import cast
+from logging import getLogger
+from typing import Optional, cast
 
 import strawberry
-from sqlalchemy import select
 from strawberry.types import Info
 
 from nextline_rdb.db import DB
-from nextline_rdb.models import Run
+from nextline_rdb.delete import DeleteProgress, delete_runs
+
+from .cache import CONTEXT_KEY, ResponseCache
 
 
 async def mutate_delete_runs(info: Info, ids: list[int]) -> list[int]:
     db = cast(DB, info.context['db'])
-    async with db.session.begin() as session:
-        stmt = select(Run).filter(Run.id.in_(ids))
-        runs = (await session.execute(stmt)).scalars().all()
-        # ic(runs)
-        for run in runs:
-            await session.delete(run)
-        ret = [run.id for run in runs]
-    return ret
+    logger = getLogger(__name__)
+
+    def _progress(progress: DeleteProgress) -> None:
+        logger.info(
+            f'Deleting run {progress.run_id} '
+            f'({progress.runs_done}/{progress.runs_total} runs done): '
+            f'{progress.deleted}/{progress.total} rows from {progress.table!r}'
+        )
+
+    try:
+        return await delete_runs(db, ids, progress=_progress)
+    finally:
+        cache = cast(Optional[ResponseCache], info.context.get(CONTEXT_KEY))
+        if cache is not None:
+            cache.invalidate(ids)
 
 
 @strawberry.type
@@ -1,13 +1,18 @@
 __all__ = [
     'PromptNode',
     'RunNode',
+    'RunSummaryNode',
     'StdoutNode',
+    'TraceCallGroupBy',
     'TraceCallNode',
+    'TraceCallStatNode',
     'TraceNode',
 ]
 
 from .prompt_node import PromptNode
 from .run_node import RunNode
+from .run_summary_node import RunSummaryNode
 from .stdout_node import StdoutNode
 from .trace_call_node import TraceCallNode
+from .trace_call_stat_node import TraceCallGroupBy, TraceCallStatNode
 from .trace_node import TraceNode
@@ -0,0 +1,87 @@
+from collections.abc import Iterable
+from typing import Any, cast
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+from strawberry.types import Info
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Prompt, Run, Stdout, Trace, TraceCall
+
+from ..selection import SelectedField, selected_fields, subfields
+
+# The to-one relationships of the models by the names of the node fields. They
+# are read in `from_model()` of the nodes except for those in `_IF_SELECTED`.
+_RELATIONSHIPS: dict[type, dict[str, Any]] = {
+    Run: {'script': Run.script, 'summary': Run.summary},
+    Trace: {'run': Trace.run},
+    TraceCall: {'run': TraceCall.run, 'trace': TraceCall.trace},
+    Prompt: {'run': Prompt.run, 'trace': Prompt.trace, 'traceCall': Prompt.trace_call},
+    Stdout: {'run': Stdout.run, 'trace': Stdout.trace},
+}
+
+# Loaded only if the field is selected, e.g., the script can be long.
+_IF_SELECTED = {Run.script, Run.summary}
+
+# Also loaded if `totalCount` of these connections is selected. It is read
+# from the summary instead of counted.
+_TOTAL_COUNTS = {Run.summary: ('traces', 'traceCalls', 'prompts', 'stdouts')}
+
+
+def load_options(Model: type, fields: Iterable[SelectedField]) -> list[LoaderOption]:
+    '''The loader options for the nodes of `Model` with the selected fields.
+
+    Only the relationships that the nodes read or the selected fields resolve
+    are eagerly loaded, e.g., the run and trace of each trace call and, if the
+    field `run` is selected, the script of the run.
+
+    >>> load_options(Run, [])
+    []
+
+    '''
+    fields = list(fields)
+    names = {f.name for f in fields}
+    options = list[LoaderOption]()
+    for name, relationship in _RELATIONSHIPS.get(Model, {}).items():
+        if (
+            relationship in _IF_SELECTED
+            and name not in names
+            and not _total_count_selected(fields, relationship)
+        ):
+            continue
+        option = selectinload(relationship)
+        if sub := subfields(fields, name):
+            target = relationship.property.mapper.class_
+            nested = cast(list[Any], load_options(target, sub))
+            option = option.options(*nested)
+        options.append(option)
+    return options
+
+
+def _total_count_selected(fields: list[SelectedField], relationship: Any) -> bool:
+    connections = _TOTAL_COUNTS.get(relationship, ())
+    return any(
+        f.name == 'totalCount'
+        for connection in connections
+        for f in subfields(fields, connection)
+    )
+
+
+async def load_to_one(info: Info, model: Any, name: str) -> Any:
+    '''The related row of the relationship `name` of `model`.
+
+    The row is queried if the relationship is not loaded, e.g., in the nodes
+    pushed by the subscriptions.
+    '''
+    if name not in inspect(model).unloaded:
+        return getattr(model, name)
+    relationship = inspect(type(model)).relationships[name]
+    (column,) = relationship.local_columns
+    Target = relationship.mapper.class_
+    db = cast(DB, info.context['db'])
+    async with db.read_session() as session:
+        options = load_options(Target, selected_fields(info))
+        return await session.get_one(
+            Target, getattr(model, column.key), options=options
+        )
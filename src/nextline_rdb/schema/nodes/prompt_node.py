@@ -2,9 +2,12 @@ import datetime
 from typing import TYPE_CHECKING, Annotated, Optional
 
 import strawberry
+from strawberry.types import Info
 
 from nextline_rdb import models as db_models
 
+from .options import load_to_one
+
 if TYPE_CHECKING:
     from .run_node import RunNode
     from .trace_call_node import TraceCallNode
@@ -28,24 +31,29 @@ class PromptNode:
     ended_at: Optional[datetime.datetime] = None
 
     @strawberry.field
-    def run(self) -> Annotated['RunNode', strawberry.lazy('.run_node')]:
+    async def run(
+        self, info: Info
+    ) -> Annotated['RunNode', strawberry.lazy('.run_node')]:
         from .run_node import RunNode
 
-        return RunNode.from_model(self._model.run)
+        return RunNode.from_model(await load_to_one(info, self._model, 'run'))
 
     @strawberry.field
-    def trace(self) -> Annotated['TraceNode', strawberry.lazy('.trace_node')]:
+    async def trace(
+        self, info: Info
+    ) -> Annotated['TraceNode', strawberry.lazy('.trace_node')]:
         from .trace_node import TraceNode
 
-        return TraceNode.from_model(self._model.trace)
+        return TraceNode.from_model(await load_to_one(info, self._model, 'trace'))
 
     @strawberry.field
-    def trace_call(
-        self,
+    async def trace_call(
+        self, info: Info
     ) -> Annotated['TraceCallNode', strawberry.lazy('.trace_call_node')]:
         from .trace_call_node import TraceCallNode
 
-        return TraceCallNode.from_model(self._model.trace_call)
+        model = await load_to_one(info, self._model, 'trace_call')
+        return TraceCallNode.from_model(model)
 
     @classmethod
     def from_model(cls: type['PromptNode'], model: db_models.Prompt) -> 'PromptNode':
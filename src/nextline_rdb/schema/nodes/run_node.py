@@ -2,14 +2,22 @@ import datetime
 from typing import TYPE_CHECKING, Annotated, Optional, cast
 
 import strawberry
-from sqlalchemy import select
+from sqlalchemy import inspect, select
 from strawberry.types import Info
 
 from nextline_rdb.db import DB
-from nextline_rdb.models import Prompt, Run, Stdout, Trace, TraceCall
+from nextline_rdb.metrics import METRICS
+from nextline_rdb.models import Prompt, Run, RunSummary, Stdout, Trace, TraceCall
 from nextline_rdb.pagination import SortField
 
-from ..pagination import Connection, load_connection
+from ..cache import cached_connection
+from ..loaders import load_nested_connection
+from ..pagination import Connection
+from ..selection import selected_fields, selected_names, selection_key
+from ..stats import DEFAULT_GROUP_BY, load_trace_call_stats
+from .options import load_options, load_to_one
+from .run_summary_node import RunSummaryNode
+from .trace_call_stat_node import TraceCallGroupBy, TraceCallStatNode
 
 if TYPE_CHECKING:
     from .prompt_node import PromptNode
@@ -18,6 +26,20 @@ if TYPE_CHECKING:
     from .trace_node import TraceNode
 
 
+def _loaded_summary(run: Run) -> Optional[RunSummary]:
+    '''The summary of the run if loaded, from which `totalCount` is read.
+
+    `None` if rows of the run have been pruned, after which the summary counts
+    more rows than in the DB.
+    '''
+    if 'summary' in inspect(run).unloaded:
+        return None
+    if (summary := run.summary) is None or summary.pruned_at is not None:
+        return None
+    return summary
+
+
+@METRICS.timed('resolver_duration_seconds', resolver='RunNode.traces')
 async def _resolve_traces(
     info: Info,
     root: 'RunNode',
@@ -29,22 +51,34 @@ async def _resolve_traces(
     from .trace_node import TraceNode
 
     sort = [SortField('trace_no')]
-    select_model = select(Trace).where(Trace.run_id == root._model.id)
-    db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        return await load_connection(
-            session,
+    total_count = 'totalCount' in selected_names(info)
+    fields = selected_fields(info, 'edges', 'node')
+    summary = _loaded_summary(root._model)
+
+    async def _load() -> Connection['TraceNode']:
+        connection = await load_nested_connection(
+            info,
             Trace,
             create_node_from_model=TraceNode.from_model,
-            select_model=select_model,
+            parent_field='run_id',
+            parent_id=root._model.id,
             sort=sort,
             before=before,
             after=after,
             first=first,
             last=last,
+            total_count=total_count and summary is None,
+            options=load_options(Trace, fields),
         )
+        if total_count and summary is not None:
+            connection.total_count = summary.trace_count
+        return connection
+
+    args = (tuple(sort), before, after, first, last, total_count, selection_key(fields))
+    return await cached_connection(info, 'RunNode.traces', root._model, args, _load)
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='RunNode.traceCalls')
 async def _resolve_trace_calls(
     info: Info,
     root: 'RunNode',
@@ -56,22 +90,34 @@ async def _resolve_trace_calls(
     from .trace_call_node import TraceCallNode
 
     sort = [SortField('trace_call_no')]
-    select_model = select(TraceCall).where(TraceCall.run_id == root._model.id)
-    db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        return await load_connection(
-            session,
+    total_count = 'totalCount' in selected_names(info)
+    fields = selected_fields(info, 'edges', 'node')
+    summary = _loaded_summary(root._model)
+
+    async def _load() -> Connection['TraceCallNode']:
+        connection = await load_nested_connection(
+            info,
             TraceCall,
             create_node_from_model=TraceCallNode.from_model,
-            select_model=select_model,
+            parent_field='run_id',
+            parent_id=root._model.id,
             sort=sort,
             before=before,
             after=after,
             first=first,
             last=last,
+            total_count=total_count and summary is None,
+            options=load_options(TraceCall, fields),
         )
+        if total_count and summary is not None:
+            connection.total_count = summary.trace_call_count
+        return connection
+
+    args = (tuple(sort), before, after, first, last, total_count, selection_key(fields))
+    return await cached_connection(info, 'RunNode.traceCalls', root._model, args, _load)
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='RunNode.prompts')
 async def _resolve_prompts(
     info: Info,
     root: 'RunNode',
@@ -83,22 +129,34 @@ async def _resolve_prompts(
     from .prompt_node import PromptNode
 
     sort = [SortField('prompt_no')]
-    select_model = select(Prompt).where(Prompt.run_id == root._model.id)
-    db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        return await load_connection(
-            session,
+    total_count = 'totalCount' in selected_names(info)
+    fields = selected_fields(info, 'edges', 'node')
+    summary = _loaded_summary(root._model)
+
+    async def _load() -> Connection['PromptNode']:
+        connection = await load_nested_connection(
+            info,
             Prompt,
             create_node_from_model=PromptNode.from_model,
-            select_model=select_model,
+            parent_field='run_id',
+            parent_id=root._model.id,
             sort=sort,
             before=before,
             after=after,
             first=first,
             last=last,
+            total_count=total_count and summary is None,
+            options=load_options(Prompt, fields),
         )
+        if total_count and summary is not None:
+            connection.total_count = summary.prompt_count
+        return connection
 
+    args = (tuple(sort), before, after, first, last, total_count, selection_key(fields))
+    return await cached_connection(info, 'RunNode.prompts', root._model, args, _load)
 
+
+@METRICS.timed('resolver_duration_seconds', resolver='RunNode.stdouts')
 async def _resolve_stdouts(
     info: Info,
     root: 'RunNode',
@@ -110,20 +168,49 @@ async def _resolve_stdouts(
     from .stdout_node import StdoutNode
 
     sort = [SortField('written_at')]
-    select_model = select(Stdout).where(Stdout.run_id == root._model.id)
-    db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        return await load_connection(
-            session,
+    total_count = 'totalCount' in selected_names(info)
+    fields = selected_fields(info, 'edges', 'node')
+    summary = _loaded_summary(root._model)
+
+    async def _load() -> Connection['StdoutNode']:
+        connection = await load_nested_connection(
+            info,
             Stdout,
             create_node_from_model=StdoutNode.from_model,
-            select_model=select_model,
+            parent_field='run_id',
+            parent_id=root._model.id,
             sort=sort,
             before=before,
             after=after,
             first=first,
             last=last,
+            total_count=total_count and summary is None,
+            options=load_options(Stdout, fields),
         )
+        if total_count and summary is not None:
+            connection.total_count = summary.stdout_count
+        return connection
+
+    args = (tuple(sort), before, after, first, last, total_count, selection_key(fields))
+    return await cached_connection(info, 'RunNode.stdouts', root._model, args, _load)
+
+
+@METRICS.timed('resolver_duration_seconds', resolver='RunNode.traceCallStats')
+async def _resolve_trace_call_stats(
+    info: Info,
+    root: 'RunNode',
+    group_by: Optional[list[TraceCallGroupBy]] = None,
+    first: Optional[int] = None,
+) -> list[TraceCallStatNode]:
+    '''The statistics of the trace calls, by default grouped by the file and line.'''
+    if group_by is None:
+        group_by = list(DEFAULT_GROUP_BY)
+    db = cast(DB, info.context['db'])
+    async with db.read_session() as session:
+        stats = await load_trace_call_stats(
+            session, root._model.id, group_by=group_by, first=first
+        )
+    return [TraceCallStatNode.from_stat(stat) for stat in stats]
 
 
 @strawberry.type
@@ -134,9 +221,11 @@ class RunNode:
     state: Optional[str]
     started_at: Optional[datetime.datetime]
     ended_at: Optional[datetime.datetime]
-    script: Optional[str]
     exception: Optional[str]
 
+    # The script if already known, e.g., in the nodes pushed by the subscriptions
+    _script: strawberry.Private[Optional[str]] = None
+
     traces: Connection[Annotated['TraceNode', strawberry.lazy('.trace_node')]] = (
         strawberry.field(resolver=_resolve_traces)
     )
@@ -153,9 +242,33 @@ class RunNode:
         strawberry.field(resolver=_resolve_stdouts)
     )
 
+    trace_call_stats: list[TraceCallStatNode] = strawberry.field(
+        resolver=_resolve_trace_call_stats
+    )
+
+    @strawberry.field
+    async def script(self, info: Info) -> Optional[str]:
+        if self._script is not None:
+            return self._script
+        if self._model.script_id is None:
+            return None
+        # Queried if not loaded, which it is if the field is selected in the query
+        script = await load_to_one(info, self._model, 'script')
+        return script.script
+
+    @strawberry.field
+    async def summary(self, info: Info) -> Optional[RunSummaryNode]:
+        if 'summary' not in inspect(self._model).unloaded:
+            summary = self._model.summary
+        else:  # e.g., in the nodes pushed by the subscriptions
+            db = cast(DB, info.context['db'])
+            stmt = select(RunSummary).where(RunSummary.run_id == self._model.id)
+            async with db.read_session() as session:
+                summary = await session.scalar(stmt)
+        return RunSummaryNode.from_model(summary) if summary else None
+
     @classmethod
     def from_model(cls: type['RunNode'], model: Run) -> 'RunNode':
-        script = model.script.script if model.script else None
         return cls(
             _model=model,
             id=model.id,
@@ -163,6 +276,5 @@ class RunNode:
             state=model.state,
             started_at=model.started_at,
             ended_at=model.ended_at,
-            script=script,
             exception=model.exception,
         )
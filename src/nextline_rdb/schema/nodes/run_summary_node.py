@@ -0,0 +1,35 @@
+import datetime
+from typing import Optional
+
+import strawberry
+
+from nextline_rdb import models as db_models
+
+
+@strawberry.type
+class RunSummaryNode:
+    trace_count: int
+    trace_call_count: int
+    prompt_count: int
+    stdout_count: int
+    stdout_length: int
+    max_concurrent_traces: int
+    first_event_at: Optional[datetime.datetime]
+    last_event_at: Optional[datetime.datetime]
+    pruned_at: Optional[datetime.datetime]
+
+    @classmethod
+    def from_model(
+        cls: type['RunSummaryNode'], model: db_models.RunSummary
+    ) -> 'RunSummaryNode':
+        return cls(
+            trace_count=model.trace_count,
+            trace_call_count=model.trace_call_count,
+            prompt_count=model.prompt_count,
+            stdout_count=model.stdout_count,
+            stdout_length=model.stdout_length,
+            max_concurrent_traces=model.max_concurrent_traces,
+            first_event_at=model.first_event_at,
+            last_event_at=model.last_event_at,
+            pruned_at=model.pruned_at,
+        )
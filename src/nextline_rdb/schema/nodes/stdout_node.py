@@ -2,9 +2,12 @@ import datetime
 from typing import TYPE_CHECKING, Annotated, Optional
 
 import strawberry
+from strawberry.types import Info
 
 from nextline_rdb import models as db_models
 
+from .options import load_to_one
+
 if TYPE_CHECKING:
     from .run_node import RunNode
     from .trace_node import TraceNode
@@ -20,16 +23,20 @@ class StdoutNode:
     written_at: Optional[datetime.datetime] = None
 
     @strawberry.field
-    def run(self) -> Annotated['RunNode', strawberry.lazy('.run_node')]:
+    async def run(
+        self, info: Info
+    ) -> Annotated['RunNode', strawberry.lazy('.run_node')]:
         from .run_node import RunNode
 
-        return RunNode.from_model(self._model.run)
+        return RunNode.from_model(await load_to_one(info, self._model, 'run'))
 
     @strawberry.field
-    def trace(self) -> Annotated['TraceNode', strawberry.lazy('.trace_node')]:
+    async def trace(
+        self, info: Info
+    ) -> Annotated['TraceNode', strawberry.lazy('.trace_node')]:
         from .trace_node import TraceNode
 
-        return TraceNode.from_model(self._model.trace)
+        return TraceNode.from_model(await load_to_one(info, self._model, 'trace'))
 
     @classmethod
     def from_model(cls: type['StdoutNode'], model: db_models.Stdout) -> 'StdoutNode':
@@ -38,6 +45,6 @@ class StdoutNode:
             id=model.id,
             run_no=model.run.run_no,
             trace_no=model.trace.trace_no,
-            text=model.text,
+            text=model.decompressed_text,
             written_at=model.written_at,
         )
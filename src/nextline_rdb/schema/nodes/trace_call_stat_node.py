@@ -0,0 +1,33 @@
+from typing import Optional, TypeAlias
+
+import strawberry
+
+from ..stats import GroupBy, TraceCallStat
+
+strawberry.enum(GroupBy, name='TraceCallGroupBy')
+TraceCallGroupBy: TypeAlias = GroupBy
+
+
+@strawberry.type
+class TraceCallStatNode:
+    file_name: Optional[str]
+    line_no: Optional[int]
+    trace_no: Optional[int]
+    count: int
+    total_duration: Optional[float]
+    avg_duration: Optional[float]
+    max_duration: Optional[float]
+
+    @classmethod
+    def from_stat(
+        cls: type['TraceCallStatNode'], stat: TraceCallStat
+    ) -> 'TraceCallStatNode':
+        return cls(
+            file_name=stat.file_name,
+            line_no=stat.line_no,
+            trace_no=stat.trace_no,
+            count=stat.count,
+            total_duration=stat.total_duration,
+            avg_duration=stat.avg_duration,
+            max_duration=stat.max_duration,
+        )
@@ -1,16 +1,18 @@
 import datetime
-from typing import TYPE_CHECKING, Annotated, Optional, cast
+from typing import TYPE_CHECKING, Annotated, Optional
 
 import strawberry
-from sqlalchemy import select
 from strawberry.types import Info
 
 from nextline_rdb import models as db_models
-from nextline_rdb.db import DB
+from nextline_rdb.metrics import METRICS
 from nextline_rdb.models import Prompt, Stdout, TraceCall
 from nextline_rdb.pagination import SortField
 
-from ..pagination import Connection, load_connection
+from ..loaders import load_nested_connection
+from ..pagination import Connection
+from ..selection import selected_fields, selected_names
+from .options import load_options
 
 if TYPE_CHECKING:
     from .prompt_node import PromptNode
@@ -19,6 +21,7 @@ if TYPE_CHECKING:
     from .trace_call_node import TraceCallNode
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='TraceNode.traceCalls')
 async def _resolve_trace_calls(
     info: Info,
     root: 'TraceNode',
@@ -30,22 +33,23 @@ async def _resolve_trace_calls(
     from .trace_call_node import TraceCallNode
 
     sort = [SortField('trace_call_no')]
-    select_model = select(TraceCall).where(TraceCall.trace_id == root._model.id)
-    db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        return await load_connection(
-            session,
-            TraceCall,
-            create_node_from_model=TraceCallNode.from_model,
-            select_model=select_model,
-            sort=sort,
-            before=before,
-            after=after,
-            first=first,
-            last=last,
-        )
+    return await load_nested_connection(
+        info,
+        TraceCall,
+        create_node_from_model=TraceCallNode.from_model,
+        parent_field='trace_id',
+        parent_id=root._model.id,
+        sort=sort,
+        before=before,
+        after=after,
+        first=first,
+        last=last,
+        total_count='totalCount' in selected_names(info),
+        options=load_options(TraceCall, selected_fields(info, 'edges', 'node')),
+    )
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='TraceNode.prompts')
 async def _resolve_prompts(
     info: Info,
     root: 'TraceNode',
@@ -57,22 +61,23 @@ async def _resolve_prompts(
     from .prompt_node import PromptNode
 
     sort = [SortField('prompt_no')]
-    select_model = select(Prompt).where(Prompt.trace_id == root._model.id)
-    db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        return await load_connection(
-            session,
-            Prompt,
-            create_node_from_model=PromptNode.from_model,
-            select_model=select_model,
-            sort=sort,
-            before=before,
-            after=after,
-            first=first,
-            last=last,
-        )
+    return await load_nested_connection(
+        info,
+        Prompt,
+        create_node_from_model=PromptNode.from_model,
+        parent_field='trace_id',
+        parent_id=root._model.id,
+        sort=sort,
+        before=before,
+        after=after,
+        first=first,
+        last=last,
+        total_count='totalCount' in selected_names(info),
+        options=load_options(Prompt, selected_fields(info, 'edges', 'node')),
+    )
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='TraceNode.stdouts')
 async def _resolve_stdouts(
     info: Info,
     root: 'TraceNode',
@@ -84,20 +89,20 @@ async def _resolve_stdouts(
     from .stdout_node import StdoutNode
 
     sort = [SortField('written_at')]
-    select_model = select(Stdout).where(Stdout.trace_id == root._model.id)
-    db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        return await load_connection(
-            session,
-            Stdout,
-            create_node_from_model=StdoutNode.from_model,
-            select_model=select_model,
-            sort=sort,
-            before=before,
-            after=after,
-            first=first,
-            last=last,
-        )
+    return await load_nested_connection(
+        info,
+        Stdout,
+        create_node_from_model=StdoutNode.from_model,
+        parent_field='trace_id',
+        parent_id=root._model.id,
+        sort=sort,
+        before=before,
+        after=after,
+        first=first,
+        last=last,
+        total_count='totalCount' in selected_names(info),
+        options=load_options(Stdout, selected_fields(info, 'edges', 'node')),
+    )
 
 
 @strawberry.type
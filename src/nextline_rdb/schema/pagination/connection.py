@@ -35,7 +35,7 @@ class Connection(Generic[_T]):
 
 async def query_connection(
     query_edges: Callable[..., Coroutine[Any, Any, list[Edge[_T]]]],
-    query_total_count: Callable[..., Coroutine[Any, Any, int]],
+    query_total_count: Optional[Callable[..., Coroutine[Any, Any, int]]],
     before: Optional[str] = None,
     after: Optional[str] = None,
     first: Optional[int] = None,
@@ -66,7 +66,8 @@ async def query_connection(
         has_previous_page = False
         has_next_page = False
 
-    total_count = await query_total_count()
+    # Not counted unless `totalCount` is selected, in which case 0 is not returned
+    total_count = await query_total_count() if query_total_count else 0
 
     page_info = PageInfo(
         has_previous_page=has_previous_page,
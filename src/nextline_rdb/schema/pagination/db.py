@@ -1,14 +1,22 @@
 import base64
-from collections.abc import Callable
+import datetime
+import json
+from collections.abc import Callable, Sequence
 from functools import partial
-from typing import Optional, Type, TypeVar
+from typing import Any, Optional, Type, TypeVar
 
 from sqlalchemy import func, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm.interfaces import LoaderOption
 from sqlalchemy.sql.selectable import Select
 
-from nextline_rdb.pagination import Sort, load_models
+from nextline_rdb.pagination import (
+    Sort,
+    load_models,
+    load_models_by_parent,
+    sort_with_id,
+)
 
 from .connection import Connection, Edge, query_connection
 
@@ -20,8 +28,36 @@ def encode_id(id: int) -> str:
     return base64.b64encode(f'{id}'.encode()).decode()
 
 
-def decode_id(cursor: str) -> int:
-    return int(base64.b64decode(cursor).decode())
+def encode_cursor(model: Any, fields: Sequence[str]) -> str:
+    '''The cursor with the values of the sort fields of the model.
+
+    The page after or before the cursor continues from the values even if the
+    row has been deleted.
+    '''
+    values = [getattr(model, f) for f in fields]
+    values = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in values]
+    return base64.b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(
+    Model: Type[_M], fields: Sequence[str], id_field: str, cursor: str
+) -> tuple[Any, Optional[list[Any]]]:
+    '''The id and the values of the sort fields at the cursor.
+
+    The values are `None` for a cursor of only the id from `encode_id()`.
+    '''
+    decoded = json.loads(base64.b64decode(cursor).decode())
+    if isinstance(decoded, int):
+        return decoded, None
+    if not isinstance(decoded, list) or len(decoded) != len(fields):
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+    values = list[Any]()
+    for field, value in zip(fields, decoded):
+        column = getattr(Model, field)
+        if column.type.python_type is datetime.datetime:
+            value = datetime.datetime.fromisoformat(value)
+        values.append(value)
+    return values[list(fields).index(id_field)], values
 
 
 async def load_connection(
@@ -35,7 +71,15 @@ async def load_connection(
     after: Optional[str] = None,
     first: Optional[int] = None,
     last: Optional[int] = None,
+    total_count: bool = True,
+    options: Sequence[LoaderOption] = (),
 ) -> Connection[_N]:
+    '''Load a page of the connection.
+
+    The total count is only queried if `total_count` is true, i.e., if
+    `totalCount` is selected in the query. The `options` are the loader options
+    of the models, e.g., to eagerly load the relationships that the nodes read.
+    '''
     query_edges = partial(
         load_edges,
         session=session,
@@ -43,13 +87,18 @@ async def load_connection(
         create_node_from_model=create_node_from_model,
         select_model=select_model,
         sort=sort,
+        options=options,
     )
 
-    query_total_count = partial(
-        load_total_count,
-        session=session,
-        Model=Model,
-        select_model=select_model,
+    query_total_count = (
+        partial(
+            load_total_count,
+            session=session,
+            Model=Model,
+            select_model=select_model,
+        )
+        if total_count
+        else None
     )
 
     return await query_connection(
@@ -62,6 +111,68 @@ async def load_connection(
     )
 
 
+async def load_connections_by_parent(
+    session: AsyncSession,
+    Model: Type[_M],
+    create_node_from_model: Callable[[_M], _N],
+    parent_field: str,
+    parent_ids: Sequence[Any],
+    *,
+    sort: Optional[Sort] = None,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    total_count: bool = True,
+    options: Sequence[LoaderOption] = (),
+) -> list[Connection[_N]]:
+    '''Load the first or last page of the connection of each parent.
+
+    The same as calling `load_connection()` for each parent without cursors
+    but in at most two queries in total.
+    '''
+    id_field = _id_field(Model)
+    fields = [s.field for s in sort_with_id(sort, id_field)]
+
+    # Add one for has_next_page or has_previous_page as in query_connection()
+    models = await load_models_by_parent(
+        session,
+        Model,
+        id_field,
+        parent_field,
+        parent_ids,
+        sort=sort,
+        first=first if first is None else first + 1,
+        last=last if last is None else last + 1,
+        options=options,
+    )
+
+    counts: dict[Any, int] | None = None
+    if total_count:
+        parent = getattr(Model, parent_field)
+        stmt = select(parent, func.count()).where(parent.in_(parent_ids))
+        stmt = stmt.group_by(parent)
+        counts = {k: v for k, v in (await session.execute(stmt)).all()}
+
+    async def _edges(parent_id: Any, **_: Any) -> list[Edge[_N]]:
+        return [
+            Edge(node=create_node_from_model(m), cursor=encode_cursor(m, fields))
+            for m in models[parent_id]
+        ]
+
+    async def _total_count(parent_id: Any) -> int:
+        assert counts is not None
+        return counts.get(parent_id, 0)
+
+    return [
+        await query_connection(
+            partial(_edges, parent_id),
+            partial(_total_count, parent_id) if total_count else None,
+            first=first,
+            last=last,
+        )
+        for parent_id in parent_ids
+    ]
+
+
 async def load_total_count(
     session: AsyncSession,
     Model: Type[_M],
@@ -70,12 +181,38 @@ async def load_total_count(
 ) -> int:
     if select_model is None:
         select_model = select(Model)
-    cte = select_model.cte()
-    stmt = select(func.count()).select_from(cte)
+    if _is_filtered_model(Model, select_model):
+        # Count without selecting the columns so that an index can cover the query
+        stmt = select_model.with_only_columns(
+            func.count(), maintain_column_froms=True
+        ).order_by(None)
+    else:
+        cte = select_model.cte()
+        stmt = select(func.count()).select_from(cte)
     total_count = (await session.execute(stmt)).scalar() or 0
     return total_count
 
 
+def _is_filtered_model(Model: Type[_M], select_model: Select[tuple[_M]]) -> bool:
+    '''True if `select_model` only selects `Model` with filters.
+
+    The rows of such a select are counted by replacing the columns with the
+    count. Otherwise, e.g., with DISTINCT, GROUP BY, or LIMIT, they are counted
+    in a CTE.
+    '''
+    if [d['expr'] for d in select_model.column_descriptions] != [Model]:
+        return False
+    return not (
+        select_model._distinct
+        or select_model._distinct_on
+        or select_model._group_by_clauses
+        or select_model._having_criteria
+        or select_model._limit_clause is not None
+        or select_model._offset_clause is not None
+        or select_model._fetch_clause is not None
+    )
+
+
 async def load_edges(
     session: AsyncSession,
     Model: Type[_M],
@@ -87,11 +224,16 @@ async def load_edges(
     after: Optional[str] = None,
     first: Optional[int] = None,
     last: Optional[int] = None,
+    options: Sequence[LoaderOption] = (),
 ) -> list[Edge[_N]]:
-    # TODO: handle multiple primary keys
-    primary_keys = list(inspect(Model).primary_key)
-    assert len(primary_keys) == 1, 'Multiple primary keys are not supported'
-    id_field = primary_keys[0].name
+    id_field = _id_field(Model)
+    fields = [s.field for s in sort_with_id(sort, id_field)]
+
+    before_id = after_id = cursor_values = None
+    if before is not None:
+        before_id, cursor_values = decode_cursor(Model, fields, id_field, before)
+    if after is not None:
+        after_id, cursor_values = decode_cursor(Model, fields, id_field, after)
 
     models = await load_models(
         session,
@@ -99,14 +241,24 @@ async def load_edges(
         id_field,
         select_model=select_model,
         sort=sort,
-        before=before if before is None else decode_id(before),
-        after=after if after is None else decode_id(after),
+        before=before_id,
+        after=after_id,
         first=first,
         last=last,
+        cursor_values=cursor_values,
+        options=options,
     )
 
-    nodes = [create_node_from_model(m) for m in models]
-
-    edges = [Edge(node=n, cursor=encode_id(getattr(n, id_field))) for n in nodes]
+    edges = [
+        Edge(node=create_node_from_model(m), cursor=encode_cursor(m, fields))
+        for m in models
+    ]
 
     return edges
+
+
+def _id_field(Model: Type[_M]) -> str:
+    # TODO: handle multiple primary keys
+    primary_keys = list(inspect(Model).primary_key)
+    assert len(primary_keys) == 1, 'Multiple primary keys are not supported'
+    return primary_keys[0].name
@@ -3,26 +3,30 @@ from typing import Optional, cast
 
 import strawberry
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from strawberry.types import Info
 
 import nextline_rdb
 from nextline_rdb.db import DB
+from nextline_rdb.metrics import METRICS
 from nextline_rdb.models import Prompt, Run, Stdout, Trace, TraceCall
 from nextline_rdb.pagination import SortField
 from nextline_rdb.utils import to_naive_utc
 
+from .metrics import MetricsRDB, resolve_metrics
 from .nodes import PromptNode, RunNode, StdoutNode, TraceCallNode, TraceNode
+from .nodes.options import load_options
 from .pagination import Connection, load_connection
+from .selection import selected_fields, selected_names
+from .tail import load_stdouts
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='rdb.run')
 async def resolve_run(
     info: Info, id: Optional[int] = None, run_no: Optional[int] = None
 ) -> RunNode | None:
     db = cast(DB, info.context['db'])
-    async with db.session() as session:
-        # stmt = select(Run).options(selectinload('*'))
-        stmt = select(Run).options(selectinload(Run.script))
+    async with db.read_session() as session:
+        stmt = select(Run).options(*load_options(Run, selected_fields(info)))
         if id is not None:
             stmt = stmt.filter(Run.id == id)
         else:
@@ -39,6 +43,7 @@ class RunFilter:
     ended_before: Optional[datetime] = None
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='rdb.runs')
 async def resolve_runs(
     info: Info,
     before: Optional[str] = None,
@@ -66,7 +71,7 @@ async def resolve_runs(
             ended_before = to_naive_utc(filter.ended_before)
             stmt = stmt.where(Run.ended_at < ended_before)
 
-    async with db.session() as session:
+    async with db.read_session() as session:
         return await load_connection(
             session,
             Run,
@@ -77,9 +82,12 @@ async def resolve_runs(
             after=after,
             first=first,
             last=last,
+            total_count='totalCount' in selected_names(info),
+            options=load_options(Run, selected_fields(info, 'edges', 'node')),
         )
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='rdb.traces')
 async def resolve_traces(
     info: Info,
     before: Optional[str] = None,
@@ -89,7 +97,7 @@ async def resolve_traces(
 ) -> Connection[TraceNode]:
     sort = [SortField('run_id'), SortField('trace_no')]
     db = cast(DB, info.context['db'])
-    async with db.session() as session:
+    async with db.read_session() as session:
         return await load_connection(
             session,
             Trace,
@@ -99,9 +107,12 @@ async def resolve_traces(
             after=after,
             first=first,
             last=last,
+            total_count='totalCount' in selected_names(info),
+            options=load_options(Trace, selected_fields(info, 'edges', 'node')),
         )
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='rdb.traceCalls')
 async def resolve_trace_calls(
     info: Info,
     before: Optional[str] = None,
@@ -111,7 +122,7 @@ async def resolve_trace_calls(
 ) -> Connection[TraceCallNode]:
     sort = [SortField('run_id'), SortField('trace_call_no')]
     db = cast(DB, info.context['db'])
-    async with db.session() as session:
+    async with db.read_session() as session:
         return await load_connection(
             session,
             TraceCall,
@@ -121,9 +132,12 @@ async def resolve_trace_calls(
             after=after,
             first=first,
             last=last,
+            total_count='totalCount' in selected_names(info),
+            options=load_options(TraceCall, selected_fields(info, 'edges', 'node')),
         )
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='rdb.prompts')
 async def resolve_prompts(
     info: Info,
     before: Optional[str] = None,
@@ -133,7 +147,7 @@ async def resolve_prompts(
 ) -> Connection[PromptNode]:
     sort = [SortField('run_id'), SortField('prompt_no')]
     db = cast(DB, info.context['db'])
-    async with db.session() as session:
+    async with db.read_session() as session:
         return await load_connection(
             session,
             Prompt,
@@ -143,9 +157,12 @@ async def resolve_prompts(
             after=after,
             first=first,
             last=last,
+            total_count='totalCount' in selected_names(info),
+            options=load_options(Prompt, selected_fields(info, 'edges', 'node')),
         )
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='rdb.stdouts')
 async def resolve_stdouts(
     info: Info,
     before: Optional[str] = None,
@@ -155,7 +172,7 @@ async def resolve_stdouts(
 ) -> Connection[StdoutNode]:
     sort = [SortField('run_id'), SortField('id')]
     db = cast(DB, info.context['db'])
-    async with db.session() as session:
+    async with db.read_session() as session:
         return await load_connection(
             session,
             Stdout,
@@ -165,9 +182,37 @@ async def resolve_stdouts(
             after=after,
             first=first,
             last=last,
+            total_count='totalCount' in selected_names(info),
+            options=load_options(Stdout, selected_fields(info, 'edges', 'node')),
         )
 
 
+@METRICS.timed('resolver_duration_seconds', resolver='rdb.stdoutTail')
+async def resolve_stdout_tail(
+    info: Info,
+    run_no: int,
+    after_id: Optional[int] = None,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+) -> list[StdoutNode]:
+    '''The stdouts of the run after the ID `after_id` in the order of ID.
+
+    E.g., the last 100 stdouts with `last: 100`, and then the new ones with
+    `afterId` of the last ID read.
+    '''
+    db = cast(DB, info.context['db'])
+    async with db.read_session() as session:
+        stdouts = await load_stdouts(
+            session,
+            run_no,
+            after_id=after_id,
+            first=first,
+            last=last,
+            options=load_options(Stdout, selected_fields(info)),
+        )
+    return [StdoutNode.from_model(stdout) for stdout in stdouts]
+
+
 def resolve_migration_version(info: Info) -> str | None:
     db = cast(DB, info.context['db'])
     return db.migration_revision
@@ -182,9 +227,11 @@ class QueryRDB:
     )
     prompts: Connection[PromptNode] = strawberry.field(resolver=resolve_prompts)
     stdouts: Connection[StdoutNode] = strawberry.field(resolver=resolve_stdouts)
+    stdout_tail: list[StdoutNode] = strawberry.field(resolver=resolve_stdout_tail)
     run: RunNode | None = strawberry.field(resolver=resolve_run)
     version: str = nextline_rdb.__version__
     migration_version: str | None = strawberry.field(resolver=resolve_migration_version)
+    metrics: MetricsRDB = strawberry.field(resolver=resolve_metrics)
 
 
 @strawberry.type
@@ -0,0 +1,56 @@
+from collections.abc import Hashable, Iterable
+
+from strawberry.types import Info
+from strawberry.types.nodes import FragmentSpread, InlineFragment, SelectedField
+
+Selection = SelectedField | FragmentSpread | InlineFragment
+
+
+def selected_names(info: Info, *path: str) -> set[str]:
+    '''The names of the fields selected at `path` in the field being resolved.
+
+    The names are as in the query, e.g., `totalCount`. Fragments are expanded.
+
+    E.g., when `runs` is resolved for the query
+
+        { rdb { runs { totalCount edges { node { id runNo } } } } }
+
+    `selected_names(info)` is `{'totalCount', 'edges'}` and
+    `selected_names(info, 'edges', 'node')` is `{'id', 'runNo'}`.
+    '''
+    return {f.name for f in selected_fields(info, *path)}
+
+
+def selected_fields(info: Info, *path: str) -> list[SelectedField]:
+    '''The fields selected at `path` in the field being resolved.
+
+    The same as `selected_names()` but returns the fields with their selections.
+    '''
+    fields = _fields(s for f in info.selected_fields for s in f.selections)
+    for name in path:
+        fields = subfields(fields, name)
+    return fields
+
+
+def subfields(fields: Iterable[SelectedField], name: str) -> list[SelectedField]:
+    '''The fields selected in the fields named `name` among `fields`.'''
+    return _fields(s for f in fields if f.name == name for s in f.selections)
+
+
+def selection_key(fields: Iterable[SelectedField]) -> Hashable:
+    '''A hashable of the names of the fields and their subfields.
+
+    The same for the same selections regardless of the order and fragments.
+    '''
+    return frozenset((f.name, selection_key(_fields(f.selections))) for f in fields)
+
+
+def _fields(selections: Iterable[Selection]) -> list[SelectedField]:
+    '''The fields in the selections with the fragments expanded.'''
+    fields = list[SelectedField]()
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            fields.append(selection)
+        else:
+            fields.extend(_fields(selection.selections))
+    return fields
@@ -0,0 +1,130 @@
+'''Aggregate the trace calls of a run to find where the script spends time.
+
+The calls are counted and their durations are summed in SQL with `GROUP BY`
+in the order of the index on `(run_id, file_name, line_no)`. The index is kept
+narrow because the trace calls are the most written table.
+
+The durations are in seconds. They are computed from the calls that have
+ended. On SQLite, they are precise to the millisecond.
+'''
+
+import enum
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import Float, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from nextline_rdb.models import Trace, TraceCall
+
+
+class GroupBy(enum.Enum):
+    FILE = 'file'
+    LINE = 'line'
+    TRACE = 'trace'
+
+
+DEFAULT_GROUP_BY = (GroupBy.FILE, GroupBy.LINE)
+
+_COLUMNS = {
+    GroupBy.FILE: TraceCall.file_name,
+    GroupBy.LINE: TraceCall.line_no,
+    GroupBy.TRACE: TraceCall.trace_id,
+}
+
+
+@dataclass(frozen=True)
+class TraceCallStat:
+    '''The statistics of the calls in a group.
+
+    The keys that the calls are not grouped by are `None`.
+    '''
+
+    file_name: Optional[str]
+    line_no: Optional[int]
+    trace_no: Optional[int]
+    count: int
+    total_duration: Optional[float]
+    avg_duration: Optional[float]
+    max_duration: Optional[float]
+
+
+class _seconds(FunctionElement[float]):
+    '''The seconds from the first argument to the second.'''
+
+    type = Float()
+    inherit_cache = True
+    name = 'seconds'
+
+
+@compiles(_seconds)
+def _compile_seconds(element: _seconds, compiler: Any, **kw: Any) -> str:
+    start, end = (compiler.process(c, **kw) for c in element.clauses)
+    return f'EXTRACT(EPOCH FROM ({end} - {start}))'
+
+
+@compiles(_seconds, 'sqlite')
+def _compile_seconds_sqlite(element: _seconds, compiler: Any, **kw: Any) -> str:
+    start, end = (compiler.process(c, **kw) for c in element.clauses)
+    return f'((julianday({end}) - julianday({start})) * 86400.0)'
+
+
+async def load_trace_call_stats(
+    session: AsyncSession,
+    run_id: int,
+    group_by: Sequence[GroupBy] = DEFAULT_GROUP_BY,
+    first: Optional[int] = None,
+) -> list[TraceCallStat]:
+    '''The statistics of the calls of the run in the groups.
+
+    In the descending order of the total duration. Only the first `first` groups
+    if given. The calls of the run make one group if `group_by` is empty.
+    '''
+    if first is not None and first < 0:
+        raise ValueError(f'first must be non-negative: {first}')
+    group_by = list(dict.fromkeys(group_by))  # Unique in the order
+    keys = [_COLUMNS[g].label(g.value) for g in group_by]
+    duration = _seconds(TraceCall.started_at, TraceCall.ended_at)
+    count = func.count()
+    total = func.sum(duration)
+    stmt = (
+        select(
+            *keys,
+            count.label('count'),
+            total.label('total_duration'),
+            func.avg(duration).label('avg_duration'),
+            func.max(duration).label('max_duration'),
+        )
+        .where(TraceCall.run_id == run_id)
+        .group_by(*keys)
+        .order_by(total.desc().nulls_last(), count.desc(), *keys)
+    )
+    if first is not None:
+        stmt = stmt.limit(first)
+    rows = (await session.execute(stmt)).mappings().all()
+
+    trace_nos = dict[int, int]()
+    if GroupBy.TRACE in group_by:
+        select_trace_nos = select(Trace.id, Trace.trace_no).where(
+            Trace.run_id == run_id
+        )
+        trace_nos.update((await session.execute(select_trace_nos)).all())
+
+    ret = list[TraceCallStat]()
+    for row in rows:
+        trace_id = row.get(GroupBy.TRACE.value)
+        ret.append(
+            TraceCallStat(
+                file_name=row.get(GroupBy.FILE.value),
+                line_no=row.get(GroupBy.LINE.value),
+                trace_no=None if trace_id is None else trace_nos[trace_id],
+                count=row['count'],
+                total_duration=row['total_duration'],
+                avg_duration=row['avg_duration'],
+                max_duration=row['max_duration'],
+            )
+        )
+    return ret
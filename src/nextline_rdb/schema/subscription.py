@@ -0,0 +1,172 @@
+from collections.abc import AsyncIterator
+from typing import Optional, cast
+
+import strawberry
+from sqlalchemy.orm.interfaces import LoaderOption
+from strawberry.types import Info
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Stdout
+from nextline_rdb.pubsub import (
+    PROMPT_OPENED,
+    RUN_ADDED,
+    RUN_UPDATED,
+    Broker,
+    PromptOpened,
+    RunChanged,
+    StdoutAppended,
+    Subscriber,
+    stdout_appended,
+)
+
+from .nodes import PromptNode, RunNode, StdoutNode
+from .nodes.options import load_options
+from .selection import selected_fields
+from .tail import CATCH_UP_PAGE_SIZE, load_stdouts
+
+
+async def subscribe_run_added(info: Info) -> AsyncIterator[RunNode]:
+    broker = cast(Broker, info.context['broker'])
+    async with broker.subscribe(RUN_ADDED) as subscriber:
+        async for item in subscriber:
+            yield _run_node(item)
+
+
+async def subscribe_run_updated(info: Info) -> AsyncIterator[RunNode]:
+    broker = cast(Broker, info.context['broker'])
+    async with broker.subscribe(RUN_UPDATED) as subscriber:
+        async for item in subscriber:
+            yield _run_node(item)
+
+
+def _run_node(item: RunChanged) -> RunNode:
+    run = item.run
+    return RunNode(
+        _model=run,
+        id=run.id,
+        run_no=run.run_no,
+        state=run.state,
+        started_at=run.started_at,
+        ended_at=run.ended_at,
+        exception=run.exception,
+        _script=item.script,
+    )
+
+
+async def subscribe_stdout_appended(
+    info: Info, run_no: int
+) -> AsyncIterator[StdoutNode]:
+    broker = cast(Broker, info.context['broker'])
+    async with broker.subscribe(stdout_appended(run_no)) as subscriber:
+        async for item in subscriber:
+            yield _stdout_node(item)
+
+
+async def subscribe_stdout_tail(
+    info: Info,
+    run_no: int,
+    after_id: Optional[int] = None,
+    last: Optional[int] = None,
+) -> AsyncIterator[StdoutNode]:
+    '''The stdouts of the run after the ID `after_id` and then the new ones.
+
+    Only the last `last` of the existing ones if given. A client can subscribe
+    again with `afterId` of the last ID received without gaps or duplicates.
+    '''
+    broker = cast(Broker, info.context['broker'])
+    db = cast(DB, info.context['db'])
+    options = load_options(Stdout, selected_fields(info))
+
+    # Subscribe before reading the DB so that no new stdouts are missed
+    async with broker.subscribe(stdout_appended(run_no)) as subscriber:
+        async for node in _tail(db, subscriber, run_no, after_id, last, options):
+            yield node
+
+
+async def _tail(
+    db: DB,
+    subscriber: Subscriber,
+    run_no: int,
+    after_id: Optional[int],
+    last: Optional[int],
+    options: list[LoaderOption],
+) -> AsyncIterator[StdoutNode]:
+    cursor = after_id
+    first = None if last is not None else CATCH_UP_PAGE_SIZE
+    while True:
+        async with db.read_session() as session:
+            stdouts = await load_stdouts(
+                session,
+                run_no,
+                after_id=cursor,
+                first=first,
+                last=last,
+                options=options,
+            )
+        for stdout in stdouts:
+            yield StdoutNode.from_model(stdout)
+        if stdouts:
+            cursor = stdouts[-1].id
+        if first is None or len(stdouts) < first:
+            break
+
+    async for item in subscriber:
+        item = cast(StdoutAppended, item)
+        if cursor is not None and item.stdout.id <= cursor:
+            continue  # Already read from the DB
+        yield _stdout_node(item)
+        cursor = item.stdout.id
+
+
+def _stdout_node(item: StdoutAppended) -> StdoutNode:
+    stdout = item.stdout
+    return StdoutNode(
+        _model=stdout,
+        id=stdout.id,
+        run_no=item.run_no,
+        trace_no=item.trace_no,
+        text=stdout.decompressed_text,
+        written_at=stdout.written_at,
+    )
+
+
+async def subscribe_prompt_opened(info: Info) -> AsyncIterator[PromptNode]:
+    broker = cast(Broker, info.context['broker'])
+    async with broker.subscribe(PROMPT_OPENED) as subscriber:
+        async for item in subscriber:
+            item = cast(PromptOpened, item)
+            prompt = item.prompt
+            yield PromptNode(
+                _model=prompt,
+                id=prompt.id,
+                run_no=item.run_no,
+                trace_no=item.trace_no,
+                prompt_no=prompt.prompt_no,
+                open=prompt.open,
+                event=item.event,
+                started_at=prompt.started_at,
+                file_name=item.file_name,
+                line_no=item.line_no,
+                stdout=prompt.stdout,
+                command=prompt.command,
+                ended_at=prompt.ended_at,
+            )
+
+
+@strawberry.type
+class Subscription:
+    rdb_run_added: AsyncIterator[RunNode] = strawberry.field(
+        is_subscription=True, resolver=subscribe_run_added
+    )
+    rdb_run_updated: AsyncIterator[RunNode] = strawberry.field(
+        is_subscription=True, resolver=subscribe_run_updated
+    )
+    rdb_stdout_appended: AsyncIterator[StdoutNode] = strawberry.field(
+        is_subscription=True, resolver=subscribe_stdout_appended
+    )
+    rdb_stdout_tail: AsyncIterator[StdoutNode] = strawberry.field(
+        is_subscription=True, resolver=subscribe_stdout_tail
+    )
+    rdb_prompt_opened: AsyncIterator[PromptNode] = strawberry.field(
+        is_subscription=True, resolver=subscribe_prompt_opened
+    )
@@ -0,0 +1,46 @@
+'''Tail the stdouts of a run by the ID as the cursor.
+
+The IDs of the stdouts increase in the order in which they are written. The
+rows after an ID are read with a range scan of the index on `(run_id, id)`.
+A client that has read up to an ID can resume from it without gaps or
+duplicates.
+'''
+
+from collections.abc import Sequence
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from nextline_rdb.models import Run, Stdout
+
+# The number of the rows read at a time to catch up in the subscription
+CATCH_UP_PAGE_SIZE = 1_000
+
+
+async def load_stdouts(
+    session: AsyncSession,
+    run_no: int,
+    after_id: Optional[int] = None,
+    first: Optional[int] = None,
+    last: Optional[int] = None,
+    options: Sequence[LoaderOption] = (),
+) -> list[Stdout]:
+    '''The stdouts of the run with IDs greater than `after_id` in the order of ID.
+
+    Only the first `first` or the last `last` of them if given.
+    '''
+    if first is not None and last is not None:
+        raise ValueError('Only one of first and last can be given')
+    run_id = select(Run.id).where(Run.run_no == run_no).scalar_subquery()
+    stmt = select(Stdout).where(Stdout.run_id == run_id).options(*options)
+    if after_id is not None:
+        stmt = stmt.where(Stdout.id > after_id)
+    if last is not None:
+        stmt = stmt.order_by(Stdout.id.desc()).limit(last)
+        return list(reversed((await session.scalars(stmt)).all()))
+    stmt = stmt.order_by(Stdout.id)
+    if first is not None:
+        stmt = stmt.limit(first)
+    return list((await session.scalars(stmt)).all())
@@ -0,0 +1,176 @@
+'''Recompute the summaries of runs from their rows.
+
+The writer updates the summary of a run as it writes the rows. The summaries
+are recomputed by `refresh_run_summaries()` where the rows are written
+otherwise, e.g., when runs are imported. They are not recomputed when the
+retention policy deletes rows; they keep the numbers of the rows written.
+
+>>> async def main():
+...     async with DB() as db:
+...         async with db.session.begin() as session:
+...             run = Run(run_no=1)
+...             trace = Trace(
+...                 run=run, trace_no=1, state='finished', thread_no=1, started_at=NOW
+...             )
+...             Stdout(run=run, trace=trace, text='hello\\n', written_at=NOW)
+...             session.add(run)
+...         async with db.session.begin() as session:
+...             await refresh_run_summaries(session, [run.id])
+...         async with db.session() as session:
+...             summary = await session.scalar(select(RunSummary))
+...     return summary.trace_count, summary.stdout_count, summary.stdout_length
+>>> import asyncio
+>>> from nextline_rdb.db import DB
+>>> NOW = datetime.datetime(2024, 1, 1)
+>>> asyncio.run(main())
+(1, 1, 6)
+
+'''
+
+import datetime
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline_rdb.models import Prompt, Run, RunSummary, Stdout, Trace, TraceCall
+from nextline_rdb.utils.compress import decompress_text
+
+# The runs refreshed together, i.e., the size of the `IN` lists of the run IDs
+_RUN_GROUP_SIZE = 100
+
+# The columns of the times of the events in each table
+_Child = type[Trace | TraceCall | Prompt | Stdout]
+
+_TIMES: tuple[tuple[_Child, Sequence[Any]], ...] = (
+    (Trace, (Trace.started_at, Trace.ended_at)),
+    (TraceCall, (TraceCall.started_at, TraceCall.ended_at)),
+    (Prompt, (Prompt.started_at, Prompt.ended_at)),
+    (Stdout, (Stdout.written_at,)),
+)
+
+_COUNTS: tuple[tuple[_Child, str], ...] = (
+    (Trace, 'trace_count'),
+    (TraceCall, 'trace_call_count'),
+    (Prompt, 'prompt_count'),
+    (Stdout, 'stdout_count'),
+)
+
+
+def new_summary(run: Optional[Run] = None) -> RunSummary:
+    '''The summary of a run without rows.'''
+    summary = RunSummary(
+        trace_count=0,
+        trace_call_count=0,
+        prompt_count=0,
+        stdout_count=0,
+        stdout_length=0,
+        max_concurrent_traces=0,
+    )
+    if run is not None:
+        summary.run = run
+    return summary
+
+
+async def refresh_run_summaries(session: AsyncSession, run_ids: Iterable[int]) -> None:
+    '''Recompute the summaries of the runs, created if not in the DB.'''
+    run_ids = sorted(set(run_ids))
+    for i in range(0, len(run_ids), _RUN_GROUP_SIZE):
+        await _refresh(session, run_ids[i : i + _RUN_GROUP_SIZE])
+
+
+async def _refresh(session: AsyncSession, run_ids: Sequence[int]) -> None:
+    select_summaries = select(RunSummary).where(RunSummary.run_id.in_(run_ids))
+    summaries = {s.run_id: s for s in (await session.scalars(select_summaries)).all()}
+    for run_id in run_ids:
+        if run_id not in summaries:
+            summary = summaries[run_id] = new_summary()
+            summary.run_id = run_id
+            session.add(summary)
+
+    values = defaultdict[int, dict[str, Any]](dict)
+    for model, name in _COUNTS:
+        count = (
+            select(model.run_id, func.count())
+            .where(model.run_id.in_(run_ids))
+            .group_by(model.run_id)
+        )
+        for run_id, n in (await session.execute(count)).all():
+            values[run_id][name] = n
+
+    for run_id, length in await _stdout_lengths(session, run_ids):
+        values[run_id]['stdout_length'] = length
+
+    for run_id, concurrency in await _max_concurrent_traces(session, run_ids):
+        values[run_id]['max_concurrent_traces'] = concurrency
+
+    firsts = defaultdict[int, list[datetime.datetime]](list)
+    lasts = defaultdict[int, list[datetime.datetime]](list)
+    for model, columns in _TIMES:
+        for column in columns:
+            times = (
+                select(model.run_id, func.min(column), func.max(column))
+                .where(model.run_id.in_(run_ids))
+                .group_by(model.run_id)
+            )
+            for run_id, first, last in (await session.execute(times)).all():
+                if first is not None:
+                    firsts[run_id].append(first)
+                    lasts[run_id].append(last)
+
+    for run_id, summary in summaries.items():
+        summary.trace_count = 0
+        summary.trace_call_count = 0
+        summary.prompt_count = 0
+        summary.stdout_count = 0
+        summary.stdout_length = 0
+        summary.max_concurrent_traces = 0
+        for name, value in values[run_id].items():
+            setattr(summary, name, value)
+        summary.first_event_at = min(firsts[run_id], default=None)
+        summary.last_event_at = max(lasts[run_id], default=None)
+        summary.pruned_at = None  # The numbers are of the rows in the DB
+
+
+async def _stdout_lengths(
+    session: AsyncSession, run_ids: Sequence[int]
+) -> list[tuple[int, int]]:
+    '''The total numbers of the characters of the stdouts by the run.
+
+    Counted in Python. The texts can be compressed, and `length()` of SQLite
+    stops at a null character.
+    '''
+    lengths = defaultdict[int, int](int)
+    stmt = select(
+        Stdout.run_id, Stdout.text, Stdout.compression, Stdout.text_compressed
+    ).where(Stdout.run_id.in_(run_ids))
+    result = await session.stream(stmt.execution_options(yield_per=1_000))
+    async for run_id, text, compression, data in result:
+        if compression is not None and data is not None:
+            text = decompress_text(data, compression)
+        lengths[run_id] += len(text or '')
+    return list(lengths.items())
+
+
+async def _max_concurrent_traces(
+    session: AsyncSession, run_ids: Sequence[int]
+) -> list[tuple[int, int]]:
+    '''The maximum numbers of the traces running at the same time by the run.'''
+    stmt = select(Trace.run_id, Trace.started_at, Trace.ended_at).where(
+        Trace.run_id.in_(run_ids)
+    )
+    changes = defaultdict[int, list[tuple[datetime.datetime, int]]](list)
+    for run_id, started_at, ended_at in (await session.execute(stmt)).all():
+        changes[run_id].append((started_at, 1))
+        if ended_at is not None:
+            changes[run_id].append((ended_at, -1))
+    ret = list[tuple[int, int]]()
+    for run_id, run_changes in changes.items():
+        running = max_ = 0
+        for _, change in sorted(run_changes):  # An end before a start at a time
+            running += change
+            max_ = max(max_, running)
+        ret.append((run_id, max_))
+    return ret
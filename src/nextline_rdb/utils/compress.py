@@ -0,0 +1,62 @@
+import zlib
+from collections.abc import Callable
+from types import ModuleType
+from typing import Optional
+
+COMPRESSIONS = ('zlib', 'zstd')
+
+
+def compress_text(text: str, compression: str) -> bytes:
+    '''Compress the text encoded in UTF-8.
+
+    >>> decompress_text(compress_text('abc' * 100, 'zlib'), 'zlib') == 'abc' * 100
+    True
+
+    `zstd` needs `compression.zstd` (Python 3.14) or the `zstandard` package.
+    '''
+    return _codec(compression)[0](text.encode())
+
+
+def decompress_text(data: bytes, compression: str) -> str:
+    '''Decompress the text compressed by `compress_text()`.'''
+    return _codec(compression)[1](data).decode()
+
+
+def check_compression(compression: str) -> None:
+    '''Raise `ValueError` if the compression is unknown or unavailable.
+
+    >>> check_compression('gzip')
+    Traceback (most recent call last):
+    ...
+    ValueError: Unknown compression: 'gzip'
+
+    '''
+    _codec(compression)
+
+
+def _codec(
+    compression: str,
+) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    if compression == 'zlib':
+        return zlib.compress, zlib.decompress
+    if compression == 'zstd':
+        if (zstd := _zstd()) is None:
+            msg = 'The zstd compression needs Python 3.14 or the package zstandard'
+            raise ValueError(msg)
+        return zstd.compress, zstd.decompress
+    raise ValueError(f'Unknown compression: {compression!r}')
+
+
+def _zstd() -> Optional[ModuleType]:
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore[import-not-found]
+
+        return zstandard
+    except ImportError:
+        return None
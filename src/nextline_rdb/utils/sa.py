@@ -1,34 +1,47 @@
+from collections.abc import Awaitable, Callable
 from logging import getLogger
-from typing import Any, TypeVar
+from typing import Any, Optional, TypeVar
 
 from sqlalchemy import Select, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
+from nextline_rdb.metrics import METRICS
+
 from .until import until_not_none
 
 T = TypeVar('T', bound=DeclarativeBase)
+_T = TypeVar('_T')
 
 # NOTE: Consider make this configurable.
 DEFAULT_UNTIL_SCALAR_ONE_TIMEOUT = 60  # seconds
+DEFAULT_UNTIL_SCALAR_ONE_INTERVAL = 0.1  # seconds
 
 
 async def until_scalar_one(
     session: AsyncSession,
-    stmt: Select[tuple[T]],
+    stmt: Select[tuple[_T]],
     timeout: float = DEFAULT_UNTIL_SCALAR_ONE_TIMEOUT,
-) -> T:
+    interval: float = DEFAULT_UNTIL_SCALAR_ONE_INTERVAL,
+    ready: Optional[Callable[[], Awaitable[Any]]] = None,
+) -> _T:
     '''Execute the statement until it returns exactly one row.
 
-    The statement is repeatedly executed while it returns no rows. An exception
-    is raised if the statement returns more than one row.
+    The statement is executed again every `interval` seconds while it returns no
+    rows. If `ready` is given, the statement is also executed again as soon as
+    `ready()` completes, e.g., when the row is known to be committed; the
+    interval is then only a fallback. An exception is raised if the statement
+    returns more than one row.
     '''
 
-    async def _f() -> T | None:
-        return (await session.execute(stmt)).scalar_one_or_none()
+    async def _f() -> _T | None:
+        ret = (await session.execute(stmt)).scalar_one_or_none()
+        if ret is None:
+            METRICS.inc('until_scalar_one_retries_total')
+        return ret
 
     try:
-        return await until_not_none(_f, timeout=timeout)
+        return await until_not_none(_f, timeout=timeout, interval=interval, wake=ready)
     except Exception:
         logger = getLogger(__name__)
         logger.exception('')
@@ -1,6 +1,6 @@
 import asyncio
 from collections.abc import Awaitable, Callable
-from typing import Optional, TypeVar
+from typing import Any, Optional, TypeVar
 
 T = TypeVar('T')
 
@@ -15,9 +15,14 @@ async def until_not_none(
     *,
     timeout: Optional[float] = None,
     interval: float = 0,
+    wake: Optional[Callable[[], Awaitable[Any]]] = None,
 ) -> T:
     '''Return the first non-None value from `func`.
 
+    `func` is called again after `interval` seconds. If `wake` is given, it is
+    called again as soon as `wake()` completes, at the latest after `interval`
+    seconds.
+
 
     Examples
     --------
@@ -58,7 +63,13 @@ async def until_not_none(
 
     async def _until_not_none() -> T:
         while (ret := await func()) is None:
-            await asyncio.sleep(interval)
+            if wake is None:
+                await asyncio.sleep(interval)
+                continue
+            try:
+                await asyncio.wait_for(wake(), interval)
+            except asyncio.TimeoutError:
+                pass
         return ret
 
     # NOTE: For Python 3.11+, `asyncio.timeout` can be used.
@@ -1,20 +1,53 @@
-__all__ = ['register']
+__all__ = ['register', 'BufferedWriter', 'IdCache', 'StdoutOptions', 'Writer']
+
+from collections.abc import Awaitable, Callable
+from typing import Optional
 
 from nextline import Nextline
 from nextline_rdb.db import DB
+from nextline_rdb.pubsub import Broker
 
+from .ids import IdCache
 from .write_prompt_table import WritePromptTable
 from .write_run_table import WriteRunTable
 from .write_script_table import WriteScriptTable
-from .write_stdout_table import WriteStdoutTable
+from .write_stdout_table import StdoutOptions, WriteStdoutTable
 from .write_trace_call_table import WriteTraceCallTable
 from .write_trace_table import WriteTraceTable
+from .writer import BufferedWriter, Writer
+
+
+def register(
+    nextline: Nextline,
+    db: DB,
+    writer: Optional[Writer] = None,
+    stdout: Optional[StdoutOptions] = None,
+    broker: Optional[Broker] = None,
+) -> Callable[[], Awaitable[None]]:
+    '''Register the plugins that write to the DB.
+
+    Each event is written in its own transaction in the task of the hook unless
+    `writer` is given. The plugin gives a `BufferedWriter`, which writes the
+    events in a single task in the order they occur. The writer needs to be
+    started and closed by the caller.
+
+    `stdout` configures the coalescing and compression of the stdout.
 
+    If `broker` is given, the new runs, updated runs, stdouts, and open prompts
+    are published to it after they are committed.
 
-def register(nextline: Nextline, db: DB) -> None:
-    nextline.register(WriteRunTable(db=db))
-    nextline.register(WriteScriptTable(db=db))
-    nextline.register(WriteTraceTable(db=db))
-    nextline.register(WriteTraceCallTable(db=db))
-    nextline.register(WritePromptTable(db=db))
-    nextline.register(WriteStdoutTable(db=db))
+    Return an async function that writes the stdout held for coalescing. Await
+    it before closing the writer.
+    '''
+    writer = writer or Writer(db)
+    ids = IdCache(writer=writer)
+    nextline.register(WriteRunTable(writer=writer, ids=ids, broker=broker))
+    nextline.register(WriteScriptTable(writer=writer))
+    nextline.register(WriteTraceTable(writer=writer, ids=ids))
+    nextline.register(WriteTraceCallTable(writer=writer, ids=ids))
+    nextline.register(WritePromptTable(writer=writer, ids=ids, broker=broker))
+    stdout_table = WriteStdoutTable(
+        writer=writer, ids=ids, options=stdout, broker=broker
+    )
+    nextline.register(stdout_table)
+    return stdout_table.aclose
@@ -0,0 +1,157 @@
+import asyncio
+from functools import partial
+from typing import TypeAlias
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline.types import RunNo, TraceCallNo, TraceNo
+from nextline_rdb.models import Run, Trace, TraceCall
+
+from .writer import Writer
+
+_Key: TypeAlias = tuple[str, int] | tuple[str, int, int]
+_Entry: TypeAlias = Run | Trace | TraceCall | int
+
+_STAGED = 'nextline_rdb.write.ids'
+
+
+class IdCache:
+    '''The primary keys of runs, traces, and trace calls by their numbers.
+
+    The write hooks use this class to set the foreign keys of new rows without
+    querying the parent rows. A row is queried only when it is not in the cache,
+    e.g., when it was written before the cache was created.
+
+    The rows added or found in a transaction are cached after the transaction
+    is committed. The entries of a run are removed when the run ends, and the
+    entry of a trace call when the trace call ends.
+
+    The cache is also a readiness registry. A hook that looks up a row that is
+    not committed yet, e.g., because its event arrived before the event of the
+    parent row, is woken up when the row is cached instead of polling the DB.
+    The `Writer` waits in the hook; the `BufferedWriter` defers the operation
+    and retries it when woken up.
+    '''
+
+    def __init__(self, writer: Writer) -> None:
+        self._writer = writer
+        self._ids = dict[_Key, int]()
+        self._ready = dict[_Key, set[asyncio.Future[None]]]()  # The waiters
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def run_id(self, session: AsyncSession, run_no: RunNo) -> int:
+        stmt = select(Run.id).filter_by(run_no=run_no)
+        return await self._get(session, ('run', run_no), stmt)
+
+    async def trace_id(
+        self, session: AsyncSession, run_no: RunNo, trace_no: TraceNo
+    ) -> int:
+        stmt = (
+            select(Trace.id)
+            .join(Run)
+            .filter(Run.run_no == run_no, Trace.trace_no == trace_no)
+        )
+        return await self._get(session, ('trace', run_no, trace_no), stmt)
+
+    async def trace_call_id(
+        self, session: AsyncSession, run_no: RunNo, trace_call_no: TraceCallNo
+    ) -> int:
+        stmt = (
+            select(TraceCall.id)
+            .join(Run)
+            .filter(Run.run_no == run_no, TraceCall.trace_call_no == trace_call_no)
+        )
+        return await self._get(session, ('trace_call', run_no, trace_call_no), stmt)
+
+    def add_run(self, session: AsyncSession, run: Run) -> None:
+        self._stage(session, ('run', run.run_no), run)
+
+    def add_trace(self, session: AsyncSession, run_no: RunNo, trace: Trace) -> None:
+        self._stage(session, ('trace', run_no, trace.trace_no), trace)
+
+    def add_trace_call(
+        self, session: AsyncSession, run_no: RunNo, trace_call: TraceCall
+    ) -> None:
+        self._stage(
+            session, ('trace_call', run_no, trace_call.trace_call_no), trace_call
+        )
+
+    def remove_trace_call(
+        self, session: AsyncSession, run_no: RunNo, trace_call_no: TraceCallNo
+    ) -> None:
+        '''Remove the entry of the trace call after the transaction is committed.'''
+        key = ('trace_call', run_no, trace_call_no)
+        self._staged(session).pop(key, None)
+
+        def _remove() -> None:
+            self._ids.pop(key, None)
+
+        self._writer.after_commit(session, _remove)
+
+    def remove_run(self, session: AsyncSession, run_no: RunNo) -> None:
+        '''Remove the entries of the run after the transaction is committed.'''
+        self._staged(session)  # So that the staged entries are cached first
+
+        def _remove() -> None:
+            self._ids = {k: v for k, v in self._ids.items() if k[1] != run_no}
+            for key in [k for k in self._ready if k[1] == run_no]:
+                self._wake(key)  # Let the waiters query the DB
+
+        self._writer.after_commit(session, _remove)
+
+    async def _get(
+        self, session: AsyncSession, key: _Key, stmt: Select[tuple[int]]
+    ) -> int:
+        if (id_ := self._ids.get(key)) is not None:
+            return id_
+        match self._staged(session).get(key):
+            case None:
+                ready = partial(self._wait_ready, key)
+                id_ = await self._writer.scalar_one(session, stmt, ready=ready)
+                self._stage(session, key, id_)
+                return id_
+            case int(id_):
+                return id_
+            case model:
+                if model.id is None:
+                    # Added in this transaction but not inserted yet
+                    await session.flush()
+                return model.id
+
+    async def _wait_ready(self, key: _Key) -> None:
+        '''Wait until the row is cached or the run is removed.'''
+        if key in self._ids:
+            return
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._ready.setdefault(key, set())
+        waiters.add(future)
+        try:
+            await future
+        finally:  # Also when the wait times out
+            waiters.discard(future)
+            if not waiters and self._ready.get(key) is waiters:
+                del self._ready[key]
+
+    def _wake(self, key: _Key) -> None:
+        for future in self._ready.pop(key, ()):
+            if not future.done():
+                future.set_result(None)
+
+    def _stage(self, session: AsyncSession, key: _Key, entry: _Entry) -> None:
+        self._staged(session)[key] = entry
+
+    def _staged(self, session: AsyncSession) -> dict[_Key, _Entry]:
+        if (staged := session.info.get(_STAGED)) is not None:
+            return staged
+        staged = session.info[_STAGED] = dict[_Key, _Entry]()
+
+        def _commit() -> None:
+            for key, entry in staged.items():
+                self._ids[key] = entry if isinstance(entry, int) else entry.id
+                self._wake(key)
+
+        self._writer.after_commit(session, _commit)
+        return staged
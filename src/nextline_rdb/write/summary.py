@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline_rdb.models import RunSummary
+from nextline_rdb.summary import refresh_run_summaries
+
+from .writer import Writer
+
+_DELTAS = 'nextline_rdb.write.summary'
+
+
+@dataclass
+class SummaryDelta:
+    '''The changes to the summary of a run in a transaction.'''
+
+    trace_count: int = 0
+    trace_call_count: int = 0
+    prompt_count: int = 0
+    stdout_count: int = 0
+    stdout_length: int = 0
+    max_concurrent_traces: int = 0
+    first_event_at: Optional[datetime] = None
+    last_event_at: Optional[datetime] = None
+
+    def record(self, at: Optional[datetime]) -> None:
+        '''Update the times of the first and last events with an event at `at`.'''
+        if at is None:
+            return
+        if self.first_event_at is None or at < self.first_event_at:
+            self.first_event_at = at
+        if self.last_event_at is None or at > self.last_event_at:
+            self.last_event_at = at
+
+
+def summary_delta(writer: Writer, session: AsyncSession, run_id: int) -> SummaryDelta:
+    '''The changes to the summary of the run in the transaction of the session.
+
+    The write hooks add to the changes as they write the rows. The changes are
+    written in one `UPDATE` for each run before the transaction is committed,
+    without loading the summary. If the run has no summary, e.g., because it
+    was written by an older version, the summary is computed from the rows.
+    '''
+    deltas: Optional[dict[int, SummaryDelta]] = session.info.get(_DELTAS)
+    if deltas is None:
+        deltas = session.info[_DELTAS] = {}
+        writer.before_commit(session, _write_deltas)
+    if (delta := deltas.get(run_id)) is None:
+        delta = deltas[run_id] = SummaryDelta()
+    return delta
+
+
+async def _write_deltas(session: AsyncSession) -> None:
+    deltas: dict[int, SummaryDelta] = session.info.pop(_DELTAS, {})
+    for run_id, delta in deltas.items():
+        stmt = (
+            update(RunSummary)
+            .where(RunSummary.run_id == run_id)
+            .values(**_values(delta))
+        )
+        result = await session.execute(
+            stmt, execution_options={'synchronize_session': False}
+        )
+        if not result.rowcount:  # type: ignore[attr-defined]
+            # Also counts the rows written in this transaction
+            await refresh_run_summaries(session, [run_id])
+
+
+def _values(delta: SummaryDelta) -> dict[str, Any]:
+    '''The values of the `UPDATE` that adds the changes to the summary.'''
+    values: dict[str, Any] = {
+        'trace_count': RunSummary.trace_count + delta.trace_count,
+        'trace_call_count': RunSummary.trace_call_count + delta.trace_call_count,
+        'prompt_count': RunSummary.prompt_count + delta.prompt_count,
+        'stdout_count': RunSummary.stdout_count + delta.stdout_count,
+        'stdout_length': RunSummary.stdout_length + delta.stdout_length,
+    }
+    if max_ := delta.max_concurrent_traces:
+        max_column = RunSummary.max_concurrent_traces
+        values['max_concurrent_traces'] = case(
+            (max_column < max_, max_), else_=max_column
+        )
+    if (first := delta.first_event_at) is not None:
+        first_column = RunSummary.first_event_at
+        values['first_event_at'] = case(
+            (first_column.is_(None) | (first_column > first), first),
+            else_=first_column,
+        )
+    if (last := delta.last_event_at) is not None:
+        last_column = RunSummary.last_event_at
+        values['last_event_at'] = case(
+            (last_column.is_(None) | (last_column < last), last),
+            else_=last_column,
+        )
+    return values
@@ -1,52 +1,80 @@
+from functools import partial
+from typing import Optional
+
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from nextline.events import OnEndPrompt, OnStartPrompt
 from nextline.plugin.spec import hookimpl
-from nextline_rdb.db import DB
-from nextline_rdb.models import Prompt, Run, Trace, TraceCall
-from nextline_rdb.utils import until_scalar_one
+from nextline_rdb.metrics import timed_hook
+from nextline_rdb.models import Prompt, Run
+from nextline_rdb.pubsub import PROMPT_OPENED, Broker, PromptOpened
+
+from .ids import IdCache
+from .summary import summary_delta
+from .writer import Writer
 
 
 class WritePromptTable:
-    def __init__(self, db: DB) -> None:
-        self._db = db
+    def __init__(
+        self, writer: Writer, ids: IdCache, broker: Optional[Broker] = None
+    ) -> None:
+        self._writer = writer
+        self._ids = ids
+        self._broker = broker
 
     @hookimpl
+    @timed_hook
     async def on_start_prompt(self, event: OnStartPrompt) -> None:
-        async with self._db.session.begin() as session:
-            stmt = (
-                select(TraceCall)
-                .join(TraceCall.trace)
-                .join(TraceCall.run)
-                .filter(
-                    Run.run_no == event.run_no,
-                    Trace.trace_no == event.trace_no,
-                    TraceCall.trace_call_no == event.trace_call_no,
-                )
+        await self._writer.submit(partial(self._on_start_prompt, event))
+
+    async def _on_start_prompt(
+        self, event: OnStartPrompt, session: AsyncSession
+    ) -> None:
+        run_id = await self._ids.run_id(session, event.run_no)
+        trace_id = await self._ids.trace_id(session, event.run_no, event.trace_no)
+        trace_call_id = await self._ids.trace_call_id(
+            session, event.run_no, event.trace_call_no
+        )
+        prompt = Prompt(
+            prompt_no=event.prompt_no,
+            open=True,
+            stdout=event.prompt_text,
+            started_at=event.started_at,
+            run_id=run_id,
+            trace_id=trace_id,
+            trace_call_id=trace_call_id,
+        )
+        session.add(prompt)
+        delta = summary_delta(self._writer, session, run_id)
+        delta.prompt_count += 1
+        delta.record(event.started_at)
+        if (broker := self._broker) is not None:
+            item = PromptOpened(
+                prompt=prompt,
+                run_no=event.run_no,
+                trace_no=event.trace_no,
+                event=event.event,
+                file_name=event.file_name,
+                line_no=event.line_no,
             )
-            stmt = stmt.options(selectinload(TraceCall.trace).selectinload(Trace.run))
-            trace_call = await until_scalar_one(session, stmt)
-            prompt = Prompt(
-                prompt_no=event.prompt_no,
-                open=True,
-                stdout=event.prompt_text,
-                started_at=event.started_at,
-                run=trace_call.trace.run,
-                trace=trace_call.trace,
-                trace_call=trace_call,
+            self._writer.after_commit(
+                session, partial(broker.publish, PROMPT_OPENED, item)
             )
-            session.add(prompt)
 
     @hookimpl
+    @timed_hook
     async def on_end_prompt(self, event: OnEndPrompt) -> None:
-        async with self._db.session.begin() as session:
-            stmt = (
-                select(Prompt)
-                .join(Run)
-                .filter(Run.run_no == event.run_no, Prompt.prompt_no == event.prompt_no)
-            )
-            prompt = await until_scalar_one(session, stmt)
-            prompt.open = False
-            prompt.command = event.command
-            prompt.ended_at = event.ended_at
+        await self._writer.submit(partial(self._on_end_prompt, event))
+
+    async def _on_end_prompt(self, event: OnEndPrompt, session: AsyncSession) -> None:
+        stmt = (
+            select(Prompt)
+            .join(Run)
+            .filter(Run.run_no == event.run_no, Prompt.prompt_no == event.prompt_no)
+        )
+        prompt = await self._writer.scalar_one(session, stmt)
+        prompt.open = False
+        prompt.command = event.command
+        prompt.ended_at = event.ended_at
+        summary_delta(self._writer, session, prompt.run_id).record(event.ended_at)
@@ -1,41 +1,60 @@
 from datetime import timezone
+from functools import partial
 from logging import getLogger
+from typing import Optional
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from nextline.events import OnEndRun, OnStartRun
 from nextline.plugin.spec import hookimpl
-from nextline_rdb.db import DB
-from nextline_rdb.models import CurrentScript, Run, Script
-from nextline_rdb.utils import until_scalar_one
+from nextline.types import RunNo
+from nextline_rdb.metrics import timed_hook
+from nextline_rdb.models import CurrentScript, Run, Script, script_sha256
+from nextline_rdb.pubsub import RUN_ADDED, RUN_UPDATED, Broker, RunChanged
+from nextline_rdb.summary import new_summary
+
+from .ids import IdCache
+from .write_script_table import get_script, load_current_script
+from .writer import Writer
 
 
 class WriteRunTable:
-    def __init__(self, db: DB) -> None:
-        self._db = db
+    def __init__(
+        self, writer: Writer, ids: IdCache, broker: Optional[Broker] = None
+    ) -> None:
+        self._writer = writer
+        self._ids = ids
+        self._broker = broker
+        self._statements = dict[RunNo, Optional[str]]()  # For publishing
         self._logger = getLogger(__name__)
 
     @hookimpl
+    @timed_hook
     async def on_start_run(self, event: OnStartRun) -> None:
         assert event.started_at.tzinfo is timezone.utc
+        # Wait so that the run is in the DB when it is reported as started.
+        await self._writer.submit(partial(self._on_start_run, event), wait=True)
+
+    async def _on_start_run(self, event: OnStartRun, session: AsyncSession) -> None:
         started_at = event.started_at.replace(tzinfo=None)
-        async with self._db.session.begin() as session:
-            script = await self._find_script(event, session)
-            run = Run(
-                run_no=event.run_no,
-                state='running',
-                started_at=started_at,
-                script=script,
-            )
-            session.add(run)
+        script = await self._find_script(event, session)
+        run = Run(
+            run_no=event.run_no,
+            state='running',
+            started_at=started_at,
+            script=script,
+        )
+        new_summary(run)
+        session.add(run)
+        self._ids.add_run(session, run)
+        self._statements[event.run_no] = self._str_statement_or_none(event)
+        self._publish(session, RUN_ADDED, run)
 
     async def _find_script(
         self, event: OnStartRun, session: AsyncSession
     ) -> Script | None:
         statement = self._str_statement_or_none(event)
-        current_script = await self._load_current_script(session)
+        current_script = await load_current_script(session)
         match statement, current_script:
             case None, None:
                 return None
@@ -48,14 +67,15 @@ class WriteRunTable:
                 self._logger.warning(
                     'CurrentScript is None, but run_arg.statement is not None'
                 )
-                return Script(script=statement_, current=True)
+                script = await get_script(session, statement_)
+                session.add(CurrentScript(script=script))
+                return script
             case str(statement_), CurrentScript() as cs:
-                if not cs.script.script == statement:
+                if cs.script.sha256 != script_sha256(statement_):
                     self._logger.warning(
                         'The statement in CurrentScript is different from run_arg.statement'
                     )
-                    s = Script(script=statement_)
-                    cs.script = s
+                    cs.script = await get_script(session, statement_)
                 return cs.script
         return None
 
@@ -64,17 +84,27 @@ class WriteRunTable:
             return event.statement
         return None
 
-    async def _load_current_script(self, session: AsyncSession) -> CurrentScript | None:
-        stmt = select(CurrentScript).options(selectinload(CurrentScript.script))
-        return (await session.execute(stmt)).scalar_one_or_none()
-
     @hookimpl
+    @timed_hook
     async def on_end_run(self, event: OnEndRun) -> None:
         assert event.ended_at.tzinfo is timezone.utc
+        await self._writer.submit(partial(self._on_end_run, event), wait=True)
+
+    async def _on_end_run(self, event: OnEndRun, session: AsyncSession) -> None:
         ended_at = event.ended_at.replace(tzinfo=None)
-        async with self._db.session.begin() as session:
-            stmt = select(Run).filter_by(run_no=event.run_no)
-            run = await until_scalar_one(session, stmt)
-            run.state = 'finished'
-            run.ended_at = ended_at
-            run.exception = event.raised
+        run_id = await self._ids.run_id(session, event.run_no)
+        run = await session.get_one(Run, run_id)
+        run.state = 'finished'
+        run.ended_at = ended_at
+        run.exception = event.raised
+        self._ids.remove_run(session, event.run_no)
+        self._publish(session, RUN_UPDATED, run)
+
+    def _publish(self, session: AsyncSession, topic: str, run: Run) -> None:
+        if (broker := self._broker) is None:
+            return
+        # The script text is not loaded in the writer
+        item = RunChanged(run=run, script=self._statements.get(RunNo(run.run_no)))
+        if topic == RUN_UPDATED:
+            self._statements.pop(RunNo(run.run_no), None)
+        self._writer.after_commit(session, partial(broker.publish, topic, item))
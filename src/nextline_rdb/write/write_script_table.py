@@ -1,51 +1,75 @@
+from functools import partial
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, selectinload
 
 from nextline.plugin.spec import Context, hookimpl
 from nextline.spawned import RunArg
-from nextline_rdb.db import DB
-from nextline_rdb.models import CurrentScript, Script
+from nextline_rdb.metrics import timed_hook
+from nextline_rdb.models import CurrentScript, Script, script_sha256
+
+from .writer import Op, Writer
 
 
 class WriteScriptTable:
-    def __init__(self, db: DB) -> None:
-        self._db = db
+    def __init__(self, writer: Writer) -> None:
+        self._writer = writer
 
     @hookimpl
+    @timed_hook
     async def on_initialize_run(self, context: Context) -> None:
         assert (run_arg := context.run_arg)
         statement = self._str_statement_or_none(run_arg)
+        op: Op
         if statement is not None:
-            await self._on_initialize_run_with_statement(statement)
+            op = partial(self._on_initialize_run_with_statement, statement)
         else:
-            await self._on_initialize_run_without_statement()
+            op = self._on_initialize_run_without_statement
+        await self._writer.submit(op)
 
     def _str_statement_or_none(self, run_arg: RunArg) -> str | None:
         if isinstance(run_arg.statement, str):
             return run_arg.statement
         return None
 
-    async def _on_initialize_run_without_statement(self) -> None:
-        async with self._db.session.begin() as session:
-            current_script = await self._load_current_script(session)
-            if current_script is not None:
-                await session.delete(current_script)
-
-    async def _on_initialize_run_with_statement(self, statement: str) -> None:
-        async with self._db.session.begin() as session:
-            current_script = await self._load_current_script(session)
-            if current_script is not None:
-                if current_script.script.script == statement:
-                    script = current_script.script
-                else:
-                    script = Script(script=statement)
-                    current_script.script = script
-            else:
-                script = Script(script=statement)
-                current_script = CurrentScript(script=script)
-                session.add(current_script)
-
-    async def _load_current_script(self, session: AsyncSession) -> CurrentScript | None:
-        stmt = select(CurrentScript).options(selectinload(CurrentScript.script))
-        return (await session.execute(stmt)).scalar_one_or_none()
+    async def _on_initialize_run_with_statement(
+        self, statement: str, session: AsyncSession
+    ) -> None:
+        current_script = await load_current_script(session)
+        if current_script is not None:
+            if current_script.script.sha256 != script_sha256(statement):
+                current_script.script = await get_script(session, statement)
+        else:
+            script = await get_script(session, statement)
+            current_script = CurrentScript(script=script)
+            session.add(current_script)
+
+    async def _on_initialize_run_without_statement(self, session: AsyncSession) -> None:
+        current_script = await load_current_script(session)
+        if current_script is not None:
+            await session.delete(current_script)
+
+
+async def load_current_script(session: AsyncSession) -> CurrentScript | None:
+    '''The current script with the hash but without the text of the script.'''
+    stmt = select(CurrentScript).options(
+        selectinload(CurrentScript.script).load_only(Script.sha256)
+    )
+    return (await session.execute(stmt)).scalar_one_or_none()
+
+
+async def get_script(session: AsyncSession, statement: str) -> Script:
+    '''The script of the statement, added to the session if not in the DB.
+
+    The script is looked up by the hash so that each script is stored once.
+    '''
+    stmt = (
+        select(Script)
+        .where(Script.sha256 == script_sha256(statement))
+        .options(load_only(Script.sha256))
+    )
+    if (script := (await session.execute(stmt)).scalar_one_or_none()) is None:
+        script = Script(script=statement)
+        session.add(script)
+    return script
@@ -1,31 +1,172 @@
-from sqlalchemy import select
+import asyncio
+import datetime
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Optional
 
-from nextline.events import OnWriteStdout
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline.events import OnEndRun, OnWriteStdout
 from nextline.plugin.spec import hookimpl
-from nextline_rdb.db import DB
-from nextline_rdb.models import Run, Stdout, Trace
-from nextline_rdb.utils import until_scalar_one
+from nextline.types import RunNo, TraceNo
+from nextline_rdb.metrics import timed_hook
+from nextline_rdb.models import Stdout
+from nextline_rdb.pubsub import Broker, StdoutAppended, stdout_appended
+from nextline_rdb.utils.compress import check_compression, compress_text
+
+from .ids import IdCache
+from .summary import summary_delta
+from .writer import Writer
+
+
+@dataclass(frozen=True)
+class StdoutOptions:
+    '''How the stdout is written. The defaults write each write as is.
+
+    If `coalesce_window` is given, consecutive writes from the same trace are
+    merged into one row as long as they are written within `coalesce_window`
+    seconds of the first write and the text is at most `coalesce_max_size`
+    characters. The row is written at the latest `coalesce_window` seconds
+    after the first write.
+
+    If `compression`, e.g., "zlib", is given, the texts of at least
+    `compression_min_size` characters are compressed.
+    '''
+
+    coalesce_window: Optional[float] = None  # seconds
+    coalesce_max_size: int = 65_536  # characters
+    compression: Optional[str] = None
+    compression_min_size: int = 1_024  # characters
+
+    def __post_init__(self) -> None:
+        if self.compression is not None:
+            check_compression(self.compression)
+
+
+@dataclass
+class _Pending:
+    run_no: RunNo
+    trace_no: TraceNo
+    written_at: datetime.datetime  # of the first write
+    texts: list[str] = field(default_factory=list)
+    size: int = 0
+    timer: Optional[asyncio.Task[None]] = None  # Flushes after the window
 
 
 class WriteStdoutTable:
-    def __init__(self, db: DB) -> None:
-        self._db = db
+    def __init__(
+        self,
+        writer: Writer,
+        ids: IdCache,
+        options: Optional[StdoutOptions] = None,
+        broker: Optional[Broker] = None,
+    ) -> None:
+        self._writer = writer
+        self._ids = ids
+        self._options = options or StdoutOptions()
+        self._broker = broker
+        self._pending: Optional[_Pending] = None
+        self._timers = set[asyncio.Task[None]]()
 
     @hookimpl
+    @timed_hook
     async def on_write_stdout(self, event: OnWriteStdout) -> None:
-        async with self._db.session.begin() as session:
-            select_runs = select(Run).filter_by(run_no=event.run_no)
-            run = await until_scalar_one(session, select_runs)
-            select_traces = (
-                select(Trace)
-                .join(Run)
-                .filter(Run.run_no == event.run_no, Trace.trace_no == event.trace_no)
+        if (window := self._options.coalesce_window) is None:
+            await self._submit(
+                event.run_no, event.trace_no, event.text, event.written_at
             )
-            trace = await until_scalar_one(session, select_traces)
-            stdout = Stdout(
-                text=event.text,
+            return
+
+        pending = self._pending
+        if pending is not None and (
+            (pending.run_no, pending.trace_no) != (event.run_no, event.trace_no)
+            or (event.written_at - pending.written_at).total_seconds() > window
+            or pending.size + len(event.text) > self._options.coalesce_max_size
+        ):
+            await self._flush()
+            pending = None
+
+        if pending is None:
+            pending = self._pending = _Pending(
+                run_no=event.run_no,
+                trace_no=event.trace_no,
                 written_at=event.written_at,
-                run=run,
-                trace=trace,
             )
-            session.add(stdout)
+            pending.timer = asyncio.create_task(self._flush_later(pending, window))
+            self._timers.add(pending.timer)
+            pending.timer.add_done_callback(self._timers.discard)
+
+        pending.texts.append(event.text)
+        pending.size += len(event.text)
+
+    @hookimpl
+    @timed_hook
+    async def on_end_run(self, event: OnEndRun) -> None:
+        del event
+        await self._flush()
+
+    async def aclose(self) -> None:
+        '''Write the stdout held for coalescing and wait for the timers.
+
+        Call before the writer is closed.
+        '''
+        await self._flush()
+        # The timers left are cancelled or flushing
+        await asyncio.gather(*self._timers, return_exceptions=True)
+
+    async def _flush_later(self, pending: _Pending, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if self._pending is pending:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if (pending := self._pending) is None:
+            return
+        self._pending = None
+        # The timer is still sleeping unless it is the caller
+        if pending.timer is not None and pending.timer is not asyncio.current_task():
+            pending.timer.cancel()
+        text = ''.join(pending.texts)
+        await self._submit(pending.run_no, pending.trace_no, text, pending.written_at)
+
+    async def _submit(
+        self,
+        run_no: RunNo,
+        trace_no: TraceNo,
+        text: str,
+        written_at: datetime.datetime,
+    ) -> None:
+        await self._writer.submit(
+            partial(self._write_stdout, run_no, trace_no, text, written_at)
+        )
+
+    async def _write_stdout(
+        self,
+        run_no: RunNo,
+        trace_no: TraceNo,
+        text: str,
+        written_at: datetime.datetime,
+        session: AsyncSession,
+    ) -> None:
+        run_id = await self._ids.run_id(session, run_no)
+        trace_id = await self._ids.trace_id(session, run_no, trace_no)
+        stdout = Stdout(
+            text=text,
+            written_at=written_at,
+            run_id=run_id,
+            trace_id=trace_id,
+        )
+        compression = self._options.compression
+        if compression is not None and len(text) >= self._options.compression_min_size:
+            stdout.text = None
+            stdout.compression = compression
+            stdout.text_compressed = compress_text(text, compression)
+        session.add(stdout)
+        delta = summary_delta(self._writer, session, run_id)
+        delta.stdout_count += 1
+        delta.stdout_length += len(text)
+        delta.record(written_at)
+        if (broker := self._broker) is not None:
+            item = StdoutAppended(stdout=stdout, run_no=run_no, trace_no=trace_no)
+            topic = stdout_appended(run_no)
+            self._writer.after_commit(session, partial(broker.publish, topic, item))
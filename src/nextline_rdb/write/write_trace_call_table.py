@@ -1,52 +1,61 @@
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from functools import partial
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from nextline.events import OnEndTraceCall, OnStartTraceCall
 from nextline.plugin.spec import hookimpl
-from nextline.types import TraceNo
-from nextline_rdb.db import DB
-from nextline_rdb.models import Run, Trace, TraceCall
-from nextline_rdb.utils import until_scalar_one
+from nextline_rdb.metrics import timed_hook
+from nextline_rdb.models import TraceCall
+
+from .ids import IdCache
+from .summary import summary_delta
+from .writer import Writer
 
 
 class WriteTraceCallTable:
-    def __init__(self, db: DB) -> None:
-        self._db = db
-        self._running_trace_nos = set[TraceNo]()
+    def __init__(self, writer: Writer, ids: IdCache) -> None:
+        self._writer = writer
+        self._ids = ids
 
     @hookimpl
+    @timed_hook
     async def on_start_trace_call(self, event: OnStartTraceCall) -> None:
-        async with self._db.session.begin() as session:
-            stmt = (
-                select(Trace)
-                .join(Run)
-                .filter(Run.run_no == event.run_no, Trace.trace_no == event.trace_no)
-            )
-            stmt = stmt.options(selectinload(Trace.run))
-            trace = await until_scalar_one(session, stmt)
-            trace_call = TraceCall(
-                trace_call_no=event.trace_call_no,
-                started_at=event.started_at,
-                file_name=event.file_name,
-                line_no=event.line_no,
-                event=event.event,
-                run=trace.run,
-                trace=trace,
-            )
-            session.add(trace_call)
+        await self._writer.submit(partial(self._on_start_trace_call, event))
+
+    async def _on_start_trace_call(
+        self, event: OnStartTraceCall, session: AsyncSession
+    ) -> None:
+        run_id = await self._ids.run_id(session, event.run_no)
+        trace_id = await self._ids.trace_id(session, event.run_no, event.trace_no)
+        trace_call = TraceCall(
+            trace_call_no=event.trace_call_no,
+            started_at=event.started_at,
+            file_name=event.file_name,
+            line_no=event.line_no,
+            event=event.event,
+            run_id=run_id,
+            trace_id=trace_id,
+        )
+        session.add(trace_call)
+        self._ids.add_trace_call(session, event.run_no, trace_call)
+        delta = summary_delta(self._writer, session, run_id)
+        delta.trace_call_count += 1
+        delta.record(event.started_at)
 
     @hookimpl
+    @timed_hook
     async def on_end_trace_call(self, event: OnEndTraceCall) -> None:
-        async with self._db.session.begin() as session:
-            stmt = (
-                select(TraceCall)
-                .join(Trace)
-                .join(Run)
-                .filter(
-                    Run.run_no == event.run_no,
-                    Trace.trace_no == event.trace_no,
-                    TraceCall.trace_call_no == event.trace_call_no,
-                )
-            )
-            trace_call = await until_scalar_one(session, stmt)
-            trace_call.ended_at = event.ended_at
+        await self._writer.submit(partial(self._on_end_trace_call, event))
+
+    async def _on_end_trace_call(
+        self, event: OnEndTraceCall, session: AsyncSession
+    ) -> None:
+        trace_call_id = await self._ids.trace_call_id(
+            session, event.run_no, event.trace_call_no
+        )
+        # A trace call ends only once
+        self._ids.remove_trace_call(session, event.run_no, event.trace_call_no)
+        trace_call = await session.get_one(TraceCall, trace_call_id)
+        trace_call.ended_at = event.ended_at
+        delta = summary_delta(self._writer, session, trace_call.run_id)
+        delta.record(event.ended_at)
@@ -1,68 +1,96 @@
-from datetime import timezone
+from collections.abc import Set
+from datetime import datetime, timezone
+from functools import partial
 
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from nextline.events import OnEndRun, OnEndTrace, OnStartTrace
 from nextline.plugin.spec import hookimpl
-from nextline.types import TraceNo
-from nextline_rdb.db import DB
+from nextline.types import RunNo, TraceNo
+from nextline_rdb.metrics import timed_hook
 from nextline_rdb.models import Run, Trace
-from nextline_rdb.utils import until_scalar_one
+
+from .ids import IdCache
+from .summary import summary_delta
+from .writer import Writer
 
 
 class WriteTraceTable:
-    def __init__(self, db: DB) -> None:
-        self._db = db
+    def __init__(self, writer: Writer, ids: IdCache) -> None:
+        self._writer = writer
+        self._ids = ids
         self._running_trace_nos = set[TraceNo]()
 
     @hookimpl
+    @timed_hook
     async def on_start_trace(self, event: OnStartTrace) -> None:
-        async with self._db.session.begin() as session:
-            stmt = select(Run).filter_by(run_no=event.run_no)
-            run = await until_scalar_one(session, stmt)
-            trace = Trace(
-                trace_no=event.trace_no,
-                state='running',
-                thread_no=event.thread_no,
-                task_no=event.task_no,
-                started_at=event.started_at,
-                run=run,
-            )
-            session.add(trace)
         self._running_trace_nos.add(event.trace_no)
+        running = len(self._running_trace_nos)
+        await self._writer.submit(partial(self._on_start_trace, event, running))
+
+    async def _on_start_trace(
+        self, event: OnStartTrace, running: int, session: AsyncSession
+    ) -> None:
+        run_id = await self._ids.run_id(session, event.run_no)
+        trace = Trace(
+            trace_no=event.trace_no,
+            state='running',
+            thread_no=event.thread_no,
+            task_no=event.task_no,
+            started_at=event.started_at,
+            run_id=run_id,
+        )
+        session.add(trace)
+        self._ids.add_trace(session, event.run_no, trace)
+        delta = summary_delta(self._writer, session, run_id)
+        delta.trace_count += 1
+        delta.max_concurrent_traces = max(delta.max_concurrent_traces, running)
+        delta.record(event.started_at)
 
     @hookimpl
+    @timed_hook
     async def on_end_trace(self, event: OnEndTrace) -> None:
-        async with self._db.session.begin() as session:
-            stmt = (
-                select(Trace)
-                .join(Run)
-                .filter(Run.run_no == event.run_no, Trace.trace_no == event.trace_no)
-            )
-            trace = await until_scalar_one(session, stmt)
-            trace.state = 'finished'
-            trace.ended_at = event.ended_at
-        self._running_trace_nos.remove(event.trace_no)
+        self._running_trace_nos.discard(event.trace_no)
+        await self._writer.submit(partial(self._on_end_trace, event))
+
+    async def _on_end_trace(self, event: OnEndTrace, session: AsyncSession) -> None:
+        trace_id = await self._ids.trace_id(session, event.run_no, event.trace_no)
+        trace = await session.get_one(Trace, trace_id)
+        trace.state = 'finished'
+        trace.ended_at = event.ended_at
+        summary_delta(self._writer, session, trace.run_id).record(event.ended_at)
 
     @hookimpl
+    @timed_hook
     async def on_start_run(self) -> None:
         self._running_trace_nos.clear()
 
     @hookimpl
+    @timed_hook
     async def on_end_run(self, event: OnEndRun) -> None:
         assert event.ended_at.tzinfo is timezone.utc
         ended_at = event.ended_at.replace(tzinfo=None)
-        run_no = event.run_no
-        async with self._db.session.begin() as session:
-            stmt = (
-                select(Trace)
-                .join(Run)
-                .filter(
-                    Run.run_no == run_no, Trace.trace_no.in_(self._running_trace_nos)
-                )
-            )
-            traces = (await session.execute(stmt)).scalars().all()
-            for trace in traces:
-                trace.state = 'finished'
-                trace.ended_at = ended_at
+        # Copy the trace numbers as the operation might be applied later.
+        trace_nos = frozenset(self._running_trace_nos)
         self._running_trace_nos.clear()
+        op = partial(self._end_running_traces, event.run_no, trace_nos, ended_at)
+        await self._writer.submit(op)
+
+    async def _end_running_traces(
+        self,
+        run_no: RunNo,
+        trace_nos: Set[TraceNo],
+        ended_at: datetime,
+        session: AsyncSession,
+    ) -> None:
+        stmt = (
+            select(Trace)
+            .join(Run)
+            .filter(Run.run_no == run_no, Trace.trace_no.in_(trace_nos))
+        )
+        traces = (await session.execute(stmt)).scalars().all()
+        for trace in traces:
+            trace.state = 'finished'
+            trace.ended_at = ended_at
+            summary_delta(self._writer, session, trace.run_id).record(ended_at)
@@ -0,0 +1,370 @@
+import asyncio
+from asyncio import FIRST_COMPLETED
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from functools import partial
+from logging import getLogger
+from typing import Any, Optional, TypeVar
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline_rdb.db import DB
+from nextline_rdb.metrics import METRICS
+from nextline_rdb.utils import until_scalar_one
+from nextline_rdb.utils.sa import DEFAULT_UNTIL_SCALAR_ONE_TIMEOUT
+
+T = TypeVar('T')
+
+Op = Callable[[AsyncSession], Awaitable[None]]
+
+RETRY_INTERVAL = 0.1  # seconds
+
+_BEFORE_COMMIT = 'nextline_rdb.write.before_commit'
+_AFTER_COMMIT = 'nextline_rdb.write.after_commit'
+
+
+class NotReady(Exception):
+    '''Raised in a batch when a row an operation depends on is not in the DB yet.
+
+    `ready` is the argument of the same name of `scalar_one()`.
+    '''
+
+    def __init__(
+        self, stmt: Any, ready: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> None:
+        super().__init__(stmt)
+        self.ready = ready
+
+
+class Writer:
+    '''Apply each operation in its own transaction.
+
+    >>> async def main():
+    ...     async with DB() as db, Writer(db) as writer:
+    ...         async def op(session):
+    ...             pass
+    ...         await writer.submit(op)
+    >>> asyncio.run(main())
+
+    '''
+
+    def __init__(self, db: DB) -> None:
+        self._db = db
+        self.n_commits = 0
+
+    async def submit(self, op: Op, wait: bool = False) -> None:
+        '''Apply the operation.
+
+        The operation might be applied after this method returns unless `wait`
+        is true. This class always applies it before returning.
+        '''
+        del wait
+        async with self._db.session.begin() as session:
+            await _timed(op, session)
+            await _call_before_commit(session)
+        _call_after_commit(session)
+        self.n_commits += 1
+
+    async def scalar_one(
+        self,
+        session: AsyncSession,
+        stmt: Select[tuple[T]],
+        ready: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> T:
+        '''The row that the operation depends on. Wait until it is committed.
+
+        `ready()`, if given, completes when the row is committed. The DB is
+        queried again then instead of being polled.
+        '''
+        return await until_scalar_one(session, stmt, ready=ready)
+
+    def before_commit(
+        self, session: AsyncSession, func: Callable[[AsyncSession], Awaitable[None]]
+    ) -> None:
+        '''Await `func(session)` after the operations in the transaction.
+
+        Called once before the transaction of the session is committed, e.g., to
+        write what the operations have accumulated in it.
+        '''
+        session.info.setdefault(_BEFORE_COMMIT, list[Any]()).append(func)
+
+    def after_commit(self, session: AsyncSession, func: Callable[[], None]) -> None:
+        '''Call `func` after the transaction of the session is committed.
+
+        `func` is not called if the transaction is rolled back.
+        '''
+        session.info.setdefault(_AFTER_COMMIT, list[Callable[[], None]]()).append(func)
+
+    async def flush(self) -> None:
+        pass
+
+    async def start(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    async def __aenter__(self) -> 'Writer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_: Any, **__: Any) -> None:
+        await self.aclose()
+
+
+async def _call_before_commit(session: AsyncSession) -> None:
+    for func in session.info.pop(_BEFORE_COMMIT, ()):
+        await func(session)
+
+
+def _call_after_commit(session: AsyncSession) -> None:
+    for func in session.info.pop(_AFTER_COMMIT, ()):
+        func()
+
+
+async def _timed(op: Op, session: AsyncSession) -> None:
+    '''Apply the operation and observe the seconds, labeled with its name.
+
+    The seconds in the DB, which the hooks don't include if they only queue the
+    operation. The commit is in `writer_batch_duration_seconds`.
+    '''
+    func = op.func if isinstance(op, partial) else op
+    name = getattr(func, '__qualname__', type(func).__qualname__)
+    with METRICS.time('writer_op_duration_seconds', {'op': name}):
+        await op(session)
+
+
+@dataclass(eq=False)
+class _Pending:
+    op: Op
+    done: Optional[asyncio.Future[None]] = None  # Set if the submitter waits
+    deadline: Optional[float] = None  # Set when the op is first deferred
+    ready: Optional[asyncio.Task[Any]] = None  # Done when the op might be ready
+
+
+class BufferedWriter(Writer):
+    '''Queue operations and apply them in batches, one transaction per batch.
+
+    A single task applies the operations in the order they are submitted. The
+    DB has only one writer, and `submit()` returns without waiting for the DB
+    unless `wait` is true. With `max_batch_size=1`, each operation is applied
+    in its own transaction.
+
+    A batch is applied when it has `max_batch_size` operations or when
+    `max_delay` seconds have passed since its first operation. The queue holds
+    at most `max_queue_size` operations; `submit()` waits while it is full.
+
+    Operations that raise `NotReady`, e.g., because the event of the parent row
+    arrived later, are deferred to the next batch. They are dropped with an
+    error log if they are still not ready after `timeout` seconds. They are
+    retried as soon as the row they wait for is committed if `scalar_one()` is
+    given `ready`, and otherwise at intervals of at least `RETRY_INTERVAL`
+    seconds.
+
+    A deferred operation is therefore applied after operations submitted later
+    than it. The order between operations is only kept by the rows they wait
+    for, e.g., the end of a trace call waits for the row of its start and is
+    never committed before it.
+
+    The hooks return once their operations are queued. The seconds of each
+    operation are in the histogram `writer_op_duration_seconds` and those of
+    each batch, including the commit, in `writer_batch_duration_seconds`.
+
+    >>> async def main():
+    ...     async with DB() as db:
+    ...         writer = BufferedWriter(db, max_batch_size=100, max_delay=0.01)
+    ...         async with writer:
+    ...             async def op(session):
+    ...                 pass
+    ...             for _ in range(250):
+    ...                 await writer.submit(op)
+    ...             await writer.flush()
+    ...     return writer.n_commits
+    >>> asyncio.run(main())
+    3
+
+    '''
+
+    def __init__(
+        self,
+        db: DB,
+        max_batch_size: int = 1000,
+        max_delay: float = 1.0,  # seconds
+        max_queue_size: int = 10_000,
+        timeout: float = DEFAULT_UNTIL_SCALAR_ONE_TIMEOUT,  # seconds
+    ) -> None:
+        super().__init__(db)
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._timeout = timeout
+        self._queue = asyncio.Queue[_Pending | None](maxsize=max_queue_size)
+        self._deferred = list[_Pending]()
+        self._closing = False
+        self._task: asyncio.Task[None] | None = None
+        self._logger = getLogger(__name__)
+
+    async def submit(self, op: Op, wait: bool = False) -> None:
+        done = asyncio.get_running_loop().create_future() if wait else None
+        await self._queue.put(_Pending(op, done=done))
+        if done is not None:
+            await done
+
+    async def scalar_one(
+        self,
+        session: AsyncSession,
+        stmt: Select[tuple[T]],
+        ready: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> T:
+        '''The row that the operation depends on. Raise `NotReady` if not found.
+
+        The operation is retried in a later batch, as soon as `ready()`
+        completes if given.
+        '''
+        if (ret := (await session.execute(stmt)).scalar_one_or_none()) is None:
+            raise NotReady(stmt, ready)
+        return ret
+
+    async def flush(self) -> None:
+        '''Wait until all operations submitted so far are applied or dropped.'''
+        await self._queue.join()
+
+    async def start(self) -> None:
+        METRICS.set_gauge('writer_queue_size', self._queue.qsize)
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        METRICS.remove_gauge('writer_queue_size')
+
+    async def _run(self) -> None:
+        while batch := await self._collect():
+            await self._apply(batch)
+
+    async def _collect(self) -> list[_Pending]:
+        batch, self._deferred = self._deferred, []
+        # Give the deferred a moment before retrying unless they are ready.
+        delay = max(self._max_delay, RETRY_INTERVAL) if batch else self._max_delay
+        waiting = [item.ready for item in batch if item.ready is not None]
+        if batch and self._closing:
+            # Nothing new will come.
+            if waiting:
+                await asyncio.wait(waiting, timeout=delay, return_when=FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(delay)
+            return batch
+        loop = asyncio.get_running_loop()
+        deadline = (loop.time() + delay) if batch else None
+        # The deferred don't count toward the batch size.
+        max_size = len(batch) + self._max_batch_size
+        while not self._closing and len(batch) < max_size:
+            if any(ready.done() for ready in waiting):
+                break
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                item = await self._get(waiting, timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                self._queue.task_done()
+                self._closing = True
+                break
+            batch.append(item)
+            if item.done is not None:
+                break  # Don't keep the submitter waiting
+            if deadline is None:
+                deadline = loop.time() + delay
+        return batch
+
+    async def _get(
+        self, waiting: list[asyncio.Task[Any]], timeout: Optional[float]
+    ) -> Optional[_Pending]:
+        '''The next item in the queue.
+
+        Raise `TimeoutError` after `timeout` seconds or when any of `waiting`
+        completes first.
+        '''
+        if not waiting:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        get = asyncio.ensure_future(self._queue.get())
+        await asyncio.wait(
+            [get, *waiting], timeout=timeout, return_when=FIRST_COMPLETED
+        )
+        if not get.done():
+            get.cancel()
+            await asyncio.wait([get])
+        if get.cancelled():
+            raise asyncio.TimeoutError
+        return get.result()
+
+    async def _apply(self, batch: list[_Pending]) -> None:
+        with METRICS.time('writer_batch_duration_seconds'):
+            try:
+                deferred = await self._apply_in_one_transaction(batch)
+            except Exception:
+                self._logger.exception('Failed to apply a batch. Retrying one by one.')
+                deferred = await self._apply_one_by_one(batch)
+        METRICS.inc('writer_ops_total', value=len(batch) - len(deferred))
+        METRICS.inc('writer_deferred_total', value=len(deferred))
+
+        not_ready = set(deferred)  # By identity
+        now = asyncio.get_running_loop().time()
+        for item in batch:
+            if item not in not_ready:
+                self._done(item)
+                continue
+            if item.deadline is None:
+                item.deadline = now + self._timeout
+            if now < item.deadline:
+                self._deferred.append(item)
+                continue
+            self._logger.error(f'Timed out after {self._timeout} seconds: {item.op!r}')
+            self._done(item)
+
+    def _done(self, item: _Pending) -> None:
+        if item.ready is not None:
+            item.ready.cancel()
+        if item.done is not None and not item.done.done():
+            item.done.set_result(None)
+        self._queue.task_done()
+
+    async def _apply_in_one_transaction(self, batch: list[_Pending]) -> list[_Pending]:
+        deferred = list[_Pending]()
+        async with self._db.session.begin() as session:
+            for item in batch:
+                try:
+                    await _timed(item.op, session)
+                except NotReady as e:
+                    deferred.append(item)
+                    _watch(item, e.ready)
+            await _call_before_commit(session)
+        _call_after_commit(session)
+        self.n_commits += 1
+        return deferred
+
+    async def _apply_one_by_one(self, batch: list[_Pending]) -> list[_Pending]:
+        deferred = list[_Pending]()
+        for item in batch:
+            try:
+                async with self._db.session.begin() as session:
+                    await _timed(item.op, session)
+                    await _call_before_commit(session)
+                _call_after_commit(session)
+                self.n_commits += 1
+            except NotReady as e:
+                deferred.append(item)
+                _watch(item, e.ready)
+            except Exception:
+                self._logger.exception(f'Failed to apply: {item.op!r}')
+        return deferred
+
+
+def _watch(item: _Pending, ready: Optional[Callable[[], Awaitable[Any]]]) -> None:
+    '''Wait for the row that the deferred operation waits for in a task.'''
+    if item.ready is not None:
+        item.ready.cancel()  # The operation might wait for another row now
+    item.ready = None if ready is None else asyncio.ensure_future(ready())
@@ -0,0 +1,98 @@
+import datetime
+from asyncio import to_thread
+from typing import Any
+
+import sqlalchemy as sa
+from alembic import command
+from hypothesis import Phase, given, note, settings
+from hypothesis import strategies as st
+
+from nextline_rdb.utils import ensure_sync_url
+from nextline_rdb.utils.compress import compress_text
+
+from .conftest import AlembicConfigFactory
+
+REVISION_START = '1f7b9f1a316b'
+REVISION_NEW = 'bc06655cfd5d'
+
+RUN = sa.table('run', sa.column('id'), sa.column('run_no'))
+TRACE = sa.table(
+    'trace',
+    sa.column('id'),
+    sa.column('run_id'),
+    sa.column('trace_no'),
+    sa.column('state'),
+    sa.column('thread_no'),
+    sa.column('started_at'),
+)
+STDOUT = sa.table(
+    'stdout',
+    sa.column('id'),
+    sa.column('run_id'),
+    sa.column('trace_id'),
+    sa.column('text'),
+    sa.column('written_at'),
+    sa.column('compression'),
+    sa.column('text_compressed'),
+)
+STDOUT_START = sa.table('stdout', sa.column('id'), sa.column('text'))
+
+
+@settings(max_examples=10, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_downgrade(
+    alembic_config_factory: AlembicConfigFactory, data: st.DataObject
+) -> None:
+    '''The compressed texts are decompressed before the columns are dropped.'''
+    stdouts = data.draw(
+        st.lists(st.tuples(st.none() | st.text(), st.booleans()), max_size=5)
+    )
+    note(f'stdouts: {stdouts}')
+
+    config = alembic_config_factory()
+    url = config.get_main_option('sqlalchemy.url')
+    assert url
+
+    await to_thread(command.upgrade, config, REVISION_NEW)
+    engine = sa.create_engine(ensure_sync_url(url))
+    now = datetime.datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(sa.insert(RUN).values(id=1, run_no=1))
+        conn.execute(
+            sa.insert(TRACE).values(
+                id=1,
+                run_id=1,
+                trace_no=1,
+                state='finished',
+                thread_no=1,
+                started_at=now,
+            )
+        )
+        for id_, (text, compressed) in enumerate(stdouts, start=1):
+            values: dict[str, Any] = {
+                'text': text,
+                'compression': None,
+                'text_compressed': None,
+            }
+            if compressed and text is not None:
+                values = {
+                    'text': None,
+                    'compression': 'zlib',
+                    'text_compressed': compress_text(text, 'zlib'),
+                }
+            conn.execute(
+                sa.insert(STDOUT).values(
+                    id=id_, run_id=1, trace_id=1, written_at=now, **values
+                )
+            )
+
+    await to_thread(command.downgrade, config, REVISION_START)
+
+    with engine.connect() as conn:
+        rows = conn.execute(sa.select(STDOUT_START).order_by(STDOUT_START.c.id))
+        assert [tuple(r) for r in rows] == [
+            (id_, text) for id_, (text, _) in enumerate(stdouts, start=1)
+        ]
+        columns = {c['name'] for c in sa.inspect(conn).get_columns('stdout')}
+    assert not columns & {'compression', 'text_compressed'}
+    engine.dispose()
@@ -0,0 +1,72 @@
+from asyncio import to_thread
+
+import sqlalchemy as sa
+from alembic import command
+from hypothesis import Phase, given, note, settings
+from hypothesis import strategies as st
+
+from nextline_rdb.models import script_sha256
+from nextline_rdb.utils import ensure_sync_url
+
+from .conftest import AlembicConfigFactory
+
+REVISION_START = 'bc06655cfd5d'
+REVISION_NEW = '5f4e5969fab5'
+
+SCRIPT = sa.table('script', sa.column('id'), sa.column('script'), sa.column('sha256'))
+RUN = sa.table('run', sa.column('id'), sa.column('run_no'), sa.column('script_id'))
+CURRENT_SCRIPT = sa.table('current_script', sa.column('id'), sa.column('script_id'))
+
+
+@settings(max_examples=20, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_migration(
+    alembic_config_factory: AlembicConfigFactory, data: st.DataObject
+) -> None:
+    # Scripts with duplicates, runs of the scripts, and the current script
+    texts = data.draw(st.lists(st.sampled_from(['', 'pass', 'x = 1']), max_size=6))
+    script_ids = list(range(1, len(texts) + 1))
+    st_script_id = st.sampled_from(script_ids) if texts else st.nothing()
+    run_script_ids: list[int | None] = data.draw(
+        st.lists(st.none() | st_script_id, max_size=5)
+    )
+    current_id = data.draw(st.none() | st_script_id)
+    note(f'texts: {texts}, runs: {run_script_ids}, current: {current_id}')
+
+    config = alembic_config_factory()
+    url = config.get_main_option('sqlalchemy.url')
+    assert url
+
+    await to_thread(command.upgrade, config, REVISION_START)
+    engine = sa.create_engine(ensure_sync_url(url))
+    with engine.begin() as conn:
+        for id_, text in zip(script_ids, texts):
+            conn.execute(sa.insert(SCRIPT).values(id=id_, script=text))
+        for run_no, script_id in enumerate(run_script_ids, start=1):
+            conn.execute(sa.insert(RUN).values(run_no=run_no, script_id=script_id))
+        if current_id is not None:
+            conn.execute(sa.insert(CURRENT_SCRIPT).values(id=1, script_id=current_id))
+
+    await to_thread(command.upgrade, config, REVISION_NEW)
+
+    # Each text is stored once in the oldest row
+    first_ids = dict[str, int]()
+    for id_, text in zip(script_ids, texts):
+        first_ids.setdefault(text, id_)
+    text_of = dict(zip(script_ids, texts))
+    with engine.connect() as conn:
+        rows = conn.execute(sa.select(SCRIPT).order_by(SCRIPT.c.id)).all()
+        assert [tuple(r) for r in rows] == [
+            (id_, text, script_sha256(text)) for text, id_ in first_ids.items()
+        ]
+        stmt = sa.select(RUN.c.script_id).order_by(RUN.c.run_no)
+        assert conn.execute(stmt).scalars().all() == [
+            None if i is None else first_ids[text_of[i]] for i in run_script_ids
+        ]
+        current = conn.execute(sa.select(CURRENT_SCRIPT.c.script_id)).scalar()
+        assert current == (
+            None if current_id is None else first_ids[text_of[current_id]]
+        )
+    engine.dispose()
+
+    await to_thread(command.downgrade, config, REVISION_START)
@@ -0,0 +1,107 @@
+import datetime
+from asyncio import to_thread
+
+import sqlalchemy as sa
+from alembic import command
+
+from nextline_rdb.utils import ensure_sync_url
+from nextline_rdb.utils.compress import compress_text
+
+from .conftest import AlembicConfigFactory
+
+REVISION_START = '5f4e5969fab5'
+REVISION_NEW = '7ab060877c6c'
+
+RUN = sa.table('run', sa.column('id'), sa.column('run_no'))
+TRACE = sa.table(
+    'trace',
+    sa.column('id'),
+    sa.column('run_id'),
+    sa.column('trace_no'),
+    sa.column('state'),
+    sa.column('thread_no'),
+    sa.column('started_at'),
+    sa.column('ended_at'),
+)
+STDOUT = sa.table(
+    'stdout',
+    sa.column('run_id'),
+    sa.column('trace_id'),
+    sa.column('text'),
+    sa.column('written_at'),
+    sa.column('compression'),
+    sa.column('text_compressed'),
+)
+RUN_SUMMARY = sa.table(
+    'run_summary',
+    sa.column('run_id'),
+    sa.column('trace_count'),
+    sa.column('stdout_count'),
+    sa.column('stdout_length'),
+    sa.column('max_concurrent_traces'),
+    sa.column('first_event_at', sa.DateTime),
+    sa.column('last_event_at', sa.DateTime),
+)
+
+
+def _at(seconds: int) -> datetime.datetime:
+    return datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=seconds)
+
+
+async def test_migration(alembic_config_factory: AlembicConfigFactory) -> None:
+    config = alembic_config_factory()
+    url = config.get_main_option('sqlalchemy.url')
+    assert url
+
+    await to_thread(command.upgrade, config, REVISION_START)
+    engine = sa.create_engine(ensure_sync_url(url))
+    with engine.begin() as conn:
+        conn.execute(sa.insert(RUN), [{'id': 1, 'run_no': 1}, {'id': 2, 'run_no': 2}])
+        # Traces 1 and 2 overlap; trace 3 starts after trace 1 ends
+        times = [(1, 0, 10), (2, 5, None), (3, 10, 20)]
+        for trace_no, started, ended in times:
+            conn.execute(
+                sa.insert(TRACE).values(
+                    id=trace_no,
+                    run_id=1,
+                    trace_no=trace_no,
+                    state='finished',
+                    thread_no=1,
+                    started_at=_at(started),
+                    ended_at=None if ended is None else _at(ended),
+                )
+            )
+        conn.execute(
+            sa.insert(STDOUT),
+            [
+                {
+                    'run_id': 1,
+                    'trace_id': 1,
+                    'text': 'ab\x00c',
+                    'written_at': _at(3),
+                    'compression': None,
+                    'text_compressed': None,
+                },
+                {
+                    'run_id': 1,
+                    'trace_id': 2,
+                    'text': None,
+                    'written_at': _at(30),
+                    'compression': 'zlib',
+                    'text_compressed': compress_text('hello', 'zlib'),
+                },
+            ],
+        )
+
+    await to_thread(command.upgrade, config, REVISION_NEW)
+
+    with engine.connect() as conn:
+        stmt = sa.select(RUN_SUMMARY).order_by(RUN_SUMMARY.c.run_id)
+        rows = [tuple(r) for r in conn.execute(stmt).all()]
+    assert rows == [
+        (1, 3, 2, 9, 2, _at(0), _at(30)),
+        (2, 0, 0, 0, 0, None, None),
+    ]
+    engine.dispose()
+
+    await to_thread(command.downgrade, config, REVISION_START)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import statistics
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nextline_rdb.db import DB
+
+from .seed import Volumes, seed
+
+# The median seconds and other numbers of each benchmark by name
+_RESULTS = pytest.StashKey[dict[str, dict[str, float]]]()
+
+ROUNDS = 5
+
+
+@pytest.fixture(scope='session')
+def volumes(pytestconfig: pytest.Config) -> Volumes:
+    return Volumes.at_scale(pytestconfig.getoption('--benchmark-scale'))
+
+
+@pytest.fixture(scope='session')
+def db_url(tmp_path_factory: pytest.TempPathFactory, volumes: Volumes) -> str:
+    '''The URL of a SQLite file seeded once for all benchmarks.'''
+    path = tmp_path_factory.mktemp('benchmark') / 'db.sqlite3'
+    url = f'sqlite+aiosqlite:///{path}'
+
+    async def _seed() -> None:
+        async with DB(url=url) as db:
+            await seed(db, volumes)
+
+    asyncio.run(_seed())
+    return url
+
+
+@pytest.fixture
+async def db(db_url: str) -> AsyncIterator[DB]:
+    async with DB(url=db_url) as db:
+        yield db
+
+
+class Benchmark:
+    '''Time an async function. The median of `ROUNDS` calls after a warm-up.
+
+    The benchmark fails if the median is slower than `threshold` times the
+    timing of the same name in `baseline`, e.g., loaded from the JSON file
+    saved with `--benchmark-save` in an earlier session.
+
+    Other numbers, e.g., throughputs, can be reported with `info()`. They are
+    saved and shown but not compared.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        results: dict[str, dict[str, float]],
+        baseline: dict[str, dict[str, float]],
+        threshold: float,
+    ) -> None:
+        self._name = name
+        self._results = results
+        self._baseline = baseline
+        self._threshold = threshold
+
+    async def __call__(self, func: Callable[[], Awaitable[Any]]) -> float:
+        await func()  # warm-up
+        timings = list[float]()
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            await func()
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        self._results.setdefault(self._name, {})['median'] = median
+        if (base := self._baseline.get(self._name, {}).get('median')) is not None:
+            limit = base * self._threshold
+            assert median <= limit, (
+                f'{self._name}: {median:.4f}s is slower than {limit:.4f}s '
+                f'({self._threshold} x {base:.4f}s)'
+            )
+        return median
+
+    def info(self, **values: float) -> None:
+        self._results.setdefault(self._name, {}).update(values)
+
+
+@pytest.fixture(scope='session')
+def _baseline(pytestconfig: pytest.Config) -> dict[str, dict[str, float]]:
+    if (path := pytestconfig.getoption('--benchmark-compare')) is None:
+        return {}
+    return json.loads(Path(path).read_text())
+
+
+@pytest.fixture
+def benchmark(
+    request: pytest.FixtureRequest, _baseline: dict[str, dict[str, float]]
+) -> Benchmark:
+    config = request.config
+    return Benchmark(
+        name=request.node.name,
+        results=config.stash.setdefault(_RESULTS, {}),
+        baseline=_baseline,
+        threshold=config.getoption('--benchmark-threshold'),
+    )
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    config = session.config
+    results = config.stash.get(_RESULTS, {})
+    if results and (path := config.getoption('--benchmark-save')):
+        Path(path).write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+
+def pytest_terminal_summary(
+    terminalreporter: pytest.TerminalReporter, config: pytest.Config
+) -> None:
+    if not (results := config.stash.get(_RESULTS, {})):
+        return
+    terminalreporter.section('benchmark')
+    width = max(len(name) for name in results)
+    for name, values in sorted(results.items()):
+        line = '  '.join(f'{k}={v:.4g}' for k, v in values.items())
+        terminalreporter.write_line(f'{name:<{width}}  {line}')
@@ -0,0 +1,138 @@
+'''Replay a synthetic stream of Nextline events into the write plugins.
+
+No script is traced. The events are emitted directly to the hooks of the
+plugins registered by `nextline_rdb.write.register()`.
+'''
+
+import datetime
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+from unittest.mock import Mock
+
+from apluggy import PluginManager
+
+from nextline import Nextline
+from nextline.events import (
+    OnEndRun,
+    OnEndTrace,
+    OnEndTraceCall,
+    OnStartRun,
+    OnStartTrace,
+    OnStartTraceCall,
+    OnWriteStdout,
+)
+from nextline.plugin import spec
+from nextline.spawned import RunArg
+from nextline.types import RunNo, ThreadNo, TraceCallNo, TraceNo
+from nextline_rdb.db import DB
+from nextline_rdb.write import Writer, register
+
+STATEMENT = 'pass'
+
+
+@dataclass(frozen=True)
+class Stream:
+    '''The numbers of the events in a run.'''
+
+    traces: int = 4
+    trace_calls: int = 1_000  # start and end events of each
+    stdout_interval: int = 10  # a stdout every this number of trace calls
+
+    @classmethod
+    def at_scale(cls, scale: float) -> 'Stream':
+        '''The number of the trace calls is 10^5 at scale 1.'''
+        return cls(trace_calls=max(1, round(100_000 * scale)))
+
+
+def events(run_no: int, stream: Stream) -> Iterator[tuple[str, Any]]:
+    '''The names of the hooks and the events of a run.'''
+    utc = datetime.datetime.now(datetime.timezone.utc)  # only for the run events
+    now = utc.replace(tzinfo=None)
+    run_no_ = RunNo(run_no)
+    yield (
+        'on_start_run',
+        OnStartRun(started_at=utc, run_no=run_no_, statement=STATEMENT),
+    )
+    for t in range(1, stream.traces + 1):
+        yield (
+            'on_start_trace',
+            OnStartTrace(
+                started_at=now,
+                run_no=run_no_,
+                trace_no=TraceNo(t),
+                thread_no=ThreadNo(1),
+                task_no=None,
+            ),
+        )
+    for c in range(1, stream.trace_calls + 1):
+        trace_no = TraceNo((c - 1) % stream.traces + 1)
+        trace_call_no = TraceCallNo(c)
+        yield (
+            'on_start_trace_call',
+            OnStartTraceCall(
+                started_at=now,
+                run_no=run_no_,
+                trace_no=trace_no,
+                trace_call_no=trace_call_no,
+                file_name='<string>',
+                line_no=c,
+                frame_object_id=0,
+                event='line',
+            ),
+        )
+        if c % stream.stdout_interval == 0:
+            yield (
+                'on_write_stdout',
+                OnWriteStdout(
+                    written_at=now, run_no=run_no_, trace_no=trace_no, text=f'{c}\n'
+                ),
+            )
+        yield (
+            'on_end_trace_call',
+            OnEndTraceCall(
+                ended_at=now,
+                run_no=run_no_,
+                trace_no=trace_no,
+                trace_call_no=trace_call_no,
+            ),
+        )
+    for t in range(1, stream.traces + 1):
+        yield (
+            'on_end_trace',
+            OnEndTrace(ended_at=now, run_no=run_no_, trace_no=TraceNo(t)),
+        )
+    yield (
+        'on_end_run',
+        OnEndRun(ended_at=utc, run_no=run_no_, returned='null', raised=''),
+    )
+
+
+class Replayer:
+    '''Emit the events to the write plugins and time each hook call.'''
+
+    def __init__(self, db: DB, writer: Writer) -> None:
+        self._writer = writer
+        self._hook = PluginManager(spec.PROJECT_NAME)
+        self._hook.add_hookspecs(spec)
+        nextline = Mock(spec=Nextline)
+        nextline.register.side_effect = lambda plugin: self._hook.register(plugin)
+        register(nextline, db, writer=writer)
+        self._context = spec.Context(
+            nextline=nextline, hook=self._hook, pubsub=Mock(spec=spec.PubSub)
+        )
+        self.latencies = list[float]()  # seconds
+        self.n_events = 0
+
+    async def replay(self, run_no: int, stream: Stream) -> None:
+        '''Emit the events of a run and wait until they are written.'''
+        ahook = self._hook.ahook
+        self._context.run_arg = RunArg(run_no=RunNo(run_no), statement=STATEMENT)
+        await ahook.on_initialize_run(context=self._context)
+        for name, event in events(run_no, stream):
+            start = time.perf_counter()
+            await getattr(ahook, name)(context=self._context, event=event)
+            self.latencies.append(time.perf_counter() - start)
+            self.n_events += 1
+        await self._writer.flush()
@@ -0,0 +1,168 @@
+'''Seed a DB with realistic volumes of rows for the benchmarks.
+
+The values of the columns other than the keys, numbers, and timestamps are
+copied from models drawn from the Hypothesis strategies in
+`nextline_rdb.models.strategies`. Drawing every row from the strategies would
+take too long for the volumes.
+'''
+
+import datetime
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import cycle, islice
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Model, Prompt, Run, Stdout, Trace, TraceCall
+from nextline_rdb.models.strategies import st_model_run
+
+CHUNK_SIZE = 10_000
+N_PROTOTYPE_RUNS = 10
+
+_T0 = datetime.datetime(2024, 1, 1)
+
+
+@dataclass(frozen=True)
+class Volumes:
+    '''The numbers of rows. At scale 1, 10^3 runs, 10^7 trace calls, etc.'''
+
+    runs: int = 1_000
+    traces_per_run: int = 10
+    trace_calls_per_run: int = 10_000
+    prompts_per_run: int = 100
+    stdouts_per_run: int = 1_000
+
+    @classmethod
+    def at_scale(cls, scale: float) -> 'Volumes':
+        '''The numbers of rows per run multiplied by `scale`.'''
+        default = cls()
+        return cls(
+            runs=default.runs,
+            traces_per_run=default.traces_per_run,
+            trace_calls_per_run=max(1, round(default.trace_calls_per_run * scale)),
+            prompts_per_run=max(1, round(default.prompts_per_run * scale)),
+            stdouts_per_run=max(1, round(default.stdouts_per_run * scale)),
+        )
+
+    @property
+    def trace_calls(self) -> int:
+        return self.runs * self.trace_calls_per_run
+
+    @property
+    def stdouts(self) -> int:
+        return self.runs * self.stdouts_per_run
+
+
+async def seed(db: DB, volumes: Volumes) -> None:
+    '''Insert the rows. The id of the n-th row of each table is n.'''
+    runs = [
+        st_model_run(generate_traces=True).example() for _ in range(N_PROTOTYPE_RUNS)
+    ]
+    prototypes = {
+        Run: [_values(r) for r in runs],
+        Trace: [_values(m) for r in runs for m in r.traces],
+        TraceCall: [_values(m) for r in runs for m in r.trace_calls],
+        Prompt: [_values(m) for r in runs for m in r.prompts],
+        Stdout: [_values(m) for r in runs for m in r.stdouts],
+    }
+    async with db.session.begin() as session:
+        for Model_, rows in [
+            (Run, _runs(volumes)),
+            (Trace, _traces(volumes)),
+            (TraceCall, _trace_calls(volumes)),
+            (Prompt, _prompts(volumes)),
+            (Stdout, _stdouts(volumes)),
+        ]:
+            rows = ({**p, **r} for p, r in zip(cycle(prototypes[Model_]), rows))
+            await _insert(session, Model_, rows)
+
+
+def _values(model: Model) -> dict[str, Any]:
+    '''The column values other than the keys and foreign keys.'''
+    table = model.__table__
+    return {
+        c.key: getattr(model, c.key)
+        for c in table.columns  # type: ignore[attr-defined]
+        if not c.primary_key and not c.foreign_keys
+    }
+
+
+async def _insert(
+    session: AsyncSession, Model_: type[Model], rows: Iterable[dict[str, Any]]
+) -> None:
+    it = iter(rows)
+    while chunk := list(islice(it, CHUNK_SIZE)):
+        await session.execute(insert(Model_), chunk)
+
+
+def _runs(v: Volumes) -> Iterator[dict[str, Any]]:
+    for r in range(v.runs):
+        started_at = _T0 + datetime.timedelta(hours=r)
+        yield dict(
+            id=r + 1,
+            run_no=r + 1,
+            script_id=None,
+            started_at=started_at,
+            ended_at=started_at + datetime.timedelta(minutes=30),
+        )
+
+
+def _traces(v: Volumes) -> Iterator[dict[str, Any]]:
+    for r in range(v.runs):
+        for t in range(v.traces_per_run):
+            yield dict(
+                id=r * v.traces_per_run + t + 1,
+                run_id=r + 1,
+                trace_no=t + 1,
+                started_at=_T0 + datetime.timedelta(hours=r),
+                ended_at=None,
+            )
+
+
+def _trace_calls(v: Volumes) -> Iterator[dict[str, Any]]:
+    for r in range(v.runs):
+        for c in range(v.trace_calls_per_run):
+            started_at = _T0 + datetime.timedelta(hours=r, milliseconds=c)
+            yield dict(
+                id=r * v.trace_calls_per_run + c + 1,
+                run_id=r + 1,
+                trace_id=_trace_id(v, r, c),
+                trace_call_no=c + 1,
+                started_at=started_at,
+                ended_at=started_at,
+            )
+
+
+def _prompts(v: Volumes) -> Iterator[dict[str, Any]]:
+    for r in range(v.runs):
+        for p in range(v.prompts_per_run):
+            c = p * v.trace_calls_per_run // v.prompts_per_run
+            started_at = _T0 + datetime.timedelta(hours=r, milliseconds=c)
+            yield dict(
+                id=r * v.prompts_per_run + p + 1,
+                run_id=r + 1,
+                trace_id=_trace_id(v, r, c),
+                trace_call_id=r * v.trace_calls_per_run + c + 1,
+                prompt_no=p + 1,
+                started_at=started_at,
+                ended_at=started_at,
+            )
+
+
+def _stdouts(v: Volumes) -> Iterator[dict[str, Any]]:
+    for r in range(v.runs):
+        for s in range(v.stdouts_per_run):
+            yield dict(
+                id=r * v.stdouts_per_run + s + 1,
+                run_id=r + 1,
+                trace_id=_trace_id(v, r, s),
+                written_at=_T0 + datetime.timedelta(hours=r, milliseconds=s),
+            )
+
+
+def _trace_id(v: Volumes, r: int, n: int) -> int:
+    '''The id of the trace of the n-th trace call or stdout in the r-th run.'''
+    return r * v.traces_per_run + n % v.traces_per_run + 1
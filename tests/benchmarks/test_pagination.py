@@ -0,0 +1,126 @@
+'''Benchmarks of the pagination and the resolvers.
+
+Run with, e.g.,
+
+    pytest tests/benchmarks --benchmark --benchmark-save=before.json
+    # change the code
+    pytest tests/benchmarks --benchmark --benchmark-compare=before.json
+
+'''
+
+from typing import Any, Optional
+
+import pytest
+import strawberry
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, TraceCall
+from nextline_rdb.pagination import SortField
+from nextline_rdb.schema import Query
+from nextline_rdb.schema.nodes import RunNode, TraceCallNode
+from nextline_rdb.schema.nodes.options import load_options
+from nextline_rdb.schema.pagination import load_connection
+from nextline_rdb.schema.pagination.db import encode_id, load_total_count
+
+from .conftest import Benchmark
+from .seed import Volumes
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.timeout(0)]
+
+
+@pytest.mark.parametrize('first, last', [(50, None), (None, 50)])
+async def test_runs(
+    db: DB, benchmark: Benchmark, first: Optional[int], last: Optional[int]
+) -> None:
+    async def _load() -> None:
+        async with db.read_session() as session:
+            await load_connection(
+                session,
+                Run,
+                create_node_from_model=RunNode.from_model,
+                sort=[SortField('run_no', desc=True)],
+                first=first,
+                last=last,
+                total_count=False,
+            )
+
+    await benchmark(_load)
+
+
+@pytest.mark.parametrize('direction', ['first', 'last', 'after', 'before'])
+async def test_trace_calls(
+    db: DB, benchmark: Benchmark, volumes: Volumes, direction: str
+) -> None:
+    '''The first and last pages and the pages at a cursor in the middle.'''
+    cursor = encode_id(volumes.trace_calls // 2)
+    pages: dict[str, dict[str, Any]] = {
+        'first': dict(first=50),
+        'last': dict(last=50),
+        'after': dict(after=cursor, first=50),
+        'before': dict(before=cursor, last=50),
+    }
+    kwargs = pages[direction]
+
+    async def _load() -> None:
+        async with db.read_session() as session:
+            await load_connection(
+                session,
+                TraceCall,
+                create_node_from_model=TraceCallNode.from_model,
+                sort=[SortField('run_id'), SortField('trace_call_no')],
+                total_count=False,
+                options=load_options(TraceCall, []),
+                **kwargs,
+            )
+
+    await benchmark(_load)
+
+
+async def test_total_count(db: DB, benchmark: Benchmark) -> None:
+    async def _count() -> None:
+        async with db.read_session() as session:
+            await load_total_count(session, TraceCall)
+
+    await benchmark(_count)
+
+
+QUERY_NESTED = '''
+query Nested {
+  rdb {
+    runs(first: 20) {
+      edges {
+        node {
+          runNo
+          traces {
+            edges {
+              node {
+                traceNo
+                traceCalls(first: 10) {
+                  totalCount
+                  edges { node { traceCallNo fileName } }
+                }
+              }
+            }
+          }
+          stdouts(last: 10) {
+            edges { node { text } }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+async def test_nested(db: DB, benchmark: Benchmark) -> None:
+    '''Resolve the nested nodes of a page of runs.'''
+    schema = strawberry.Schema(query=Query)
+
+    async def _query() -> None:
+        resp = await schema.execute(QUERY_NESTED, context_value={'db': db})
+        assert isinstance(resp, ExecutionResult)
+        assert not resp.errors
+
+    await benchmark(_query)
@@ -0,0 +1,63 @@
+'''Benchmarks of the throughput of writing the events to the DB.
+
+Reported for each writer, e.g., with `pytest tests/benchmarks --benchmark -k write`:
+
+- `events_per_second`: the events written per second including the flush
+- `p50_ms`, `p99_ms`: the latency of the hook calls in milliseconds
+- `commits_per_run`: the transactions committed for each run
+'''
+
+import statistics
+from collections.abc import AsyncIterator, Callable
+from itertools import count
+
+import pytest
+
+from nextline_rdb.db import DB
+from nextline_rdb.write import BufferedWriter, Writer
+
+from .conftest import Benchmark
+from .events import Replayer, Stream
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.timeout(0)]
+
+WRITERS: dict[str, Callable[[DB], Writer]] = {
+    'writer': Writer,
+    'buffered': BufferedWriter,
+    'buffered-no-batch': lambda db: BufferedWriter(db, max_batch_size=1, max_delay=0),
+}
+
+
+@pytest.fixture(scope='session')
+def stream(pytestconfig: pytest.Config) -> Stream:
+    return Stream.at_scale(pytestconfig.getoption('--benchmark-scale'))
+
+
+@pytest.fixture
+async def empty_db(tmp_path_factory: pytest.TempPathFactory) -> AsyncIterator[DB]:
+    path = tmp_path_factory.mktemp('benchmark') / 'db.sqlite3'
+    async with DB(url=f'sqlite+aiosqlite:///{path}') as db:
+        yield db
+
+
+@pytest.mark.parametrize('writer_name', WRITERS.keys())
+async def test_write(
+    empty_db: DB, benchmark: Benchmark, stream: Stream, writer_name: str
+) -> None:
+    async with WRITERS[writer_name](empty_db) as writer:
+        replayer = Replayer(empty_db, writer)
+        run_nos = count(1)
+
+        async def _replay() -> None:
+            await replayer.replay(next(run_nos), stream)
+
+        median = await benchmark(_replay)
+
+    n_runs = next(run_nos) - 1
+    quantiles = statistics.quantiles(replayer.latencies, n=100)
+    benchmark.info(
+        events_per_second=replayer.n_events / n_runs / median,
+        p50_ms=quantiles[49] * 1000,
+        p99_ms=quantiles[98] * 1000,
+        commits_per_run=writer.n_commits / n_runs,
+    )
@@ -1,4 +1,53 @@
+import pytest
 from hypothesis import settings
 
 settings.register_profile('no-deadline', deadline=None)
 settings.load_profile('no-deadline')
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup('benchmark', 'the benchmarks in tests/benchmarks')
+    group.addoption(
+        '--benchmark',
+        action='store_true',
+        help='Run the benchmarks, which are skipped otherwise.',
+    )
+    group.addoption(
+        '--benchmark-scale',
+        type=float,
+        default=0.01,
+        help='The volume of the seeded rows. 1 for 10^7 trace calls. (default: 0.01)',
+    )
+    group.addoption(
+        '--benchmark-save',
+        metavar='PATH',
+        help='Save the timings to the JSON file.',
+    )
+    group.addoption(
+        '--benchmark-compare',
+        metavar='PATH',
+        help='Fail the benchmarks slower than the timings in the JSON file.',
+    )
+    group.addoption(
+        '--benchmark-threshold',
+        type=float,
+        default=1.5,
+        help='Fail if slower than the compared timing by this factor. (default: 1.5)',
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        'markers', 'benchmark: a benchmark, skipped unless --benchmark is given'
+    )
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: list[pytest.Item]
+) -> None:
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='Benchmarks run only with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
@@ -3,8 +3,10 @@ from collections.abc import Callable
 import pytest
 from hypothesis import given
 from hypothesis import strategies as st
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
 
-from nextline_rdb.db import DB
+from nextline_rdb.db import DB, SQLITE_PRAGMA_PROFILES
 from nextline_rdb.utils import class_name_and_primary_keys_of, ensure_sync_url, load_all
 
 from .models import Bar, Foo, Model, register_session_events
@@ -108,3 +110,40 @@ def tmp_url_factory(tmp_path_factory: pytest.TempPathFactory) -> Callable[[], st
         return url
 
     return factory
+
+
+async def test_sqlite_pragmas(tmp_url_factory: Callable[[], str]) -> None:
+    url = tmp_url_factory()
+    pragmas = SQLITE_PRAGMA_PROFILES['throughput']
+    async with DB(url=url, sqlite_pragmas=pragmas) as db:
+        async with db.session() as session:
+            journal_mode = (await session.execute(text('PRAGMA journal_mode'))).scalar()
+            synchronous = (await session.execute(text('PRAGMA synchronous'))).scalar()
+    assert journal_mode == 'wal'
+    assert synchronous == 1  # NORMAL
+
+
+@pytest.mark.parametrize('pragmas', [{'synchronous;': 'OFF'}, {'synchronous': 'OFF;'}])
+def test_sqlite_pragmas_invalid(pragmas: dict[str, str]) -> None:
+    with pytest.raises(ValueError):
+        DB(sqlite_pragmas=pragmas)
+
+
+async def test_read_url(tmp_url_factory: Callable[[], str]) -> None:
+    url = tmp_url_factory()
+    async with DB(
+        url=url, read_url=url, model_base_class=Model, use_migration=False
+    ) as db:
+        assert db.read_engine is not db.engine
+        async with db.write_session.begin() as session:
+            session.add(Foo())
+        async with db.read_session() as session:
+            assert len((await session.scalars(select(Foo))).all()) == 1
+        with pytest.raises(OperationalError):  # read-only
+            async with db.read_session.begin() as session:
+                session.add(Foo())
+
+
+async def test_read_url_in_memory() -> None:
+    with pytest.raises(ValueError):
+        DB(read_url='sqlite+aiosqlite://')
@@ -6,7 +6,7 @@ from hypothesis import strategies as st
 from nextline_rdb.pagination import Sort, SortField
 from nextline_test_utils.strategies import st_graphql_ints, st_none_or
 
-from .models import Entity
+from .models import Entity, Item
 
 
 def st_entity() -> st.SearchStrategy[Entity]:
@@ -17,6 +17,14 @@ def st_entity() -> st.SearchStrategy[Entity]:
     )
 
 
+def st_item() -> st.SearchStrategy[Item]:
+    return st.builds(
+        Item,
+        num=st_graphql_ints(min_value=0, max_value=5),
+        txt=st.text(alphabet='ABCDE', min_size=1, max_size=1),
+    )
+
+
 @st.composite
 def st_sort(draw: st.DrawFn) -> Sort:
     FIELDS = ('id', 'num', 'txt')
@@ -30,7 +38,7 @@ def test_st_sort(sort: Sort) -> None:
     pass
 
 
-def cmp(e1: Entity, e2: Entity, sort: Sort | None) -> int:
+def cmp(e1: Entity | Item, e2: Entity | Item, sort: Sort | None) -> int:
     '''A comparison function to be used as `comp_to_key(partial(cmp, sort=sort))`'''
     for f in sort or []:
         a = getattr(e1, f.field)
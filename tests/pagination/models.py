@@ -15,3 +15,12 @@ class Entity(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     num: Mapped[int | None]
     txt: Mapped[str | None]
+
+
+class Item(Base):
+    '''Sortable by keyset as `num` is non-nullable and indexed.'''
+
+    __tablename__ = 'item'
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    num: Mapped[int] = mapped_column(index=True)
+    txt: Mapped[str]
@@ -4,11 +4,11 @@ from hypothesis import given, note
 from hypothesis import strategies as st
 
 from nextline_rdb.db import DB
-from nextline_rdb.pagination import load_models
+from nextline_rdb.pagination import compose_statement, load_models
 from nextline_test_utils.strategies import st_none_or
 
-from .funcs import cmp, st_entity, st_idx, st_length, st_sort
-from .models import Base, Entity
+from .funcs import cmp, st_entity, st_idx, st_item, st_length, st_sort
+from .models import Base, Entity, Item
 
 
 @given(st.data())
@@ -112,3 +112,59 @@ async def test_backward(data: st.DataObject) -> None:
             ).all()
 
     assert repr(models) == repr(expected)
+
+
+@given(st.data())
+async def test_keyset(data: st.DataObject) -> None:
+    '''The same pages as the row_number() path, with or without the keyset.'''
+    n_max = 10
+
+    items = data.draw(st.lists(st_item(), min_size=0, max_size=n_max))
+    sort = data.draw(st_none_or(st_sort()), label='sort')
+    forward = data.draw(st.booleans(), label='forward')
+
+    async with DB(model_base_class=Base, use_migration=False) as db:
+        async with db.session.begin() as session:
+            session.add_all(items)
+
+        ordered = sorted(items, key=cmp_to_key(partial(cmp, sort=sort)))
+        if not forward:
+            ordered = ordered[::-1]
+
+        idx = data.draw(st_idx(ordered), label='idx')
+        cursor = ordered[idx].id if idx is not None else None
+        limit = data.draw(st_length(len(ordered)), label='limit')
+        note(f'cursor={cursor}, limit={limit}')
+
+        start = idx + 1 if idx is not None else 0
+        end = None if limit is None else start + limit
+        expected = ordered[start:end]
+        if not forward:
+            expected = expected[::-1]
+
+        kwargs = (
+            dict(after=cursor, first=limit)
+            if forward
+            else dict(before=cursor, last=limit)
+        )
+        async with db.session() as session:
+            models = (
+                await load_models(session, Item, 'id', sort=sort, **kwargs)  # type: ignore
+            ).all()
+
+    assert repr(models) == repr(expected)
+
+
+def test_keyset_used() -> None:
+    stmt = compose_statement(Item, 'id', order_by=[Item.num.desc(), Item.id], first=3)
+    assert 'row_number' not in str(stmt)
+
+    # Not indexed
+    stmt = compose_statement(Item, 'id', order_by=[Item.txt, Item.id], first=3)
+    assert 'row_number' in str(stmt)
+
+    # Nullable, of another model
+    entity_stmt = compose_statement(
+        Entity, 'id', order_by=[Entity.num, Entity.id], first=3
+    )
+    assert 'row_number' in str(entity_stmt)
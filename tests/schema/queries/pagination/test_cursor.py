@@ -1,14 +1,16 @@
+import datetime
+
 import strawberry
 from hypothesis import given, note, settings
 from strawberry.types import ExecutionResult
 
 from nextline_rdb.db import DB
-from nextline_rdb.models import Run
+from nextline_rdb.models import Run, Stdout, Trace
 from nextline_rdb.models.strategies import st_model_run_list
 from nextline_rdb.schema import Query
 from tests.schema.graphql import QUERY_RDB_RUNS
 
-from .utils import Cursor, Edge, to_node
+from .utils import Cursor, Edge, Variables, to_node
 
 
 @settings(max_examples=20)
@@ -34,4 +36,90 @@ async def test_property(runs: list[Run]) -> None:
         nodes = [edge['node'] for edge in edges]
         cursors = [edge['cursor'] for edge in edges]
 
-        assert cursors == [Cursor(node['id']) for node in nodes]
+        assert cursors == [Cursor(node['id'], node['runNo']) for node in nodes]
+
+
+async def _run_nos(
+    schema: strawberry.Schema, db: DB, variables: Variables
+) -> tuple[list[int], str]:
+    '''The run numbers in the page and the end cursor.'''
+    resp = await schema.execute(
+        QUERY_RDB_RUNS, variable_values=dict(variables), context_value={'db': db}
+    )
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+    runs = resp.data['rdb']['runs']
+    run_nos = [edge['node']['runNo'] for edge in runs['edges']]
+    return run_nos, runs['pageInfo']['endCursor']
+
+
+async def test_cursor_row_deleted() -> None:
+    '''The page continues after the cursor of a deleted row.'''
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all([Run(run_no=i) for i in range(1, 6)])
+
+        run_nos, cursor = await _run_nos(schema, db, Variables(first=2))
+        assert run_nos == [5, 4]
+
+        async with db.session.begin() as session:
+            run = await session.get_one(Run, 4)  # At the cursor
+            await session.delete(run)
+
+        run_nos, _ = await _run_nos(schema, db, Variables(after=cursor, first=2))
+        assert run_nos == [3, 2]
+        run_nos, _ = await _run_nos(schema, db, Variables(before=cursor, last=2))
+        assert run_nos == [5]
+
+
+QUERY_STDOUTS = '''
+query Stdouts($after: String) {
+  rdb {
+    run(runNo: 1) {
+      stdouts(first: 1, after: $after) {
+        pageInfo {
+          endCursor
+        }
+        edges {
+          node {
+            text
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+async def test_cursor_datetime() -> None:
+    '''The cursor of the connection sorted by a datetime.'''
+    schema = strawberry.Schema(query=Query)
+    started_at = datetime.datetime(2024, 1, 1)
+    run = Run(run_no=1)
+    trace = Trace(
+        run=run, trace_no=1, state='running', thread_no=1, started_at=started_at
+    )
+    for i, text in enumerate(['a', 'b', 'c']):
+        written_at = started_at + datetime.timedelta(microseconds=i + 1)
+        Stdout(run=run, trace=trace, text=text, written_at=written_at)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add(run)
+        texts = list[str]()
+        cursor = None
+        for _ in range(3):
+            resp = await schema.execute(
+                QUERY_STDOUTS,
+                variable_values={'after': cursor},
+                context_value={'db': db},
+            )
+            assert isinstance(resp, ExecutionResult)
+            assert not resp.errors
+            assert resp.data
+            stdouts = resp.data['rdb']['run']['stdouts']
+            texts.extend(edge['node']['text'] for edge in stdouts['edges'])
+            cursor = stdouts['pageInfo']['endCursor']
+    assert texts == ['a', 'b', 'c']
@@ -0,0 +1,105 @@
+import datetime
+
+import pytest
+import strawberry
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from sqlalchemy import Select, event, select
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Trace
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.schema import Query
+from nextline_rdb.schema.pagination.db import load_total_count
+
+QUERY = '''
+query Runs {
+  rdb {
+    runs(first: 3) {
+      %s
+      edges {
+        node {
+          id
+        }
+      }
+    }
+  }
+}
+'''
+
+FRAGMENT = '''
+fragment Count on RunNodeConnection {
+  totalCount
+}
+'''
+
+
+@settings(max_examples=5)
+@given(
+    runs=st_model_run_list(generate_traces=False, min_size=0, max_size=5),
+    selection=st.sampled_from(['', 'totalCount', '...Count']),
+)
+async def test_total_count(runs: list[Run], selection: str) -> None:
+    '''The total count is only queried if `totalCount` is selected.'''
+    schema = strawberry.Schema(query=Query)
+    query = QUERY % selection
+    if selection == '...Count':
+        query += FRAGMENT
+
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+
+        statements = list[str]()
+
+        @event.listens_for(db.engine.sync_engine, 'before_cursor_execute')
+        def _(conn, cursor, statement, *_, **__):  # type: ignore
+            statements.append(statement)
+
+        resp = await schema.execute(query, context_value={'db': db})
+        assert isinstance(resp, ExecutionResult)
+        assert not resp.errors
+        assert resp.data
+
+    counted = any('count(' in s for s in statements)
+    if selection:
+        assert counted
+        assert resp.data['rdb']['runs']['totalCount'] == len(runs)
+    else:
+        assert not counted
+
+
+def _run(run_no: int, state: str, n_traces: int) -> Run:
+    run = Run(run_no=run_no, state=state)
+    for trace_no in range(1, n_traces + 1):
+        started_at = datetime.datetime(2024, 1, 1)
+        Trace(
+            run=run, trace_no=trace_no, state=state, thread_no=1, started_at=started_at
+        )
+    return run
+
+
+@pytest.mark.parametrize(
+    'select_model, expected',
+    [
+        (select(Run), 3),
+        (select(Run).where(Run.state == 'finished'), 2),
+        (select(Run).join(Run.traces), 4),
+        (select(Run).join(Run.traces).distinct(), 2),
+        (select(Run).group_by(Run.run_no), 3),
+        (select(Run).order_by(Run.id).limit(1), 1),
+        (select(Run).order_by(Run.id).offset(1), 2),
+    ],
+)
+async def test_load_total_count(
+    select_model: Select[tuple[Run]], expected: int
+) -> None:
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(
+                [_run(1, 'finished', 3), _run(2, 'finished', 1), _run(3, 'running', 0)]
+            )
+        async with db.session() as session:
+            count = await load_total_count(session, Run, select_model=select_model)
+    assert count == expected
@@ -1,12 +1,16 @@
 import base64
 import datetime as dt
-from typing import TypedDict
+import json
+from typing import Optional, TypedDict
 
 from nextline_rdb.models import Run
 
 
-def Cursor(i: int) -> str:
-    return base64.b64encode(f'{i}'.encode()).decode()
+def Cursor(i: int, run_no: Optional[int] = None) -> str:
+    '''The cursor of the run in the order of `runNo`, or of only the id.'''
+    if run_no is None:
+        return base64.b64encode(f'{i}'.encode()).decode()
+    return base64.b64encode(json.dumps([run_no, i]).encode()).decode()
 
 
 class Filter(TypedDict, total=False):
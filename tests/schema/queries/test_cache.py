@@ -0,0 +1,125 @@
+import datetime
+from typing import Any
+
+import strawberry
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Script, Trace
+from nextline_rdb.schema import Mutation, Query
+from nextline_rdb.schema.cache import ResponseCache, estimate_size
+from nextline_rdb.schema.nodes import TraceNode
+from nextline_rdb.schema.pagination import Connection, Edge, PageInfo
+
+from ..graphql import MUTATE_RDB_DELETE_RUNS
+
+QUERY_TRACES = '''
+query Traces($runNo: Int!, $first: Int) {
+  rdb {
+    run(runNo: $runNo) {
+      traces(first: $first) {
+        totalCount
+        edges {
+          node {
+            traceNo
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+NOW = datetime.datetime(2024, 1, 1)
+
+
+def _run(run_no: int, state: str, n_traces: int) -> Run:
+    run = Run(run_no=run_no, state=state)
+    for trace_no in range(1, n_traces + 1):
+        Trace(run=run, trace_no=trace_no, state=state, thread_no=1, started_at=NOW)
+    return run
+
+
+async def _execute(
+    schema: strawberry.Schema, query: str, context: dict[str, Any], **variables: Any
+) -> Any:
+    resp = await schema.execute(
+        query, variable_values=variables, context_value=dict(context)
+    )
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors, resp.errors
+    return resp.data
+
+
+async def _trace_nos(
+    schema: strawberry.Schema, context: dict[str, Any], run_no: int, **variables: Any
+) -> list[int]:
+    data = await _execute(schema, QUERY_TRACES, context, runNo=run_no, **variables)
+    edges = data['rdb']['run']['traces']['edges']
+    return [e['node']['traceNo'] for e in edges]
+
+
+async def test_cache() -> None:
+    schema = strawberry.Schema(query=Query, mutation=Mutation)
+    cache = ResponseCache()
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all([_run(1, 'finished', 2), _run(2, 'running', 2)])
+        context = {'db': db, 'cache': cache}
+
+        assert await _trace_nos(schema, context, 1) == [1, 2]
+        assert await _trace_nos(schema, context, 2) == [1, 2]
+        assert len(cache) == 1  # Only the finished run
+
+        # Add traces, which don't happen to finished runs
+        async with db.session.begin() as session:
+            for run_id in (1, 2):
+                run = await session.get_one(Run, run_id)
+                trace = Trace(
+                    run=run, trace_no=3, state='running', thread_no=1, started_at=NOW
+                )
+                session.add(trace)
+
+        assert await _trace_nos(schema, context, 1) == [1, 2]  # From the cache
+        assert await _trace_nos(schema, context, 2) == [1, 2, 3]
+        assert await _trace_nos(schema, context, 1, first=1) == [1]  # Other args
+        assert len(cache) == 2
+
+        await _execute(schema, MUTATE_RDB_DELETE_RUNS, context, ids=[1])
+        assert len(cache) == 0
+        assert cache.nbytes == 0
+
+
+def test_limits() -> None:
+    cache = ResponseCache(max_entries=3, max_bytes=100)
+    for i in range(3):
+        cache.put(i, run_id=i, value=i, size=30)
+    assert len(cache) == 3
+    assert cache.get(0) == 0  # The least recent is now 1
+    cache.put(3, run_id=3, value=3, size=30)  # Over 100 bytes
+    assert cache.get(1) is None
+    assert [cache.get(i) for i in (0, 2, 3)] == [0, 2, 3]
+    cache.put(4, run_id=4, value=4, size=101)  # Larger than the cache
+    assert cache.get(4) is None
+    assert cache.nbytes == 90
+
+    # Loaded while invalidated
+    generation = cache.generation
+    cache.invalidate([0])
+    cache.put(5, run_id=5, value=5, size=10, generation=generation)
+    assert cache.get(5) is None
+    assert len(cache) == 2
+
+
+def test_estimate_size() -> None:
+    run = _run(1, 'finished', 2)
+    connection = Connection(
+        page_info=PageInfo(has_next_page=False, has_previous_page=False),
+        total_count=2,
+        edges=[Edge(node=TraceNode.from_model(t), cursor='') for t in run.traces],
+    )
+    size = estimate_size(connection)
+
+    # The script loaded in the run of the traces is counted once
+    run.script = Script(script='x' * 10_000)
+    assert 10_000 < estimate_size(connection) - size < 20_000
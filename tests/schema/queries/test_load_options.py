@@ -0,0 +1,145 @@
+import strawberry
+from hypothesis import Phase, given, settings
+from sqlalchemy import event
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.schema import Query
+
+QUERY_NESTED = '''
+query Prompts {
+  rdb {
+    prompts {
+      edges {
+        node {
+          promptNo
+          traceCall {
+            lineNo
+            trace {
+              traceNo
+              run {
+                script
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+QUERY_RUNS = '''
+query Runs {
+  rdb {
+    runs {
+      edges {
+        node {
+          runNo
+        }
+      }
+    }
+  }
+}
+'''
+
+
+@settings(max_examples=10, phases=(Phase.generate,))
+@given(runs=st_model_run_list(generate_traces=True, min_size=0, max_size=3))
+async def test_nested(runs: list[Run]) -> None:
+    '''The relationships of the selected nested fields are loaded.'''
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        expected = [
+            (
+                p.prompt_no,
+                p.trace_call.line_no,
+                p.trace.trace_no,
+                r.script.script if r.script else None,
+            )
+            for r in runs
+            for p in r.prompts
+        ]
+        resp = await schema.execute(QUERY_NESTED, context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+    actual = [
+        (
+            n['promptNo'],
+            n['traceCall']['lineNo'],
+            n['traceCall']['trace']['traceNo'],
+            n['traceCall']['trace']['run']['script'],
+        )
+        for e in resp.data['rdb']['prompts']['edges']
+        for n in [e['node']]
+    ]
+    assert sorted(actual, key=repr) == sorted(expected, key=repr)
+
+
+@settings(max_examples=10, phases=(Phase.generate,))
+@given(runs=st_model_run_list(generate_traces=True, min_size=1, max_size=3))
+async def test_not_selected(runs: list[Run]) -> None:
+    '''The relationships of the fields not selected are not loaded.'''
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+
+        statements = list[str]()
+
+        @event.listens_for(db.engine.sync_engine, 'before_cursor_execute')
+        def _(conn, cursor, statement, *_, **__):  # type: ignore
+            statements.append(statement)
+
+        resp = await schema.execute(QUERY_RUNS, context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert len(statements) == 1
+
+
+QUERY_NESTED_CONNECTION = '''
+query Runs {
+  rdb {
+    runs {
+      edges {
+        node {
+          runNo
+          traces(first: 2) {
+            edges {
+              node {
+                traceNo
+                run {
+                  runNo
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+@settings(max_examples=10, phases=(Phase.generate,))
+@given(runs=st_model_run_list(generate_traces=True, min_size=0, max_size=3))
+async def test_nested_connection(runs: list[Run]) -> None:
+    '''The options apply to pages not sorted by an indexed column, e.g., traceNo.'''
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        resp = await schema.execute(QUERY_NESTED_CONNECTION, context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+    for edge in resp.data['rdb']['runs']['edges']:
+        run_no = edge['node']['runNo']
+        traces = [e['node'] for e in edge['node']['traces']['edges']]
+        assert all(t['run']['runNo'] == run_no for t in traces)
@@ -0,0 +1,180 @@
+import datetime
+from typing import Any, Optional
+
+import pytest
+import strawberry
+from hypothesis import Phase, given, settings
+from sqlalchemy import event
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Script, Trace
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.schema import Query
+from nextline_rdb.summary import refresh_run_summaries
+
+START = datetime.datetime(2024, 1, 1)
+
+QUERY_NESTED_CONNECTIONS = '''
+query Runs($first: Int, $last: Int) {
+  rdb {
+    runs {
+      edges {
+        node {
+          runNo
+          traces(first: $first, last: $last) {
+            totalCount
+            pageInfo {
+              hasNextPage
+              hasPreviousPage
+            }
+            edges {
+              node {
+                traceNo
+                prompts {
+                  totalCount
+                  edges {
+                    node {
+                      promptNo
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+def _expected(
+    runs: list[Run], first: Optional[int], last: Optional[int]
+) -> dict[int, Any]:
+    ret = dict[int, Any]()
+    for run in runs:
+        traces = sorted(run.traces, key=lambda t: t.trace_no)
+        page = traces[:first] if first is not None else traces
+        page = page[-last:] if last is not None else page
+        ret[run.run_no] = {
+            'totalCount': len(traces),
+            'pageInfo': {
+                'hasNextPage': first is not None and len(traces) > first,
+                'hasPreviousPage': last is not None and len(traces) > last,
+            },
+            'traces': [
+                (t.trace_no, len(t.prompts), sorted(p.prompt_no for p in t.prompts))
+                for t in page
+            ],
+        }
+    return ret
+
+
+@pytest.mark.parametrize(
+    'first, last', [(None, None), (1, None), (3, None), (None, 1), (None, 3)]
+)
+@settings(max_examples=5, phases=(Phase.generate,))
+@given(runs=st_model_run_list(generate_traces=True, min_size=0, max_size=3))
+async def test_batched(
+    runs: list[Run], first: Optional[int], last: Optional[int]
+) -> None:
+    '''The nested connections of all nodes are loaded in one batch per level.'''
+    schema = strawberry.Schema(query=Query)
+    expected = _expected(runs, first, last)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+            await session.flush()
+            # As written by Nextline
+            await refresh_run_summaries(session, [run.id for run in runs])
+
+        statements = list[str]()
+
+        @event.listens_for(db.engine.sync_engine, 'before_cursor_execute')
+        def _(conn, cursor, statement, *_, **__):  # type: ignore
+            statements.append(statement)
+
+        resp = await schema.execute(
+            QUERY_NESTED_CONNECTIONS,
+            variable_values={'first': first, 'last': last},
+            context_value={'db': db},
+        )
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+
+    actual = dict[int, Any]()
+    for edge in resp.data['rdb']['runs']['edges']:
+        traces = edge['node']['traces']
+        actual[edge['node']['runNo']] = {
+            'totalCount': traces['totalCount'],
+            'pageInfo': traces['pageInfo'],
+            'traces': [
+                (
+                    n['traceNo'],
+                    n['prompts']['totalCount'],
+                    sorted(e['node']['promptNo'] for e in n['prompts']['edges']),
+                )
+                for e in traces['edges']
+                for n in [e['node']]
+            ],
+        }
+    assert actual == expected
+
+    # However many runs and traces, one query for the runs and, for each level of
+    # the nested connections, one for the nodes, one for the total counts, and
+    # one for each to-one relationship: 1 for a trace and 3 for a prompt.
+    assert len(statements) <= 1 + (2 + 1) + (2 + 3)
+
+
+QUERY_TRACE_RUNS = '''
+query Runs {
+  rdb {
+    runs {
+      edges {
+        node {
+          traces {
+            edges {
+              node {
+                run {
+                  %s
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+async def test_reused_context() -> None:
+    '''The loaders in a context reused across operations, e.g., in a websocket.'''
+    schema = strawberry.Schema(query=Query)
+    run = Run(run_no=1, script=Script(script='pass'))
+    run.traces.append(
+        Trace(trace_no=1, state='finished', thread_no=1, started_at=START)
+    )
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add(run)
+        context = {'db': db}
+        # The script is loaded only if selected
+        selections = [
+            ('runNo', {'runNo': 1}),
+            ('runNo script', {'runNo': 1, 'script': 'pass'}),
+        ]
+        for fields, expected in selections:
+            resp = await schema.execute(
+                QUERY_TRACE_RUNS % fields, context_value=context
+            )
+            assert isinstance(resp, ExecutionResult)
+            assert not resp.errors
+            assert resp.data
+            (edge,) = resp.data['rdb']['runs']['edges']
+            (trace_edge,) = edge['node']['traces']['edges']
+            assert trace_edge['node']['run'] == expected
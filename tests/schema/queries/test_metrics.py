@@ -0,0 +1,60 @@
+import strawberry
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.schema import Query
+
+QUERY_RUNS = '''
+query Runs {
+  rdb {
+    runs {
+      totalCount
+    }
+  }
+}
+'''
+
+QUERY_METRICS = '''
+query Metrics {
+  rdb {
+    metrics {
+      histograms {
+        name
+        labels {
+          name
+          value
+        }
+        count
+        buckets {
+          le
+          count
+        }
+      }
+      prometheus
+    }
+  }
+}
+'''
+
+
+async def test_metrics() -> None:
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        resp = await schema.execute(QUERY_RUNS, context_value={'db': db})
+        assert not resp.errors
+        # In a separate query as the fields in the same query resolve concurrently
+        resp = await schema.execute(QUERY_METRICS, context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+
+    metrics = resp.data['rdb']['metrics']
+    histograms = {
+        tuple((label['name'], label['value']) for label in h['labels']): h
+        for h in metrics['histograms']
+        if h['name'] == 'nextline_rdb_resolver_duration_seconds'
+    }
+    histogram = histograms[(('resolver', 'rdb.runs'),)]
+    assert histogram['count'] >= 1
+    assert histogram['buckets'][-1]['count'] <= histogram['count']
+    assert 'nextline_rdb_resolver_duration_seconds_count' in metrics['prometheus']
@@ -0,0 +1,115 @@
+import re
+from typing import Any
+
+import pytest
+import strawberry
+from hypothesis import Phase, given, settings
+from sqlalchemy import event
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Model, Run
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.schema import Query
+
+_NODES = '''
+  edges {
+    node {
+      id
+      traces { totalCount edges { node { id } } }
+      traceCalls { totalCount edges { node { id } } }
+      prompts { totalCount edges { node { id } } }
+      stdouts { totalCount edges { node { id } } }
+    }
+  }
+'''
+
+_TRACE_NODES = '''
+  edges {
+    node {
+      id
+      traceCalls { totalCount edges { node { id } } }
+      prompts { totalCount edges { node { id } } }
+      stdouts { totalCount edges { node { id } } }
+    }
+  }
+'''
+
+_TRACE_CALL_NODES = '''
+  edges { node { id prompts { totalCount edges { node { id } } } } }
+'''
+
+QUERIES = {
+    'runs': f'{{ rdb {{ runs(first: 2) {{ totalCount {_NODES} }} }} }}',
+    'runs-last': f'{{ rdb {{ runs(last: 2) {{ {_NODES} }} }} }}',
+    'runs-filter': f'''
+    {{
+      rdb {{
+        runs(
+          first: 2
+          filter: {{
+            startedAfter: "2000-01-01T00:00:00"
+            endedBefore: "3000-01-01T00:00:00"
+          }}
+        ) {{
+          totalCount
+          {_NODES}
+        }}
+      }}
+    }}
+    ''',
+    'run': f'{{ rdb {{ run(runNo: 1) {{ id traces {{ {_TRACE_NODES} }} }} }} }}',
+    'traces': f'{{ rdb {{ traces(first: 2) {{ totalCount {_TRACE_NODES} }} }} }}',
+    'trace-calls': (
+        f'{{ rdb {{ traceCalls(first: 2) {{ totalCount {_TRACE_CALL_NODES} }} }} }}'
+    ),
+    'trace-call-stats': '''
+    {
+      rdb {
+        run(runNo: 1) {
+          traceCallStats(groupBy: [FILE, LINE, TRACE]) { count totalDuration }
+        }
+      }
+    }
+    ''',
+    'prompts': '{ rdb { prompts(last: 2) { totalCount edges { node { id } } } } }',
+    'stdouts': '{ rdb { stdouts(first: 2) { totalCount edges { node { id } } } } }',
+}
+
+# E.g., "SCAN trace" but not "SCAN trace USING INDEX ..." or "SCAN anon_1"
+_TABLE_SCAN = re.compile(
+    rf'^SCAN ({"|".join(Model.metadata.tables)})$',
+)
+
+
+@pytest.mark.parametrize('query', QUERIES.values(), ids=QUERIES.keys())
+@settings(max_examples=3, phases=(Phase.generate,))
+@given(runs=st_model_run_list(generate_traces=True, min_size=1, max_size=3))
+async def test_no_table_scans(query: str, runs: list[Run]) -> None:
+    '''The queries of the resolvers use indexes rather than table scans.'''
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+
+        statements = list[tuple[str, Any]]()
+
+        @event.listens_for(db.engine.sync_engine, 'before_cursor_execute')
+        def _(conn, cursor, statement, parameters, *_, **__):  # type: ignore
+            statements.append((statement, parameters))
+
+        resp = await schema.execute(query, context_value={'db': db})
+        assert isinstance(resp, ExecutionResult)
+        assert not resp.errors
+
+        event.remove(db.engine.sync_engine, 'before_cursor_execute', _)
+
+        async with db.session() as session:
+            for statement, parameters in statements:
+                conn = await session.connection()
+                plan = await conn.exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters
+                )
+                details = [row.detail for row in plan]
+                scans = [d for d in details if _TABLE_SCAN.match(d)]
+                assert not scans, (statement, details)
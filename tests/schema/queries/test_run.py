@@ -1,12 +1,15 @@
+from typing import cast
+
 import strawberry
 from hypothesis import Phase, given, note, settings
 from hypothesis import strategies as st
-from strawberry.types import ExecutionResult
+from strawberry.types import ExecutionResult, Info
 
 from nextline_rdb.db import DB
-from nextline_rdb.models import Run
+from nextline_rdb.models import Run, Script
 from nextline_rdb.models.strategies import st_model_run_list
 from nextline_rdb.schema import Query
+from nextline_rdb.schema.nodes import RunNode
 from nextline_test_utils.strategies import st_graphql_ints, st_none_or
 from tests.schema.graphql import QUERY_RDB_RUN
 
@@ -79,3 +82,24 @@ async def test_run(data: st.DataObject) -> None:
             assert run_
             assert run_['id'] == run.id
             assert run_['runNo'] == run.run_no
+
+
+@strawberry.type
+class _Query:
+    @strawberry.field
+    async def run(self, info: Info) -> RunNode:
+        db = cast(DB, info.context['db'])
+        async with db.session() as session:
+            run = await session.get_one(Run, 1)  # Without loading the script
+        return RunNode.from_model(run)
+
+
+async def test_script_not_loaded() -> None:
+    schema = strawberry.Schema(query=_Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add(Run(run_no=1, script=Script(script='pass')))
+        resp = await schema.execute('{ run { script } }', context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data == {'run': {'script': 'pass'}}
@@ -0,0 +1,121 @@
+import datetime
+
+import strawberry
+from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from sqlalchemy import event
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Stdout, Trace
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.retention import RetentionPolicy, prune
+from nextline_rdb.schema import Query
+from nextline_rdb.summary import refresh_run_summaries
+
+QUERY_RUNS = '''
+query Runs {
+  rdb {
+    runs {
+      edges {
+        node {
+          runNo
+          summary {
+            traceCount
+            traceCallCount
+            promptCount
+            stdoutCount
+            stdoutLength
+          }
+          traces(first: 1) { totalCount }
+          traceCalls(first: 1) { totalCount }
+          prompts(first: 1) { totalCount }
+          stdouts(first: 1) { totalCount }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+@settings(max_examples=10, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_summary(data: st.DataObject) -> None:
+    runs = data.draw(st_model_run_list(generate_traces=True, min_size=0, max_size=3))
+    summarized = data.draw(st.sets(st.sampled_from([r.run_no for r in runs] or [0])))
+    expected = {
+        run.run_no: {
+            'traceCount': len(run.traces),
+            'traceCallCount': len(run.trace_calls),
+            'promptCount': len(run.prompts),
+            'stdoutCount': len(run.stdouts),
+            'stdoutLength': sum(len(s.text or '') for s in run.stdouts),
+        }
+        for run in runs
+    }
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        async with db.session.begin() as session:
+            ids = [r.id for r in runs if r.run_no in summarized]
+            await refresh_run_summaries(session, ids)
+
+        statements = list[str]()
+
+        @event.listens_for(db.engine.sync_engine, 'before_cursor_execute')
+        def _(conn, cursor, statement, *_, **__):  # type: ignore
+            statements.append(statement)
+
+        resp = await schema.execute(QUERY_RUNS, context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+
+    for edge in resp.data['rdb']['runs']['edges']:
+        node = edge['node']
+        run_no = node['runNo']
+        counts = expected[run_no]
+        total_counts = {
+            'traceCount': node['traces']['totalCount'],
+            'traceCallCount': node['traceCalls']['totalCount'],
+            'promptCount': node['prompts']['totalCount'],
+            'stdoutCount': node['stdouts']['totalCount'],
+        }
+        assert total_counts == {k: v for k, v in counts.items() if k in total_counts}
+        if run_no in summarized:
+            assert node['summary'] == counts
+        else:
+            assert node['summary'] is None
+
+    # Counted only for the runs without summaries
+    counted = any('count(' in s.lower() for s in statements)
+    assert counted == any(r.run_no not in summarized for r in runs)
+
+
+async def test_pruned() -> None:
+    '''The summary counts the pruned rows, and `totalCount` the rows in the DB.'''
+    now = datetime.datetime(2024, 1, 1)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            run = Run(run_no=1, ended_at=now)
+            trace = Trace(
+                run=run, trace_no=1, state='finished', thread_no=1, started_at=now
+            )
+            for _ in range(3):
+                Stdout(run=run, trace=trace, text='hello', written_at=now)
+            session.add(run)
+        async with db.session.begin() as session:
+            await refresh_run_summaries(session, [run.id])
+        await prune(db, RetentionPolicy(max_stdouts_per_run=1), now=now)
+
+        schema = strawberry.Schema(query=Query)
+        resp = await schema.execute(QUERY_RUNS, context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+    (edge,) = resp.data['rdb']['runs']['edges']
+    assert edge['node']['summary']['stdoutCount'] == 3
+    assert edge['node']['summary']['stdoutLength'] == 15
+    assert edge['node']['stdouts']['totalCount'] == 1
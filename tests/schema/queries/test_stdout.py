@@ -0,0 +1,49 @@
+import datetime
+
+import strawberry
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Stdout, Trace
+from nextline_rdb.schema import Query
+from nextline_rdb.utils.compress import compress_text
+
+QUERY_STDOUTS = '''
+query Stdouts {
+  rdb {
+    stdouts {
+      edges {
+        node {
+          text
+        }
+      }
+    }
+  }
+}
+'''
+
+
+async def test_compressed() -> None:
+    '''The compressed text is decompressed transparently.'''
+    now = datetime.datetime(2024, 1, 1)
+    run = Run(run_no=1)
+    trace = Trace(run=run, trace_no=1, state='finished', thread_no=1, started_at=now)
+    Stdout(run=run, trace=trace, text='plain\n')
+    Stdout(
+        run=run,
+        trace=trace,
+        compression='zlib',
+        text_compressed=compress_text('compressed\n', 'zlib'),
+    )
+
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add(run)
+        resp = await schema.execute(QUERY_STDOUTS, context_value={'db': db})
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+
+    edges = resp.data['rdb']['stdouts']['edges']
+    assert [e['node']['text'] for e in edges] == ['plain\n', 'compressed\n']
@@ -0,0 +1,91 @@
+import datetime
+from typing import Any, Optional
+
+import strawberry
+from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Stdout, Trace
+from nextline_rdb.schema import Query
+
+QUERY_STDOUT_TAIL = '''
+query StdoutTail($runNo: Int!, $afterId: Int, $first: Int, $last: Int) {
+  rdb {
+    stdoutTail(runNo: $runNo, afterId: $afterId, first: $first, last: $last) {
+      id
+      runNo
+      traceNo
+      text
+    }
+  }
+}
+'''
+
+
+def _runs(n_stdouts: list[int]) -> list[Run]:
+    '''Runs with the numbers of stdouts, written alternately.'''
+    now = datetime.datetime(2024, 1, 1)
+    runs = list[Run]()
+    for run_no, _ in enumerate(n_stdouts, start=1):
+        run = Run(run_no=run_no)
+        Trace(run=run, trace_no=1, state='finished', thread_no=1, started_at=now)
+        runs.append(run)
+    return runs
+
+
+@settings(max_examples=20, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_stdout_tail(data: st.DataObject) -> None:
+    n_stdouts = data.draw(st.lists(st.integers(0, 6), min_size=1, max_size=3))
+    runs = _runs(n_stdouts)
+    # Interleave the stdouts of the runs
+    order = [i for i, n in enumerate(n_stdouts) for _ in range(n)]
+    order = data.draw(st.permutations(order))
+    counts = [0] * len(runs)
+    stdouts = list[Stdout]()
+    for i in order:
+        counts[i] += 1
+        run = runs[i]
+        text = f'{run.run_no}-{counts[i]}\n'
+        stdouts.append(Stdout(run=run, trace=run.traces[0], text=text))
+
+    run_no = data.draw(st.sampled_from([r.run_no for r in runs] + [100]))
+    after_id: Optional[int] = data.draw(st.none() | st.integers(0, len(order) + 1))
+    first, last = data.draw(
+        st.one_of(
+            st.tuples(st.none(), st.none()),
+            st.tuples(st.integers(0, 7), st.none()),
+            st.tuples(st.none(), st.integers(0, 7)),
+        )
+    )
+
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        ids = [(s.id, s.text) for s in stdouts if s.run.run_no == run_no]
+        variables: dict[str, Any] = {
+            'runNo': run_no,
+            'afterId': after_id,
+            'first': first,
+            'last': last,
+        }
+        resp = await schema.execute(
+            QUERY_STDOUT_TAIL, variable_values=variables, context_value={'db': db}
+        )
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+
+    expected = sorted(ids)
+    if after_id is not None:
+        expected = [(i, t) for i, t in expected if i > after_id]
+    if first is not None:
+        expected = expected[:first]
+    if last is not None:
+        expected = expected[-last:] if last else []
+    actual = resp.data['rdb']['stdoutTail']
+    assert [(s['id'], s['text']) for s in actual] == expected
+    assert all(s['runNo'] == run_no and s['traceNo'] == 1 for s in actual)
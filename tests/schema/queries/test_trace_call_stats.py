@@ -0,0 +1,114 @@
+from collections import defaultdict
+from typing import Any, Optional
+
+import pytest
+import strawberry
+from hypothesis import Phase, given, note, settings
+from hypothesis import strategies as st
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.schema import Query
+
+QUERY_TRACE_CALL_STATS = '''
+query TraceCallStats($runNo: Int!, $groupBy: [TraceCallGroupBy!], $first: Int) {
+  rdb {
+    run(runNo: $runNo) {
+      traceCallStats(groupBy: $groupBy, first: $first) {
+        fileName
+        lineNo
+        traceNo
+        count
+        totalDuration
+        avgDuration
+        maxDuration
+      }
+    }
+  }
+}
+'''
+
+_KEYS = {'FILE': 'fileName', 'LINE': 'lineNo', 'TRACE': 'traceNo'}
+
+
+def _expected(run: Run, group_by: list[str]) -> dict[tuple[Any, ...], Any]:
+    '''The count and the durations by the group.'''
+    groups = defaultdict[tuple[Any, ...], list[Optional[float]]](list)
+    if not group_by:
+        groups[(None,) * len(_KEYS)] = []  # One group even without calls
+    for call in run.trace_calls:
+        values = {
+            'FILE': call.file_name,
+            'LINE': call.line_no,
+            'TRACE': call.trace.trace_no,
+        }
+        key = tuple(values[g] if g in group_by else None for g in _KEYS)
+        duration = None
+        if call.ended_at is not None:
+            duration = (call.ended_at - call.started_at).total_seconds()
+        groups[key].append(duration)
+    ret = dict[tuple[Any, ...], Any]()
+    for key, durations in groups.items():
+        ended = [d for d in durations if d is not None]
+        total = sum(ended) if ended else None
+        avg = total / len(ended) if total is not None else None
+        ret[key] = (len(durations), total, avg, max(ended) if ended else None)
+    return ret
+
+
+@settings(max_examples=20, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_trace_call_stats(data: st.DataObject) -> None:
+    runs = data.draw(st_model_run_list(generate_traces=True, min_size=1, max_size=2))
+    run = data.draw(st.sampled_from(runs))
+    group_by = data.draw(st.lists(st.sampled_from(list(_KEYS)), max_size=3))
+    first = data.draw(st.none() | st.integers(min_value=0, max_value=3))
+    note(f'group_by: {group_by}, first: {first}')
+    expected = _expected(run, group_by)
+
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        resp = await schema.execute(
+            QUERY_TRACE_CALL_STATS,
+            variable_values={'runNo': run.run_no, 'groupBy': group_by, 'first': first},
+            context_value={'db': db},
+        )
+    assert isinstance(resp, ExecutionResult)
+    assert not resp.errors
+    assert resp.data
+    stats = resp.data['rdb']['run']['traceCallStats']
+
+    # In the descending order of the total duration
+    totals = [s['totalDuration'] for s in stats]
+    ended = [t for t in totals if t is not None]
+    assert totals == ended + [None] * (len(totals) - len(ended))
+    assert ended == sorted(ended, reverse=True)
+
+    assert len(stats) == (len(expected) if first is None else min(first, len(expected)))
+    for stat in stats:
+        key = tuple(stat[k] for k in _KEYS.values())
+        count, total, avg, max_ = expected[key]
+        assert stat['count'] == count
+        # Precise to the millisecond on SQLite
+        tolerance = 1e-3 * (count + 1)
+        assert stat['totalDuration'] == pytest.approx(total, abs=tolerance)
+        assert stat['avgDuration'] == pytest.approx(avg, abs=1e-3)
+        assert stat['maxDuration'] == pytest.approx(max_, abs=1e-3)
+
+
+async def test_negative_first() -> None:
+    schema = strawberry.Schema(query=Query)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add(Run(run_no=1))
+        resp = await schema.execute(
+            QUERY_TRACE_CALL_STATS,
+            variable_values={'runNo': 1, 'first': -1},
+            context_value={'db': db},
+        )
+    assert isinstance(resp, ExecutionResult)
+    assert resp.errors
@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import pytest
+import strawberry
+from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from strawberry.types import ExecutionResult
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Stdout, Trace
+from nextline_rdb.pubsub import Broker, StdoutAppended, stdout_appended
+from nextline_rdb.schema import Query, Subscription
+from nextline_rdb.utils import until_not_none
+
+SUBSCRIBE_STDOUT_TAIL = '''
+subscription StdoutTail($runNo: Int!, $afterId: Int, $last: Int) {
+  rdbStdoutTail(runNo: $runNo, afterId: $afterId, last: $last) {
+    id
+    text
+  }
+}
+'''
+
+NOW = datetime.datetime(2024, 1, 1)
+
+
+async def _write(db: DB, broker: Broker, texts: list[str]) -> list[Stdout]:
+    '''Add the stdouts to the run 1 and publish them like the writer.'''
+    async with db.session.begin() as session:
+        run = await session.get_one(Run, 1)
+        trace = await session.get_one(Trace, 1)
+        stdouts = [
+            Stdout(run=run, trace=trace, text=text, written_at=NOW) for text in texts
+        ]
+        session.add_all(stdouts)
+    for stdout in stdouts:
+        item = StdoutAppended(stdout=stdout, run_no=1, trace_no=1)
+        broker.publish(stdout_appended(1), item)
+    return stdouts
+
+
+async def _collect(sub: AsyncGenerator[Any, None], n: int) -> list[tuple[int, str]]:
+    ret = list[tuple[int, str]]()
+    async for result in sub:
+        assert isinstance(result, ExecutionResult)
+        assert not result.errors, result.errors
+        assert result.data
+        node = result.data['rdbStdoutTail']
+        ret.append((node['id'], node['text']))
+        if len(ret) == n:
+            break
+    return ret
+
+
+@settings(max_examples=20, phases=(Phase.generate,))  # Avoid shrinking
+@given(
+    n_old=st.integers(0, 5),
+    n_new=st.integers(1, 5),
+    last=st.none() | st.integers(0, 6),
+    n_resume=st.integers(0, 5),
+)
+async def test_stdout_tail(
+    tmp_path_factory: pytest.TempPathFactory,
+    n_old: int,
+    n_new: int,
+    last: int | None,
+    n_resume: int,
+) -> None:
+    # A file because the sessions share the connection to an in-memory DB
+    url = f'sqlite:///{tmp_path_factory.mktemp("db")}/db.sqlite'
+    schema = strawberry.Schema(query=Query, subscription=Subscription)
+    broker = Broker()
+    async with DB(url) as db:
+        async with db.session.begin() as session:
+            run = Run(run_no=1)
+            Trace(run=run, trace_no=1, state='running', thread_no=1, started_at=NOW)
+            session.add(run)
+        old = [(s.id, s.text) for s in await _write(db, broker, ['o'] * n_old)]
+
+        caught_up = old if last is None else old[-last:] if last else []
+        context = {'db': db, 'broker': broker}
+        variables = {'runNo': 1, 'last': last}
+        sub = await schema.subscribe(
+            SUBSCRIBE_STDOUT_TAIL, variable_values=variables, context_value=context
+        )
+        assert isinstance(sub, AsyncGenerator)
+        if caught_up:
+            assert await _collect(sub, len(caught_up)) == caught_up
+        task = asyncio.create_task(_collect(sub, n_new))
+
+        async def _subscribed() -> bool | None:
+            return broker.count(stdout_appended(1)) > 0 or None
+
+        await until_not_none(_subscribed, timeout=5)
+
+        new = [(s.id, s.text) for s in await _write(db, broker, ['n'] * n_new)]
+        # Published again, e.g., read from the DB as well. Not duplicated.
+        async with db.session() as session:
+            for id_, _ in old + new:
+                stdout = await session.get_one(Stdout, id_)
+                broker.publish(
+                    stdout_appended(1),
+                    StdoutAppended(stdout=stdout, run_no=1, trace_no=1),
+                )
+        assert await task == new
+        await sub.aclose()
+        assert broker.count(stdout_appended(1)) == 0
+
+        # Resume after the last received ID
+        cursor = new[-1][0]
+        resumed = await _write(db, broker, ['r'] * n_resume)
+        variables = {'runNo': 1, 'afterId': cursor}
+        sub = await schema.subscribe(
+            SUBSCRIBE_STDOUT_TAIL, variable_values=variables, context_value=context
+        )
+        assert isinstance(sub, AsyncGenerator)
+        if n_resume:
+            actual = await _collect(sub, n_resume)
+            assert actual == [(s.id, s.text) for s in resumed]
+        await sub.aclose()
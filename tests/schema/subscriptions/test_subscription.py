@@ -0,0 +1,254 @@
+import asyncio
+import datetime
+from collections.abc import AsyncGenerator
+from typing import Any
+from unittest.mock import Mock
+
+import strawberry
+from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from strawberry.types import ExecutionResult
+
+from nextline.events import (
+    OnEndRun,
+    OnStartPrompt,
+    OnStartRun,
+    OnStartTrace,
+    OnStartTraceCall,
+    OnWriteStdout,
+)
+from nextline.plugin import spec
+from nextline.spawned import RunArg
+from nextline.types import PromptNo, RunNo, ThreadNo, TraceCallNo, TraceNo
+from nextline_rdb.db import DB
+from nextline_rdb.pubsub import (
+    PROMPT_OPENED,
+    RUN_ADDED,
+    RUN_UPDATED,
+    Broker,
+    stdout_appended,
+)
+from nextline_rdb.schema import Query, Subscription
+from nextline_rdb.utils import until_not_none
+from nextline_rdb.write import BufferedWriter, Writer, register
+
+from ...write.test_write import mock_hook, mock_nextline
+
+NOW = datetime.datetime(2024, 1, 1)
+
+SUBSCRIBE_RUN_ADDED = '''
+subscription RunAdded {
+  rdbRunAdded {
+    runNo
+    state
+    script
+  }
+}
+'''
+
+SUBSCRIBE_RUN_UPDATED = '''
+subscription RunUpdated {
+  rdbRunUpdated {
+    runNo
+    state
+    endedAt
+  }
+}
+'''
+
+SUBSCRIBE_STDOUT_APPENDED = '''
+subscription StdoutAppended($runNo: Int!) {
+  rdbStdoutAppended(runNo: $runNo) {
+    runNo
+    traceNo
+    text
+    run {
+      runNo
+    }
+  }
+}
+'''
+
+SUBSCRIBE_PROMPT_OPENED = '''
+subscription PromptOpened {
+  rdbPromptOpened {
+    runNo
+    traceNo
+    promptNo
+    open
+    event
+    fileName
+    lineNo
+    traceCall {
+      traceCallNo
+    }
+  }
+}
+'''
+
+
+async def _run(context: spec.Context, texts: list[str]) -> None:
+    '''Run the events of a run with a trace, a prompt, and the stdouts.'''
+    ahook = context.hook.ahook
+    context.run_arg = RunArg(run_no=RunNo(1), statement='pass')
+    await ahook.on_initialize_run(context=context)
+    utc = datetime.timezone.utc
+    event_start_run = OnStartRun(
+        started_at=NOW.replace(tzinfo=utc), run_no=RunNo(1), statement='pass'
+    )
+    await ahook.on_start_run(context=context, event=event_start_run)
+    event_start_trace = OnStartTrace(
+        started_at=NOW,
+        run_no=RunNo(1),
+        trace_no=TraceNo(1),
+        thread_no=ThreadNo(1),
+        task_no=None,
+    )
+    await ahook.on_start_trace(context=context, event=event_start_trace)
+    event_start_trace_call = OnStartTraceCall(
+        started_at=NOW,
+        run_no=RunNo(1),
+        trace_no=TraceNo(1),
+        trace_call_no=TraceCallNo(1),
+        file_name='<string>',
+        line_no=1,
+        frame_object_id=1,
+        event='line',
+    )
+    await ahook.on_start_trace_call(context=context, event=event_start_trace_call)
+    event_start_prompt = OnStartPrompt(
+        started_at=NOW,
+        run_no=RunNo(1),
+        trace_no=TraceNo(1),
+        trace_call_no=TraceCallNo(1),
+        prompt_no=PromptNo(1),
+        prompt_text='(Pdb) ',
+        file_name='<string>',
+        line_no=1,
+        frame_object_id=1,
+        event='line',
+    )
+    await ahook.on_start_prompt(context=context, event=event_start_prompt)
+    for text in texts:
+        event_write_stdout = OnWriteStdout(
+            written_at=NOW, run_no=RunNo(1), trace_no=TraceNo(1), text=text
+        )
+        await ahook.on_write_stdout(context=context, event=event_write_stdout)
+    event_end_run = OnEndRun(
+        ended_at=NOW.replace(tzinfo=utc), run_no=RunNo(1), returned='null', raised=''
+    )
+    await ahook.on_end_run(context=context, event=event_end_run)
+
+
+async def _collect(
+    schema: strawberry.Schema,
+    query: str,
+    context: dict[str, Any],
+    n: int,
+    variables: dict[str, Any] | None = None,
+) -> list[dict[str, Any]]:
+    sub = await schema.subscribe(
+        query, variable_values=variables, context_value=context
+    )
+    assert isinstance(sub, AsyncGenerator)
+    ret = list[dict[str, Any]]()
+    async for result in sub:
+        assert isinstance(result, ExecutionResult)
+        assert not result.errors, result.errors
+        assert result.data
+        ret.append(result.data)
+        if len(ret) == n:
+            break
+    await sub.aclose()
+    return ret
+
+
+@settings(max_examples=10, phases=(Phase.generate,))  # Avoid shrinking
+@given(
+    texts=st.lists(st.text(min_size=1, max_size=5), max_size=5),
+    buffered=st.booleans(),
+)
+async def test_subscriptions(texts: list[str], buffered: bool) -> None:
+    schema = strawberry.Schema(query=Query, subscription=Subscription)
+    broker = Broker()
+    hook = mock_hook()
+    nextline = mock_nextline(hook)
+    async with DB() as db:
+        writer = BufferedWriter(db, max_delay=0.01) if buffered else Writer(db)
+        async with writer:
+            register(nextline, db, writer=writer, broker=broker)
+            context = {'db': db, 'broker': broker}
+            tasks = [
+                asyncio.create_task(_collect(schema, SUBSCRIBE_RUN_ADDED, context, 1)),
+                asyncio.create_task(
+                    _collect(schema, SUBSCRIBE_RUN_UPDATED, context, 1)
+                ),
+                asyncio.create_task(
+                    _collect(
+                        schema,
+                        SUBSCRIBE_STDOUT_APPENDED,
+                        context,
+                        len(texts),
+                        variables={'runNo': 1},
+                    )
+                ),
+                asyncio.create_task(
+                    _collect(schema, SUBSCRIBE_PROMPT_OPENED, context, 1)
+                ),
+            ]
+            topics = [RUN_ADDED, RUN_UPDATED, stdout_appended(1), PROMPT_OPENED]
+
+            async def _subscribed() -> bool | None:
+                return all(broker.count(t) for t in topics) or None
+
+            await until_not_none(_subscribed, timeout=5)
+
+            hook_context = spec.Context(
+                nextline=nextline, hook=hook, pubsub=Mock(spec=spec.PubSub)
+            )
+            await _run(hook_context, texts)
+            await writer.flush()
+            if not texts:
+                tasks[2].cancel()
+            added, updated, stdouts, prompts = await asyncio.gather(
+                *tasks, return_exceptions=True
+            )
+
+    assert added == [
+        {'rdbRunAdded': {'runNo': 1, 'state': 'running', 'script': 'pass'}}
+    ]
+    assert updated == [
+        {
+            'rdbRunUpdated': {
+                'runNo': 1,
+                'state': 'finished',
+                'endedAt': NOW.isoformat(),
+            }
+        }
+    ]
+    if texts:
+        assert stdouts == [
+            {
+                'rdbStdoutAppended': {
+                    'runNo': 1,
+                    'traceNo': 1,
+                    'text': text,
+                    'run': {'runNo': 1},
+                }
+            }
+            for text in texts
+        ]
+    assert prompts == [
+        {
+            'rdbPromptOpened': {
+                'runNo': 1,
+                'traceNo': 1,
+                'promptNo': 1,
+                'open': True,
+                'event': 'line',
+                'fileName': '<string>',
+                'lineNo': 1,
+                'traceCall': {'traceCallNo': 1},
+            }
+        }
+    ]
@@ -0,0 +1,63 @@
+from collections import Counter
+
+from hypothesis import Phase, given, note, settings
+from hypothesis import strategies as st
+from sqlalchemy import func, select
+
+from nextline_rdb.db import DB
+from nextline_rdb.delete import CHILD_MODELS, DeleteProgress, delete_runs
+from nextline_rdb.models import Run
+from nextline_rdb.models.strategies import st_model_run_list
+
+
+async def _count_by_run(db: DB) -> dict[str, Counter[int]]:
+    ret = dict[str, Counter[int]]()
+    async with db.session() as session:
+        for model in (*CHILD_MODELS, Run):
+            run_id = Run.id if model is Run else model.run_id  # type: ignore
+            stmt = select(run_id, func.count()).select_from(model).group_by(run_id)
+            rows = (await session.execute(stmt)).all()
+            ret[model.__tablename__] = Counter({k: v for k, v in rows})
+    return ret
+
+
+@settings(max_examples=10, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_delete_runs(data: st.DataObject) -> None:
+    runs = data.draw(st_model_run_list(generate_traces=True, min_size=0, max_size=4))
+    chunk_size = data.draw(st.integers(min_value=1, max_value=5))
+
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        run_ids = [run.id for run in runs]
+        ids = data.draw(st.lists(st.sampled_from(run_ids + [1000]), unique=True))
+        note(f'ids: {ids}')
+
+        before = await _count_by_run(db)
+        reported = list[DeleteProgress]()
+        deleted = await delete_runs(
+            db, ids, chunk_size=chunk_size, progress=reported.append
+        )
+        after = await _count_by_run(db)
+
+    expected = sorted(i for i in ids if i in run_ids)
+    assert deleted == expected
+    for table, counts in before.items():
+        for run_id in run_ids:
+            if run_id in deleted:
+                assert after[table][run_id] == 0
+            else:
+                assert after[table][run_id] == counts[run_id]
+
+    # The progress of each table of each run
+    for progress in reported:
+        assert 0 < progress.deleted <= progress.total
+        assert progress.total == before[progress.table][progress.run_id]
+        assert progress.runs_total == len(expected)
+    last = {(p.run_id, p.table): p for p in reported}
+    assert all(p.deleted == p.total for p in last.values())
+    assert [p.run_id for p in reported if p.table == 'run'] == expected
+    assert [p.runs_done for p in reported if p.table == 'run'] == list(
+        range(1, len(expected) + 1)
+    )
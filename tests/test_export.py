@@ -0,0 +1,104 @@
+import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+from hypothesis import Phase, given, note, settings
+from hypothesis import strategies as st
+from sqlalchemy import select
+
+from nextline_rdb.db import DB
+from nextline_rdb.export import EXPORT_MODELS, FORMATS, export_runs, main
+from nextline_rdb.models import Run, Script, Stdout, Trace
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.utils.compress import compress_text
+
+pa = pytest.importorskip('pyarrow')
+from pyarrow import parquet  # noqa: E402
+
+
+def _read(path: Path) -> Any:
+    if path.suffix == '.parquet':
+        return parquet.read_table(path)
+    with pa.ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+@settings(max_examples=10, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_export_runs(
+    tmp_path_factory: pytest.TempPathFactory, data: st.DataObject
+) -> None:
+    runs = data.draw(st_model_run_list(generate_traces=True, min_size=0, max_size=4))
+    format = data.draw(st.sampled_from(FORMATS))
+    chunk_size = data.draw(st.integers(min_value=1, max_value=5))
+    directory = tmp_path_factory.mktemp('export')
+
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        run_nos = [run.run_no for run in runs]
+        selected = data.draw(st.none() | st.lists(st.sampled_from(run_nos + [1000])))
+        note(f'selected: {selected}')
+
+        counts = await export_runs(
+            db, directory, run_nos=selected, format=format, chunk_size=chunk_size
+        )
+
+        # The rows of the selected runs in the DB
+        expected = dict[str, list[int]]()
+        async with db.session() as session:
+            run_ids = select(Run.id)
+            if selected is not None:
+                run_ids = run_ids.where(Run.run_no.in_(selected))
+            for model in EXPORT_MODELS:
+                id_ = model.id  # type: ignore[attr-defined]
+                stmt = select(id_).order_by(id_)
+                if model is Script:
+                    if selected is not None:
+                        script_ids = select(Run.script_id).where(Run.id.in_(run_ids))
+                        stmt = stmt.where(id_.in_(script_ids))
+                elif model is Run:
+                    stmt = stmt.where(id_.in_(run_ids))
+                else:
+                    stmt = stmt.where(model.run_id.in_(run_ids))  # type: ignore
+                ids = (await session.scalars(stmt)).all()
+                expected[model.__tablename__] = list(ids)
+
+    assert counts == {k: len(v) for k, v in expected.items()}
+    for table, ids in expected.items():
+        exported = _read(directory / f'{table}.{format}')
+        assert exported.column('id').to_pylist() == ids
+        assert exported.schema.metadata[b'table'] == table.encode()
+
+
+async def test_stdout(tmp_path: Path) -> None:
+    '''The stdout texts are exported decompressed.'''
+    now = datetime.datetime(2024, 1, 1)
+    run = Run(run_no=1)
+    trace = Trace(run=run, trace_no=1, state='finished', thread_no=1, started_at=now)
+    Stdout(run=run, trace=trace, text='plain\n', written_at=now)
+    Stdout(
+        run=run,
+        trace=trace,
+        compression='zlib',
+        text_compressed=compress_text('compressed\n', 'zlib'),
+        written_at=now,
+    )
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add(run)
+        await export_runs(db, tmp_path)
+
+    exported = _read(tmp_path / 'stdout.parquet')
+    assert exported.column_names == ['id', 'text', 'written_at', 'run_id', 'trace_id']
+    assert exported.column('text').to_pylist() == ['plain\n', 'compressed\n']
+    assert exported.column('written_at').to_pylist() == [now, now]
+
+
+def test_main(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    url = f'sqlite:///{tmp_path}/db.sqlite'
+    main([url, str(tmp_path / 'exported'), '--runs', '1-3', '--format', 'arrow'])
+    out = capsys.readouterr().out
+    assert 'run: 0 rows' in out
+    assert (tmp_path / 'exported' / 'trace_call.arrow').is_file()
@@ -0,0 +1,112 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+from hypothesis import Phase, given, note, settings
+from hypothesis import strategies as st
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+from nextline_rdb.db import DB
+from nextline_rdb.export import FORMATS, export_runs
+from nextline_rdb.import_ import import_runs, main
+from nextline_rdb.models import Prompt, Run, Script, Stdout, TraceCall
+from nextline_rdb.models.strategies import st_model_run_list
+
+pytest.importorskip('pyarrow')
+
+
+async def _dump(db: DB) -> dict[int, Any]:
+    '''The contents of the runs by the run number without the IDs.'''
+    async with db.session() as session:
+        stmt = select(Run).options(
+            selectinload(Run.script),
+            selectinload(Run.traces),
+            selectinload(Run.trace_calls).selectinload(TraceCall.trace),
+            selectinload(Run.prompts).selectinload(Prompt.trace),
+            selectinload(Run.prompts).selectinload(Prompt.trace_call),
+            selectinload(Run.stdouts).selectinload(Stdout.trace),
+        )
+        runs = (await session.scalars(stmt)).all()
+    return {
+        run.run_no: (
+            (run.state, run.started_at, run.ended_at, run.exception),
+            run.script.script if run.script else None,
+            sorted(
+                (t.trace_no, t.state, t.thread_no, t.task_no, t.started_at)
+                for t in run.traces
+            ),
+            sorted(
+                (c.trace_call_no, c.trace.trace_no, c.file_name, c.line_no, c.event)
+                for c in run.trace_calls
+            ),
+            sorted(
+                (p.prompt_no, p.trace.trace_no, p.trace_call.trace_call_no, p.open)
+                for p in run.prompts
+            ),
+            sorted((s.text or '', s.trace.trace_no) for s in run.stdouts),
+        )
+        for run in runs
+    }
+
+
+@settings(max_examples=10, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_import_runs(
+    tmp_path_factory: pytest.TempPathFactory, data: st.DataObject
+) -> None:
+    exported = data.draw(st_model_run_list(generate_traces=True, max_size=3))
+    existing = data.draw(st_model_run_list(generate_traces=True, max_size=3))
+    format = data.draw(st.sampled_from(FORMATS))
+    batch_size = data.draw(st.integers(min_value=1, max_value=5))
+    directory = tmp_path_factory.mktemp('export')
+
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(exported)
+        await export_runs(db, directory, format=format)
+        expected = await _dump(db)
+
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(existing)
+        before = await _dump(db)
+        run_nos = await import_runs(db, directory, format=format, batch_size=batch_size)
+        note(f'run_nos: {run_nos}')
+        after = await _dump(db)
+        async with db.session() as session:
+            texts = (await session.scalars(select(Script.script))).all()
+
+    assert sorted(run_nos) == sorted(expected)
+    assert len(set(run_nos.values())) == len(run_nos)
+    for old, new in run_nos.items():
+        assert (new == old) == (old not in before)
+        assert after[new] == expected[old]
+    assert after == before | {run_nos[k]: v for k, v in expected.items()}
+    assert len(texts) == len(set(texts))  # No duplicate scripts
+
+
+async def test_conflict(tmp_path: Path) -> None:
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add(Run(run_no=1))
+        await export_runs(db, tmp_path)
+        with pytest.raises(ValueError):
+            await import_runs(db, tmp_path, on_conflict='error')
+        async with db.session() as session:
+            assert await session.scalar(select(func.count()).select_from(Run)) == 1
+        assert await import_runs(db, tmp_path) == {1: 2}
+
+
+def test_main(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    async def _export() -> None:
+        async with DB(f'sqlite:///{tmp_path}/db.sqlite') as db:
+            async with db.session.begin() as session:
+                session.add(Run(run_no=3))
+            await export_runs(db, tmp_path / 'exported')
+
+    asyncio.run(_export())
+    main([f'sqlite:///{tmp_path}/archive.sqlite', str(tmp_path / 'exported')])
+    main([f'sqlite:///{tmp_path}/archive.sqlite', str(tmp_path / 'exported')])
+    assert capsys.readouterr().out == 'Run 3\nRun 3 as run 4\n'
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from nextline_rdb.db import DB
+from nextline_rdb.metrics import METRICS, Histogram, Metrics, pool_metrics
+
+
+@given(values=st.lists(st.floats(min_value=0, max_value=100)))
+def test_histogram(values: list[float]) -> None:
+    histogram = Histogram()
+    for value in values:
+        histogram.observe(value)
+    assert histogram.count == len(values)
+    assert histogram.sum == pytest.approx(sum(values))
+    cumulative = histogram.cumulative()
+    assert cumulative[-1] == (float('inf'), len(values))
+    for le, count in cumulative:
+        assert count == len([v for v in values if v <= le])
+
+
+async def test_timed() -> None:
+    metrics = Metrics()
+
+    @metrics.timed('duration_seconds', func='f')
+    async def f(x: int) -> int:
+        await asyncio.sleep(0)
+        return x
+
+    @metrics.timed('duration_seconds', func='g')
+    async def g() -> None:
+        raise ValueError
+
+    assert await f(1) == 1
+    assert await f(x=2) == 2
+    with pytest.raises(ValueError):
+        await g()
+
+    histograms = metrics.histograms
+    assert histograms[('duration_seconds', (('func', 'f'),))].count == 2
+    assert histograms[('duration_seconds', (('func', 'g'),))].count == 1
+
+
+def test_prometheus() -> None:
+    metrics = Metrics()
+    metrics.inc('events_total', {'hook': 'on_start_run'})
+    metrics.inc('events_total', {'hook': 'on_start_run'}, value=2)
+    metrics.inc('events_total', {'hook': 'a"b\\c'})
+    metrics.set_gauge('queue_size', lambda: 5)
+    text = metrics.to_prometheus()
+    lines = text.splitlines()
+    assert lines.count('# TYPE nextline_rdb_events_total counter') == 1
+    assert 'nextline_rdb_events_total{hook="on_start_run"} 3' in lines
+    assert 'nextline_rdb_events_total{hook="a\\"b\\\\c"} 1' in lines
+    assert 'nextline_rdb_queue_size 5' in lines
+    metrics.clear()
+    metrics.remove_gauge('queue_size')
+    assert metrics.to_prometheus() == '\n'
+
+
+async def test_pool_metrics(tmp_path_factory: pytest.TempPathFactory) -> None:
+    path = tmp_path_factory.mktemp('db') / 'db.sqlite3'
+    async with DB(url=f'sqlite+aiosqlite:///{path}') as db:
+        with pool_metrics(write=db.engine, read=db.read_engine):
+            before = METRICS.counters.get(
+                ('db_pool_checkouts_total', (('engine', 'write'),)), 0
+            )
+            async with db.session() as session:
+                await session.connection()
+                gauges = METRICS.gauges
+                assert gauges[('db_pool_checked_out', (('engine', 'write'),))] == 1
+            after = METRICS.counters[
+                ('db_pool_checkouts_total', (('engine', 'write'),))
+            ]
+            assert after == before + 1
+            # The read engine is the same as the write engine
+            assert ('db_pool_checked_out', (('engine', 'read'),)) not in gauges
+        assert ('db_pool_checked_out', (('engine', 'write'),)) not in METRICS.gauges
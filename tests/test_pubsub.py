@@ -0,0 +1,30 @@
+from hypothesis import given
+from hypothesis import strategies as st
+
+from nextline_rdb.pubsub import Broker
+
+
+@given(
+    n_items=st.integers(min_value=0, max_value=10),
+    max_queue_size=st.integers(min_value=1, max_value=5),
+)
+async def test_slow_subscriber(n_items: int, max_queue_size: int) -> None:
+    '''A subscriber that falls behind is unsubscribed.'''
+    broker = Broker(max_queue_size=max_queue_size)
+    slow = broker.subscribe('topic')
+    other = broker.subscribe('other')
+    assert broker.count('topic') == 1
+    for i in range(n_items):
+        broker.publish('topic', i)
+
+    if n_items > max_queue_size:
+        assert broker.count('topic') == 0
+        assert [i async for i in slow] == []
+    else:
+        assert broker.count('topic') == 1
+        broker.close()
+        assert [i async for i in slow] == list(range(n_items))
+
+    broker.close()
+    assert broker.count('other') == 0
+    assert [i async for i in other] == []
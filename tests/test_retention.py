@@ -0,0 +1,255 @@
+import datetime
+from typing import Any, Optional
+
+import pytest
+from hypothesis import Phase, given, note, settings
+from hypothesis import strategies as st
+from sqlalchemy import select
+
+from nextline_rdb.db import DB
+from nextline_rdb.models import Prompt, Run, RunSummary, Stdout, Trace, TraceCall
+from nextline_rdb.models.strategies import st_model_run_list
+from nextline_rdb.retention import Pruner, RetentionPolicy, incremental_vacuum, prune
+from nextline_rdb.summary import refresh_run_summaries
+
+Tables = dict[str, dict[int, tuple[Any, ...]]]
+
+
+async def _snapshot(db: DB) -> Tables:
+    columns: dict[str, tuple[Any, ...]] = {
+        'run': (Run.id, Run.run_no, Run.started_at, Run.ended_at),
+        'trace': (Trace.id, Trace.run_id),
+        'trace_call': (TraceCall.id, TraceCall.run_id, TraceCall.trace_call_no),
+        'prompt': (Prompt.id, Prompt.run_id, Prompt.trace_call_id),
+        'stdout': (Stdout.id, Stdout.run_id),
+    }
+    ret: Tables = {}
+    async with db.session() as session:
+        for table, cols in columns.items():
+            rows = (await session.execute(select(*cols))).all()
+            ret[table] = {row[0]: tuple(row[1:]) for row in rows}
+    return ret
+
+
+def _expected(
+    tables: Tables, policy: RetentionPolicy, now: datetime.datetime
+) -> Tables:
+    '''Apply the policy to the snapshot in Python.'''
+    runs = tables['run']
+    latest = max((run_no for run_no, *_ in runs.values()), default=None)
+    finished = {
+        id_
+        for id_, (run_no, _, ended_at) in runs.items()
+        if ended_at is not None or run_no < latest
+    }
+
+    def _older(id_: int, age: Optional[datetime.timedelta]) -> bool:
+        started_at = runs[id_][1]
+        if age is None or started_at is None or now - datetime.datetime.min < age:
+            return False
+        return started_at < now - age
+
+    kept_run_nos = sorted((r for r, *_ in runs.values()), reverse=True)
+    if policy.keep_last_runs is not None:
+        kept_run_nos = kept_run_nos[: policy.keep_last_runs]
+    expired = {
+        id_
+        for id_ in finished
+        if runs[id_][0] not in kept_run_nos or _older(id_, policy.max_age)
+    }
+    detailless = {id_ for id_ in finished if _older(id_, policy.trace_call_max_age)}
+
+    ret = {
+        table: {
+            id_: row
+            for id_, row in rows.items()
+            if (id_ if table == 'run' else row[0]) not in expired
+        }
+        for table, rows in tables.items()
+    }
+    for table in ('trace_call', 'prompt'):
+        ret[table] = {k: v for k, v in ret[table].items() if v[0] not in detailless}
+
+    def _cap(table: str, max_: Optional[int], key: Any) -> None:
+        if max_ is None:
+            return
+        for run_id in finished:
+            ids = sorted((i for i, r in ret[table].items() if r[0] == run_id), key=key)
+            for id_ in ids[:-max_]:
+                del ret[table][id_]
+
+    _cap(
+        'trace_call',
+        policy.max_trace_calls_per_run,
+        lambda i: tables['trace_call'][i][1],
+    )
+    ret['prompt'] = {
+        k: v for k, v in ret['prompt'].items() if v[1] in ret['trace_call']
+    }
+    _cap('stdout', policy.max_stdouts_per_run, lambda i: i)
+    return ret
+
+
+def st_limit() -> st.SearchStrategy[Optional[int]]:
+    return st.none() | st.integers(min_value=1, max_value=4)
+
+
+def st_age() -> st.SearchStrategy[Optional[datetime.timedelta]]:
+    return st.none() | st.timedeltas(
+        min_value=datetime.timedelta(seconds=1),
+        max_value=datetime.timedelta(days=365 * 20),
+    )
+
+
+@st.composite
+def st_policy(draw: st.DrawFn) -> RetentionPolicy:
+    return RetentionPolicy(
+        keep_last_runs=draw(st_limit()),
+        max_age=draw(st_age()),
+        max_stdouts_per_run=draw(st_limit()),
+        max_trace_calls_per_run=draw(st_limit()),
+        trace_call_max_age=draw(st_age()),
+    )
+
+
+@settings(max_examples=20, phases=(Phase.generate,))  # Avoid shrinking
+@given(data=st.data())
+async def test_prune(data: st.DataObject) -> None:
+    runs = data.draw(st_model_run_list(generate_traces=True, min_size=0, max_size=4))
+    policy = data.draw(st_policy())
+    batch_size = data.draw(st.integers(min_value=1, max_value=5))
+    now = data.draw(st.datetimes())
+    note(f'policy: {policy}')
+
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all(runs)
+        before = await _snapshot(db)
+        deleted = await prune(db, policy, batch_size=batch_size, now=now)
+        after = await _snapshot(db)
+
+    expected = _expected(before, policy, now)
+    assert after == expected
+    for table, rows in before.items():
+        assert deleted.get(table, 0) == len(rows) - len(expected[table])
+
+
+def test_policy_from_settings() -> None:
+    settings = {
+        'keep_last_runs': 10,
+        'max_age_days': 0,
+        'max_stdouts_per_run': 0,
+        'max_trace_calls_per_run': 1000,
+        'trace_call_max_age_days': 1.5,
+    }
+    expected = RetentionPolicy(
+        keep_last_runs=10,
+        max_trace_calls_per_run=1000,
+        trace_call_max_age=datetime.timedelta(hours=36),
+    )
+    assert RetentionPolicy.from_settings(settings) == expected
+
+
+async def test_incremental_vacuum(tmp_path_factory: pytest.TempPathFactory) -> None:
+    path = tmp_path_factory.mktemp('db') / 'db.sqlite3'
+    pragmas = {'auto_vacuum': 'INCREMENTAL'}
+    async with DB(url=f'sqlite+aiosqlite:///{path}', sqlite_pragmas=pragmas) as db:
+        async with db.session.begin() as session:
+            now = datetime.datetime(2024, 1, 1)
+            run = Run(run_no=1, ended_at=now)
+            trace = Trace(
+                run=run, trace_no=1, state='finished', thread_no=1, started_at=now
+            )
+            for _ in range(1_000):
+                Stdout(run=run, trace=trace, text='x' * 1_000)
+            session.add(run)
+        size = path.stat().st_size
+        deleted = await prune(db, RetentionPolicy(max_stdouts_per_run=1))
+        assert deleted == {'stdout': 999}
+        assert path.stat().st_size < size / 2
+        assert await incremental_vacuum(db) == 0
+
+
+async def test_summary_kept() -> None:
+    '''The summary still counts the trace calls and prompts pruned by the age.'''
+    started_at = datetime.datetime(2024, 1, 1)
+    now = started_at + datetime.timedelta(days=2)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            run = Run(run_no=1, started_at=started_at, ended_at=started_at)
+            trace = Trace(
+                run=run, trace_no=1, state='finished', thread_no=1, started_at=now
+            )
+            for i in range(1, 4):
+                call = TraceCall(
+                    run=run,
+                    trace=trace,
+                    trace_call_no=i,
+                    started_at=started_at,
+                    event='line',
+                )
+                Prompt(
+                    run=run,
+                    trace=trace,
+                    trace_call=call,
+                    prompt_no=i,
+                    open=False,
+                    started_at=started_at,
+                )
+            Stdout(run=run, trace=trace, text='hello', written_at=started_at)
+            session.add(run)
+        async with db.session.begin() as session:
+            await refresh_run_summaries(session, [run.id])
+        async with db.session() as session:
+            before = await session.scalar(select(RunSummary))
+        assert before
+
+        policy = RetentionPolicy(trace_call_max_age=datetime.timedelta(days=1))
+        deleted = await prune(db, policy, now=now)
+        assert deleted == {'trace_call': 3, 'prompt': 3}
+
+        async with db.session() as session:
+            after = await session.scalar(select(RunSummary))
+        assert after
+        assert after.trace_call_count == before.trace_call_count == 3
+        assert after.prompt_count == before.prompt_count == 3
+        assert after.stdout_count == before.stdout_count == 1
+        assert after.first_event_at == before.first_event_at
+        assert after.last_event_at == before.last_event_at
+        assert before.pruned_at is None
+        assert after.pruned_at == now
+
+
+async def test_latest_run_deleted() -> None:
+    '''A run older than the latest run is still finished after it is deleted.'''
+    started_at = datetime.datetime(2024, 1, 1)
+    now = started_at + datetime.timedelta(days=2)
+    async with DB() as db:
+        async with db.session.begin() as session:
+            # Never ended, e.g., because the process crashed
+            run = Run(run_no=1, started_at=now)
+            trace = Trace(
+                run=run, trace_no=1, state='running', thread_no=1, started_at=now
+            )
+            for _ in range(3):
+                Stdout(run=run, trace=trace, text='x')
+            latest = Run(run_no=2, started_at=started_at, ended_at=started_at)
+            session.add_all([run, latest])
+        policy = RetentionPolicy(
+            max_age=datetime.timedelta(days=1), max_stdouts_per_run=1
+        )
+        deleted = await prune(db, policy, now=now)
+        assert deleted == {'run': 1, 'stdout': 2}
+
+
+async def test_pruner() -> None:
+    async with DB() as db:
+        async with db.session.begin() as session:
+            session.add_all([Run(run_no=i) for i in range(1, 4)])
+        policy = RetentionPolicy(keep_last_runs=1)
+        async with Pruner(db, policy, interval=3600) as pruner:
+            await pruner.wait()
+        assert pruner.deleted == {'run': 2}
+        async with db.session() as session:
+            # The latest run is kept even if it has not ended
+            assert (await session.scalars(select(Run.run_no))).all() == [3]
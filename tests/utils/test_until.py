@@ -39,3 +39,22 @@ async def test_timeout_never_return() -> None:
 
     with pytest.raises(UntilNotNoneTimeout):
         await until_not_none(func, timeout=0.001)
+
+
+@pytest.mark.timeout(5)
+async def test_wake() -> None:
+    '''`func` is called again when `wake()` completes, not after the interval.'''
+    event = asyncio.Event()
+    results = iter([None, 'done'])
+
+    async def func() -> str | None:
+        return next(results)
+
+    async def wake() -> None:
+        await event.wait()
+
+    task = asyncio.create_task(until_not_none(func, interval=60, wake=wake))
+    await asyncio.sleep(0)
+    assert not task.done()
+    event.set()
+    assert (await task) == 'done'
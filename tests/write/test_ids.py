@@ -0,0 +1,186 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from nextline.types import RunNo, TraceCallNo, TraceNo
+from nextline_rdb.db import DB
+from nextline_rdb.models import Run, Trace, TraceCall
+from nextline_rdb.write import BufferedWriter, IdCache, Writer
+from nextline_rdb.write import writer as writer_module
+
+
+def _count_selects(db: DB) -> list[str]:
+    selects = list[str]()
+
+    @event.listens_for(db.engine.sync_engine, 'before_cursor_execute')
+    def _(conn, cursor, statement, *_, **__):  # type: ignore
+        if statement.lstrip().upper().startswith('SELECT'):
+            selects.append(statement)
+
+    return selects
+
+
+async def _add(ids: IdCache, session: AsyncSession) -> None:
+    now = datetime.datetime.now()
+    run = Run(run_no=1, state='running')
+    session.add(run)
+    ids.add_run(session, run)
+    run_id = await ids.run_id(session, RunNo(1))
+    trace = Trace(
+        run_id=run_id, trace_no=1, state='running', thread_no=1, started_at=now
+    )
+    session.add(trace)
+    ids.add_trace(session, RunNo(1), trace)
+    trace_id = await ids.trace_id(session, RunNo(1), TraceNo(1))
+    trace_call = TraceCall(
+        run_id=run_id,
+        trace_id=trace_id,
+        trace_call_no=1,
+        started_at=now,
+        file_name='<string>',
+        line_no=1,
+        event='line',
+    )
+    session.add(trace_call)
+    ids.add_trace_call(session, RunNo(1), trace_call)
+
+
+async def test_no_selects() -> None:
+    async with DB() as db, Writer(db) as writer:
+        ids = IdCache(writer=writer)
+        selects = _count_selects(db)
+        await writer.submit(lambda session: _add(ids, session))
+        assert len(ids) == 3
+
+        async def _get(session: AsyncSession) -> None:
+            assert await ids.run_id(session, RunNo(1))
+            assert await ids.trace_id(session, RunNo(1), TraceNo(1))
+            assert await ids.trace_call_id(session, RunNo(1), TraceCallNo(1))
+
+        await writer.submit(_get)
+        assert not selects
+
+
+async def test_miss() -> None:
+    async with DB() as db, Writer(db) as writer:
+        await writer.submit(lambda session: _add(IdCache(writer=writer), session))
+        ids = IdCache(writer=writer)
+        selects = _count_selects(db)
+
+        async def _get(session: AsyncSession) -> None:
+            await ids.trace_id(session, RunNo(1), TraceNo(1))
+
+        await writer.submit(_get)
+        await writer.submit(_get)
+        assert len(selects) == 1
+        assert len(ids) == 1
+
+
+async def test_remove_run() -> None:
+    async with DB() as db, Writer(db) as writer:
+        ids = IdCache(writer=writer)
+        await writer.submit(lambda session: _add(ids, session))
+
+        async def _remove(session: AsyncSession) -> None:
+            ids.remove_run(session, RunNo(1))
+
+        await writer.submit(_remove)
+        assert not ids
+
+
+async def test_remove_trace_call() -> None:
+    async with DB() as db, Writer(db) as writer:
+        ids = IdCache(writer=writer)
+        await writer.submit(lambda session: _add(ids, session))
+
+        async def _remove(session: AsyncSession) -> None:
+            assert await ids.trace_call_id(session, RunNo(1), TraceCallNo(1))
+            ids.remove_trace_call(session, RunNo(1), TraceCallNo(1))
+
+        await writer.submit(_remove)
+        assert len(ids) == 2
+
+
+async def test_remove_trace_call_added() -> None:
+    '''Removed in the transaction in which it is added.'''
+    async with DB() as db, Writer(db) as writer:
+        ids = IdCache(writer=writer)
+
+        async def _add_remove(session: AsyncSession) -> None:
+            await _add(ids, session)
+            assert await ids.trace_call_id(session, RunNo(1), TraceCallNo(1))
+            ids.remove_trace_call(session, RunNo(1), TraceCallNo(1))
+
+        await writer.submit(_add_remove)
+        assert len(ids) == 2
+
+
+async def test_rollback() -> None:
+    async with DB() as db:
+        writer = BufferedWriter(db, max_delay=0.01)
+        ids = IdCache(writer=writer)
+
+        async def _fail(session: AsyncSession) -> None:
+            raise RuntimeError
+
+        async with writer:
+            await writer.submit(lambda session: _add(ids, session))
+            await writer.submit(_fail)  # The batch is rolled back
+            await writer.flush()
+        assert len(ids) == 3  # Cached when added again one by one
+
+
+async def test_ready() -> None:
+    '''A lookup of a row not committed yet waits for the commit, not polling.'''
+    async with DB() as db, Writer(db) as writer:
+        ids = IdCache(writer=writer)
+        found = list[int]()
+
+        async def _get(session: AsyncSession) -> None:
+            found.append(await ids.trace_id(session, RunNo(1), TraceNo(1)))
+
+        task = asyncio.create_task(writer.submit(_get))
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        selects = _count_selects(db)
+        await writer.submit(lambda session: _add(ids, session))
+        await asyncio.wait_for(task, 1)
+        assert found
+        assert len(selects) <= 1
+
+
+async def test_ready_buffered(monkeypatch: pytest.MonkeyPatch) -> None:
+    '''A deferred op is retried when the row is committed, not at the interval.'''
+    monkeypatch.setattr(writer_module, 'RETRY_INTERVAL', 60)
+    async with DB() as db:
+        writer = BufferedWriter(db, max_batch_size=1, max_delay=0)
+        ids = IdCache(writer=writer)
+        found = list[int]()
+
+        async def _get(session: AsyncSession) -> None:
+            found.append(await ids.trace_id(session, RunNo(1), TraceNo(1)))
+
+        async with writer:
+            await writer.submit(_get)
+            await writer.submit(lambda session: _add(ids, session))
+            await asyncio.wait_for(writer.flush(), 5)
+        assert found
+
+
+async def test_ready_timeout() -> None:
+    '''The waiters for a row never committed are removed at the timeout.'''
+    async with DB() as db:
+        writer = BufferedWriter(db, max_delay=0.01, timeout=0.05)
+        ids = IdCache(writer=writer)
+
+        async def _get(session: AsyncSession) -> None:
+            await ids.trace_id(session, RunNo(1), TraceNo(1))
+
+        async with writer:
+            await writer.submit(_get)
+            await writer.flush()
+        await asyncio.sleep(0)  # Let the waiter be cancelled
+        assert not ids._ready
@@ -0,0 +1,65 @@
+import datetime
+from unittest.mock import Mock
+
+from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from nextline.events import OnEndRun, OnStartRun
+from nextline.plugin import spec
+from nextline.spawned import RunArg
+from nextline.types import RunNo
+from nextline_rdb.db import DB
+from nextline_rdb.models import CurrentScript, Run, Script
+from nextline_rdb.write import BufferedWriter, Writer, register
+
+from .test_write import mock_hook, mock_nextline
+
+NOW = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@settings(max_examples=10, phases=(Phase.generate,))  # Avoid shrinking
+@given(
+    statements=st.lists(st.sampled_from(['', 'pass', 'x = 1']), max_size=6),
+    buffered=st.booleans(),
+)
+async def test_dedup(statements: list[str], buffered: bool) -> None:
+    '''Each script is stored once however often the statement changes.'''
+    hook = mock_hook()
+    nextline = mock_nextline(hook)
+    async with DB() as db:
+        writer = BufferedWriter(db, max_delay=0.01) if buffered else Writer(db)
+        async with writer:
+            register(nextline, db, writer=writer)
+            context = spec.Context(
+                nextline=nextline, hook=hook, pubsub=Mock(spec=spec.PubSub)
+            )
+            ahook = hook.ahook
+            for run_no, statement in enumerate(statements, start=1):
+                context.run_arg = RunArg(run_no=RunNo(run_no), statement=statement)
+                await ahook.on_initialize_run(context=context)
+                start = OnStartRun(
+                    started_at=NOW, run_no=RunNo(run_no), statement=statement
+                )
+                await ahook.on_start_run(context=context, event=start)
+                end = OnEndRun(
+                    ended_at=NOW, run_no=RunNo(run_no), returned='null', raised=''
+                )
+                await ahook.on_end_run(context=context, event=end)
+            await writer.flush()
+
+        async with db.session() as session:
+            scripts = (await session.scalars(select(Script))).all()
+            stmt = select(Run).options(selectinload(Run.script)).order_by(Run.run_no)
+            runs = (await session.scalars(stmt)).all()
+            stmt_ = select(CurrentScript).options(selectinload(CurrentScript.script))
+            current = (await session.execute(stmt_)).scalar_one_or_none()
+
+    assert sorted(s.script for s in scripts) == sorted(set(statements))
+    assert [r.script.script if r.script else None for r in runs] == statements
+    if statements:
+        assert current is not None
+        assert current.script.script == statements[-1]
+    else:
+        assert current is None
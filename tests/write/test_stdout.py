@@ -0,0 +1,183 @@
+import asyncio
+import datetime
+from collections.abc import Awaitable, Callable
+from unittest.mock import Mock
+
+from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from nextline.events import OnEndRun, OnStartRun, OnStartTrace, OnWriteStdout
+from nextline.plugin import spec
+from nextline.spawned import RunArg
+from nextline.types import RunNo, ThreadNo, TraceNo
+from nextline_rdb.db import DB
+from nextline_rdb.models import Stdout
+from nextline_rdb.write import BufferedWriter, StdoutOptions, Writer, register
+
+from .test_write import mock_hook, mock_nextline
+
+START = datetime.datetime(2024, 1, 1)
+
+
+async def _start(
+    db: DB, writer: Writer, options: StdoutOptions
+) -> tuple[spec.Context, Callable[[], Awaitable[None]]]:
+    '''Register the plugins and start a run with two traces.
+
+    Return the context and the function that closes the plugins.
+    '''
+    hook = mock_hook()
+    nextline = mock_nextline(hook)
+    aclose = register(nextline, db, writer=writer, stdout=options)
+    context = spec.Context(nextline=nextline, hook=hook, pubsub=Mock(spec=spec.PubSub))
+    context.run_arg = RunArg(run_no=RunNo(1), statement='pass')
+    ahook = hook.ahook
+    await ahook.on_initialize_run(context=context)
+    event = OnStartRun(
+        started_at=START.replace(tzinfo=datetime.timezone.utc),
+        run_no=RunNo(1),
+        statement='pass',
+    )
+    await ahook.on_start_run(context=context, event=event)
+    for trace_no in (1, 2):
+        event_ = OnStartTrace(
+            started_at=START,
+            run_no=RunNo(1),
+            trace_no=TraceNo(trace_no),
+            thread_no=ThreadNo(trace_no),
+            task_no=None,
+        )
+        await ahook.on_start_trace(context=context, event=event_)
+    return context, aclose
+
+
+async def _write(
+    context: spec.Context, trace_no: int, text: str, seconds: float
+) -> None:
+    event = OnWriteStdout(
+        written_at=START + datetime.timedelta(seconds=seconds),
+        run_no=RunNo(1),
+        trace_no=TraceNo(trace_no),
+        text=text,
+    )
+    await context.hook.ahook.on_write_stdout(context=context, event=event)
+
+
+async def _end(context: spec.Context) -> None:
+    event = OnEndRun(
+        ended_at=START.replace(tzinfo=datetime.timezone.utc),
+        run_no=RunNo(1),
+        returned='null',
+        raised='',
+    )
+    await context.hook.ahook.on_end_run(context=context, event=event)
+
+
+async def _stdouts(db: DB) -> list[Stdout]:
+    async with db.session() as session:
+        stmt = select(Stdout).options(selectinload(Stdout.trace)).order_by(Stdout.id)
+        return list((await session.scalars(stmt)).all())
+
+
+@st.composite
+def st_options(draw: st.DrawFn) -> StdoutOptions:
+    return StdoutOptions(
+        coalesce_window=draw(st.none() | st.floats(min_value=0.01, max_value=1)),
+        coalesce_max_size=draw(st.integers(min_value=1, max_value=20)),
+        compression=draw(st.none() | st.just('zlib')),
+        compression_min_size=draw(st.integers(min_value=0, max_value=10)),
+    )
+
+
+@settings(max_examples=20, phases=(Phase.generate,))  # Avoid shrinking
+@given(
+    options=st_options(),
+    writes=st.lists(
+        st.tuples(
+            st.sampled_from([1, 2]),
+            st.text(min_size=1, max_size=8),
+            st.floats(min_value=0, max_value=0.5),
+        ),
+        max_size=20,
+    ),
+    buffered=st.booleans(),
+)
+async def test_stdout(
+    options: StdoutOptions, writes: list[tuple[int, str, float]], buffered: bool
+) -> None:
+    async with DB() as db:
+        writer = BufferedWriter(db, max_delay=0.01) if buffered else Writer(db)
+        async with writer:
+            context, _ = await _start(db, writer, options)
+            seconds = 0.0
+            for trace_no, text, interval in writes:
+                seconds += interval
+                await _write(context, trace_no, text, seconds)
+            await _end(context)
+            await writer.flush()
+        stdouts = await _stdouts(db)
+        trace_nos = {s.id: s.trace.trace_no for s in stdouts}
+
+    if options.coalesce_window is None:
+        assert len(stdouts) == len(writes)
+    else:
+        assert len(stdouts) <= len(writes)
+
+    # No text is lost or reordered in each trace
+    for trace_no in (1, 2):
+        expected = ''.join(t for n, t, _ in writes if n == trace_no)
+        actual = ''.join(
+            s.decompressed_text or '' for s in stdouts if trace_nos[s.id] == trace_no
+        )
+        assert actual == expected
+
+    for stdout in stdouts:
+        decompressed = stdout.decompressed_text
+        assert decompressed
+        if (
+            options.compression is not None
+            and len(decompressed) >= options.compression_min_size
+        ):
+            assert stdout.text is None
+            assert stdout.compression == options.compression
+        else:
+            assert stdout.text == decompressed
+            assert stdout.compression is None
+
+
+async def test_coalesce() -> None:
+    options = StdoutOptions(coalesce_window=0.1)
+    async with DB() as db, Writer(db) as writer:
+        context, _ = await _start(db, writer, options)
+        await _write(context, 1, 'a', 0)
+        await _write(context, 1, 'b', 0.05)
+        await _write(context, 2, 'c', 0.06)  # Another trace
+        await _write(context, 2, 'd', 0.5)  # After the window
+        await _write(context, 2, 'e\n', 0.55)
+        assert [s.text for s in await _stdouts(db)] == ['ab', 'c']
+
+        # Flushed after the window without another write
+        await asyncio.sleep(0.3)
+        stdouts = await _stdouts(db)
+        assert [s.text for s in stdouts] == ['ab', 'c', 'de\n']
+        assert [s.written_at for s in stdouts] == [
+            START,
+            START + datetime.timedelta(seconds=0.06),
+            START + datetime.timedelta(seconds=0.5),
+        ]
+
+
+async def test_close() -> None:
+    options = StdoutOptions(coalesce_window=60)
+    async with DB() as db:
+        async with BufferedWriter(db, max_delay=0.01) as writer:
+            context, aclose = await _start(db, writer, options)
+            await _write(context, 1, 'a', 0)
+            await _write(context, 1, 'b', 0.05)
+            # Closed without the end of the run, e.g., at the shutdown
+            await aclose()
+        assert [s.text for s in await _stdouts(db)] == ['ab']
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    assert not [t for t in tasks if '_flush_later' in repr(t.get_coro())]
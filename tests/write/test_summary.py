@@ -0,0 +1,223 @@
+import datetime
+from unittest.mock import Mock
+
+from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from sqlalchemy import delete, event, select
+
+from nextline.events import (
+    OnEndRun,
+    OnEndTrace,
+    OnStartRun,
+    OnStartTrace,
+    OnWriteStdout,
+)
+from nextline.plugin import spec
+from nextline.spawned import RunArg
+from nextline.types import RunNo, ThreadNo, TraceNo
+from nextline_rdb.db import DB
+from nextline_rdb.models import RunSummary
+from nextline_rdb.summary import refresh_run_summaries
+from nextline_rdb.write import BufferedWriter, Writer, register
+
+from .test_write import mock_hook, mock_nextline
+
+START = datetime.datetime(2024, 1, 1)
+
+
+@st.composite
+def st_ops(draw: st.DrawFn) -> list[tuple[str, int]]:
+    '''Starts and ends of traces and stdout writes in an order they can occur.'''
+    ops = list[tuple[str, int]]()
+    running = list[int]()
+    n_traces = 0
+    for _ in range(draw(st.integers(0, 20))):
+        choices = ['start'] + (['end', 'stdout'] if running else [])
+        match draw(st.sampled_from(choices)):
+            case 'start':
+                n_traces += 1
+                running.append(n_traces)
+                ops.append(('start', n_traces))
+            case 'end':
+                trace_no = draw(st.sampled_from(running))
+                running.remove(trace_no)
+                ops.append(('end', trace_no))
+            case 'stdout':
+                ops.append(('stdout', draw(st.sampled_from(running))))
+    return ops
+
+
+def _max_concurrent(ops: list[tuple[str, int]]) -> int:
+    running = max_ = 0
+    for op, _ in ops:
+        running += {'start': 1, 'end': -1}.get(op, 0)
+        max_ = max(max_, running)
+    return max_
+
+
+@settings(max_examples=20, phases=(Phase.generate,))  # Avoid shrinking
+@given(ops=st_ops(), buffered=st.booleans(), texts=st.lists(st.text(), min_size=20))
+async def test_summary(
+    ops: list[tuple[str, int]], buffered: bool, texts: list[str]
+) -> None:
+    async with DB() as db:
+        writer = BufferedWriter(db, max_delay=0.01) if buffered else Writer(db)
+        await writer.start()
+        hook = mock_hook()
+        nextline = mock_nextline(hook)
+        register(nextline, db, writer=writer)
+        context = spec.Context(
+            nextline=nextline, hook=hook, pubsub=Mock(spec=spec.PubSub)
+        )
+        context.run_arg = RunArg(run_no=RunNo(1), statement='pass')
+        ahook = hook.ahook
+        await ahook.on_initialize_run(context=context)
+        started_at = START.replace(tzinfo=datetime.timezone.utc)
+        event = OnStartRun(started_at=started_at, run_no=RunNo(1), statement='pass')
+        await ahook.on_start_run(context=context, event=event)
+
+        # One second apart
+        times = [START + datetime.timedelta(seconds=i) for i in range(len(ops) + 1)]
+        written = list[str]()
+        for (op, trace_no), at in zip(ops, times):
+            match op:
+                case 'start':
+                    event_start = OnStartTrace(
+                        started_at=at,
+                        run_no=RunNo(1),
+                        trace_no=TraceNo(trace_no),
+                        thread_no=ThreadNo(trace_no),
+                        task_no=None,
+                    )
+                    await ahook.on_start_trace(context=context, event=event_start)
+                case 'end':
+                    event_end = OnEndTrace(
+                        ended_at=at, run_no=RunNo(1), trace_no=TraceNo(trace_no)
+                    )
+                    await ahook.on_end_trace(context=context, event=event_end)
+                case 'stdout':
+                    text = texts[len(written) % len(texts)]
+                    written.append(text)
+                    event_write = OnWriteStdout(
+                        written_at=at,
+                        run_no=RunNo(1),
+                        trace_no=TraceNo(trace_no),
+                        text=text,
+                    )
+                    await ahook.on_write_stdout(context=context, event=event_write)
+
+        ended_at = times[-1].replace(tzinfo=datetime.timezone.utc)
+        event_end_run = OnEndRun(
+            ended_at=ended_at, run_no=RunNo(1), returned='null', raised=''
+        )
+        await ahook.on_end_run(context=context, event=event_end_run)
+        await writer.aclose()
+
+        async with db.session() as session:
+            summary = (await session.scalars(select(RunSummary))).one()
+        n_traces = sum(op == 'start' for op, _ in ops)
+        assert summary.trace_count == n_traces
+        assert summary.stdout_count == len(written)
+        assert summary.stdout_length == sum(len(t) for t in written)
+        assert summary.max_concurrent_traces == _max_concurrent(ops)
+        if n_traces:
+            assert summary.first_event_at == times[0]
+            # The running traces are ended at the end of the run
+            running = n_traces > sum(op == 'end' for op, _ in ops)
+            assert summary.last_event_at == times[-1 if running else -2]
+        else:
+            assert summary.first_event_at is None
+            assert summary.last_event_at is None
+
+        # The same as computed from the rows
+        written_summary = _values(summary)
+        async with db.session.begin() as session:
+            await refresh_run_summaries(session, [summary.run_id])
+        async with db.session() as session:
+            refreshed = (await session.scalars(select(RunSummary))).one()
+        assert _values(refreshed) == written_summary
+
+
+def _values(summary: RunSummary) -> tuple[object, ...]:
+    return (
+        summary.trace_count,
+        summary.trace_call_count,
+        summary.prompt_count,
+        summary.stdout_count,
+        summary.stdout_length,
+        summary.max_concurrent_traces,
+        summary.first_event_at,
+        summary.last_event_at,
+    )
+
+
+async def _start(db: DB, writer: Writer) -> spec.Context:
+    '''Register the plugins and start a run with a trace.'''
+    hook = mock_hook()
+    nextline = mock_nextline(hook)
+    register(nextline, db, writer=writer)
+    context = spec.Context(nextline=nextline, hook=hook, pubsub=Mock(spec=spec.PubSub))
+    context.run_arg = RunArg(run_no=RunNo(1), statement='pass')
+    ahook = hook.ahook
+    await ahook.on_initialize_run(context=context)
+    started_at = START.replace(tzinfo=datetime.timezone.utc)
+    event = OnStartRun(started_at=started_at, run_no=RunNo(1), statement='pass')
+    await ahook.on_start_run(context=context, event=event)
+    event_start = OnStartTrace(
+        started_at=START,
+        run_no=RunNo(1),
+        trace_no=TraceNo(1),
+        thread_no=ThreadNo(1),
+        task_no=None,
+    )
+    await ahook.on_start_trace(context=context, event=event_start)
+    return context
+
+
+async def _write(context: spec.Context, n: int) -> None:
+    for i in range(n):
+        event = OnWriteStdout(
+            written_at=START + datetime.timedelta(seconds=i + 1),
+            run_no=RunNo(1),
+            trace_no=TraceNo(1),
+            text='a',
+        )
+        await context.hook.ahook.on_write_stdout(context=context, event=event)
+
+
+async def test_update_only() -> None:
+    '''The summary is updated in one statement without being loaded.'''
+    async with DB() as db, Writer(db) as writer:
+        context = await _start(db, writer)
+
+        statements = list[str]()
+
+        @event.listens_for(db.engine.sync_engine, 'before_cursor_execute')
+        def _(conn, cursor, statement, *_, **__):  # type: ignore
+            statements.append(statement)
+
+        await _write(context, 3)
+
+        # An insert and an update in each transaction
+        summary_statements = [s for s in statements if 'run_summary' in s]
+        assert len(summary_statements) == 3
+        assert all(s.startswith('UPDATE run_summary') for s in summary_statements)
+
+        async with db.session() as session:
+            summary = (await session.scalars(select(RunSummary))).one()
+        assert summary.stdout_count == 3
+        assert summary.last_event_at == START + datetime.timedelta(seconds=3)
+
+
+async def test_no_summary() -> None:
+    '''The summary is computed from the rows if the run has none.'''
+    async with DB() as db, Writer(db) as writer:
+        context = await _start(db, writer)
+        await _write(context, 1)
+        async with db.session.begin() as session:
+            await session.execute(delete(RunSummary))
+        await _write(context, 2)
+
+        async with db.session() as session:
+            summary = (await session.scalars(select(RunSummary))).one()
+        assert (summary.trace_count, summary.stdout_count) == (1, 3)
@@ -1,10 +1,14 @@
 import json
-from datetime import timezone
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any
 from unittest.mock import Mock
 
+import pytest
 from apluggy import PluginManager
 from hypothesis import Phase, given, settings
+from hypothesis import strategies as st
+from sqlalchemy import select
 
 from nextline import Nextline
 from nextline.events import (
@@ -35,14 +39,16 @@ from nextline_rdb.models import (
     Model,
     Prompt,
     Run,
+    RunSummary,
     Script,
     Stdout,
     Trace,
     TraceCall,
 )
 from nextline_rdb.models.strategies import st_model_instance_list
+from nextline_rdb.summary import refresh_run_summaries
 from nextline_rdb.utils import load_all
-from nextline_rdb.write import register
+from nextline_rdb.write import BufferedWriter, Writer, register
 
 
 def mock_hook() -> PluginManager:
@@ -61,13 +67,16 @@ def mock_nextline(hook: PluginManager) -> Nextline:
 @given(
     instances=st_model_instance_list(
         min_size=0, max_size=5, allow_run_started_at_none=False
-    )
+    ),
+    buffered=st.booleans(),
 )
-async def test_write(instances: list[Model]) -> None:
+async def test_write(instances: list[Model], buffered: bool) -> None:
     hook = mock_hook()
     nextline = mock_nextline(hook)
     async with DB(use_migration=False, model_base_class=Model) as db:
-        register(nextline, db)
+        writer = BufferedWriter(db, max_delay=0.01) if buffered else Writer(db)
+        await writer.start()
+        register(nextline, db, writer=writer)
 
         context = spec.Context(
             nextline=nextline, hook=hook, pubsub=Mock(spec=spec.PubSub)
@@ -81,12 +90,21 @@ async def test_write(instances: list[Model]) -> None:
                 case _:
                     raise ValueError(f'Unknown instance: {instance!r}')
 
+        await writer.aclose()
+
         async with db.session() as session:
             loaded = await load_all(session, Model)
             loaded = [m for m in loaded if not isinstance(m, CurrentScript)]
             loaded = [m for m in loaded if not isinstance(m, Script)]
+            loaded = [m for m in loaded if not isinstance(m, RunSummary)]
             actual = [repr(m) for m in loaded]
 
+        # The summaries written incrementally are those computed from the rows
+        written = await _summaries(db)
+        async with db.session.begin() as session:
+            await refresh_run_summaries(session, written)
+        assert written == await _summaries(db)
+
     async with DB(use_migration=False, model_base_class=Model) as db:
         async with db.session.begin() as session:
             session.add_all(instances)
@@ -102,6 +120,86 @@ async def test_write(instances: list[Model]) -> None:
     # diff = DeepDiff(expected, actual)
 
 
+@pytest.mark.parametrize('max_batch_size', [1, 100])
+async def test_trace_call_end_after_start(max_batch_size: int) -> None:
+    '''The end of a trace call is not committed before its deferred start.'''
+    hook = mock_hook()
+    nextline = mock_nextline(hook)
+    started_at = datetime(2024, 1, 1)
+    ended_at = datetime(2024, 1, 2)
+    run_no, trace_no, trace_call_no = RunNo(1), TraceNo(1), TraceCallNo(1)
+    async with DB(use_migration=False, model_base_class=Model) as db:
+        writer = BufferedWriter(db, max_batch_size=max_batch_size, max_delay=0)
+        async with writer:
+            register(nextline, db, writer=writer)
+            context = spec.Context(
+                nextline=nextline, hook=hook, pubsub=Mock(spec=spec.PubSub)
+            )
+            context.run_arg = RunArg(run_no=run_no, statement='pass')
+            ahook = hook.ahook
+            await ahook.on_initialize_run(context=context)
+            on_start_run = OnStartRun(
+                started_at=started_at.replace(tzinfo=timezone.utc),
+                run_no=run_no,
+                statement='pass',
+            )
+            await ahook.on_start_run(context=context, event=on_start_run)
+
+            # The trace starts after the trace call starts and ends. Both are
+            # deferred until the trace is committed.
+            on_start_trace_call = OnStartTraceCall(
+                started_at=started_at,
+                run_no=run_no,
+                trace_no=trace_no,
+                trace_call_no=trace_call_no,
+                file_name='<string>',
+                line_no=1,
+                frame_object_id=0,
+                event='line',
+            )
+            await ahook.on_start_trace_call(context=context, event=on_start_trace_call)
+            on_end_trace_call = OnEndTraceCall(
+                ended_at=ended_at,
+                run_no=run_no,
+                trace_no=trace_no,
+                trace_call_no=trace_call_no,
+            )
+            await ahook.on_end_trace_call(context=context, event=on_end_trace_call)
+            on_start_trace = OnStartTrace(
+                run_no=run_no,
+                trace_no=trace_no,
+                thread_no=ThreadNo(1),
+                task_no=None,
+                started_at=started_at,
+            )
+            await ahook.on_start_trace(context=context, event=on_start_trace)
+            await writer.flush()
+
+        async with db.session() as session:
+            (trace_call,) = (await session.scalars(select(TraceCall))).all()
+    assert trace_call.started_at == started_at
+    assert trace_call.ended_at == ended_at
+
+
+async def _summaries(db: DB) -> dict[int, tuple[Any, ...]]:
+    # Except the max concurrent traces. The traces are written one after
+    # another here while their times are random.
+    async with db.session() as session:
+        summaries = (await session.scalars(select(RunSummary))).all()
+    return {
+        s.run_id: (
+            s.trace_count,
+            s.trace_call_count,
+            s.prompt_count,
+            s.stdout_count,
+            s.stdout_length,
+            s.first_event_at,
+            s.last_event_at,
+        )
+        for s in summaries
+    }
+
+
 async def _handle_script(context: spec.Context, script: Script) -> None:
     if script.runs:
         return
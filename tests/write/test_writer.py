@@ -0,0 +1,151 @@
+import asyncio
+
+from hypothesis import given
+from hypothesis import strategies as st
+from sqlalchemy import MetaData, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from nextline_rdb.db import DB
+from nextline_rdb.metrics import METRICS
+from nextline_rdb.models import NAMING_CONVENTION, ReprMixin
+from nextline_rdb.write import BufferedWriter, Writer
+from nextline_rdb.write.writer import Op
+
+metadata = MetaData(naming_convention=dict(NAMING_CONVENTION))
+
+
+class Model(ReprMixin, DeclarativeBase):
+    metadata = metadata
+
+
+class Entity(Model):
+    __tablename__ = 'entity'
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    num: Mapped[int]
+    parent: Mapped[int | None]
+
+
+def create_op(writer: Writer, num: int, parent: int | None = None) -> Op:
+    async def op(session: AsyncSession) -> None:
+        if parent is not None:
+            stmt = select(Entity).filter_by(num=parent)
+            await writer.scalar_one(session, stmt)
+        session.add(Entity(num=num, parent=parent))
+
+    return op
+
+
+@given(
+    n_ops=st.integers(min_value=0, max_value=50),
+    max_batch_size=st.integers(min_value=1, max_value=20),
+)
+async def test_batch(n_ops: int, max_batch_size: int) -> None:
+    async with DB(model_base_class=Model, use_migration=False) as db:
+        writer = BufferedWriter(db, max_batch_size=max_batch_size, max_delay=0.01)
+        async with writer:
+            for i in range(n_ops):
+                await writer.submit(create_op(writer, i))
+            await writer.flush()
+            assert writer.n_commits == -(-n_ops // max_batch_size)  # ceil
+
+        async with db.session() as session:
+            nums = (await session.scalars(select(Entity.num))).all()
+        assert sorted(nums) == list(range(n_ops))
+
+
+async def test_defer() -> None:
+    '''An op submitted before the op it depends on is applied after it.'''
+    async with DB(model_base_class=Model, use_migration=False) as db:
+        async with BufferedWriter(db, max_delay=0.01) as writer:
+            await writer.submit(create_op(writer, 2, parent=1))
+            await writer.submit(create_op(writer, 3, parent=2))
+            await writer.submit(create_op(writer, 1))
+            await writer.flush()
+
+        async with db.session() as session:
+            stmt = select(Entity).order_by(Entity.id)
+            nums = [e.num for e in (await session.scalars(stmt)).all()]
+        assert nums == [1, 2, 3]
+
+
+async def test_defer_timeout() -> None:
+    '''An op that is never ready is dropped after the timeout.'''
+    async with DB(model_base_class=Model, use_migration=False) as db:
+        async with BufferedWriter(db, max_delay=0.01, timeout=0.05) as writer:
+            await writer.submit(create_op(writer, 2, parent=1))
+            await writer.submit(create_op(writer, 3))
+            await writer.flush()
+
+        async with db.session() as session:
+            nums = (await session.scalars(select(Entity.num))).all()
+        assert nums == [3]
+
+
+async def test_back_pressure() -> None:
+    '''`submit()` waits while the queue is full.'''
+    async with DB(model_base_class=Model, use_migration=False) as db:
+        writer = BufferedWriter(db, max_batch_size=1, max_queue_size=2)
+        for i in range(2):
+            await writer.submit(create_op(writer, i))
+        submit = asyncio.create_task(writer.submit(create_op(writer, 2)))
+        await asyncio.sleep(0.01)
+        assert not submit.done()
+
+        async with writer:  # Start consuming the queue
+            await submit
+            await writer.flush()
+
+        async with db.session() as session:
+            nums = (await session.scalars(select(Entity.num))).all()
+        assert sorted(nums) == [0, 1, 2]
+
+
+async def test_order() -> None:
+    '''Without batching, each op is applied in its own transaction in order.'''
+    async with DB(model_base_class=Model, use_migration=False) as db:
+        async with BufferedWriter(db, max_batch_size=1, max_delay=0) as writer:
+            for i in range(10):
+                await writer.submit(create_op(writer, i, parent=i - 1 if i else None))
+            await writer.flush()
+            assert writer.n_commits == 10
+
+        async with db.session() as session:
+            stmt = select(Entity).order_by(Entity.id)
+            nums = [e.num for e in (await session.scalars(stmt)).all()]
+        assert nums == list(range(10))
+
+
+async def test_defer_without_delay() -> None:
+    '''Deferred ops are retried at intervals even if `max_delay` is zero.'''
+    async with DB(model_base_class=Model, use_migration=False) as db:
+        writer = BufferedWriter(db, max_batch_size=1, max_delay=0, timeout=0.35)
+        n_tries = 0
+        op = create_op(writer, 2, parent=1)
+
+        async def counted(session: AsyncSession) -> None:
+            nonlocal n_tries
+            n_tries += 1
+            await op(session)
+
+        async with writer:
+            await writer.submit(counted)
+            await writer.flush()
+        assert n_tries <= 5
+
+
+async def test_op_duration() -> None:
+    '''The seconds of each op are observed in the writer, not at the submit.'''
+    key = ('writer_op_duration_seconds', (('op', 'create_op.<locals>.op'),))
+
+    def _count() -> int:
+        histogram = METRICS.histograms.get(key)
+        return 0 if histogram is None else histogram.count
+
+    count = _count()
+    async with DB(model_base_class=Model, use_migration=False) as db:
+        async with BufferedWriter(db, max_batch_size=2, max_delay=0.01) as writer:
+            for i in range(3):
+                await writer.submit(create_op(writer, i))
+            await writer.flush()
+    assert _count() == count + 3